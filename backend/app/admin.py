@@ -1,3 +1,23 @@
 from django.contrib import admin
+from .models import PipelineJob, Transcript, RoutingDecision
 
 # Register your models here.
+@admin.register(PipelineJob)
+class PipelineJobAdmin(admin.ModelAdmin):
+    list_display = ("id", "video_id", "status", "stage", "created_at", "updated_at")
+    list_filter = ("status",)
+    search_fields = ("video_id",)
+
+
+@admin.register(Transcript)
+class TranscriptAdmin(admin.ModelAdmin):
+    list_display = ("video_id", "source", "model", "language", "updated_at")
+    list_filter = ("source", "language")
+    search_fields = ("video_id",)
+
+
+@admin.register(RoutingDecision)
+class RoutingDecisionAdmin(admin.ModelAdmin):
+    list_display = ("video_id", "path", "model", "reason", "duration_seconds", "queue_depth", "estimated_seconds", "elapsed_seconds", "succeeded", "created_at")
+    list_filter = ("path", "model", "reason", "succeeded")
+    search_fields = ("video_id",)
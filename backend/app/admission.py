@@ -0,0 +1,205 @@
+import os
+import math
+import time
+import asyncio
+import functools
+import threading
+import logging
+from contextlib import contextmanager
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.http import JsonResponse, StreamingHttpResponse
+from . import metrics
+from . import rate_limit
+
+logger = logging.getLogger(__name__)
+
+# Cost classes. Light endpoints (video metadata, job status, search) are
+# never gated, so they keep answering however busy the heavy paths are.
+MEDIUM = "medium"  # A yt-dlp download and S3 upload
+HEAVY = "heavy"  # Whisper, BART and OpenAI for one or more videos
+
+POLL_SECONDS = 0.1
+
+
+def available_memory():
+    """Bytes of RAM available to new work on this host, or None where it can't be read."""
+    try:
+        with open("/proc/meminfo") as f:
+            for line in f:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except OSError:
+        pass
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE")
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+def capacity(cost):
+    """Concurrent requests (and jobs) of a cost class this process runs at once."""
+    if cost == HEAVY:
+        if settings.ADMISSION_MAX_HEAVY:
+            return settings.ADMISSION_MAX_HEAVY
+        return max(1, (os.cpu_count() or 1) // settings.ADMISSION_CPUS_PER_HEAVY)
+    return settings.ADMISSION_MAX_MEDIUM
+
+
+class _Gate:
+    """Counts in-flight work of one cost class in this process."""
+
+    def __init__(self, cost):
+        self.cost = cost
+        self.in_flight = 0
+        self.waiting = 0
+        self.condition = threading.Condition()
+
+    def try_acquire(self):
+        with self.condition:
+            # The first one always runs, or a box short on free RAM could never make progress
+            if self.in_flight:
+                if self.in_flight >= capacity(self.cost):
+                    return False
+                if self.cost == HEAVY:
+                    free = available_memory()
+                    if free is not None and free < settings.ADMISSION_HEAVY_MEMORY_BYTES:
+                        return False
+            self.in_flight += 1
+            return True
+
+    def release(self):
+        with self.condition:
+            self.in_flight -= 1
+            self.condition.notify_all()
+
+
+_gates = {MEDIUM: _Gate(MEDIUM), HEAVY: _Gate(HEAVY)}
+
+
+async def acquire(cost, timeout=None):
+    """Waits up to ``timeout`` seconds for a slot. Returns False if none freed up or too many are already waiting."""
+    gate = _gates[cost]
+    if gate.try_acquire():
+        return True
+    timeout = settings.ADMISSION_QUEUE_TIMEOUT if timeout is None else timeout
+    with gate.condition:
+        if gate.waiting >= settings.ADMISSION_QUEUE_LIMIT:
+            return False
+        gate.waiting += 1
+    started = time.monotonic()
+    try:
+        # Polled rather than awaited on the condition, so the event loop is never blocked
+        while time.monotonic() - started < timeout:
+            await asyncio.sleep(POLL_SECONDS)
+            if gate.try_acquire():
+                metrics.observe("admission_wait_seconds", time.monotonic() - started, cost=cost)
+                return True
+        return False
+    finally:
+        with gate.condition:
+            gate.waiting -= 1
+
+
+def release(cost):
+    _gates[cost].release()
+
+
+@contextmanager
+def hold(cost):
+    """Blocks until a slot is free and holds it for the block, for background jobs that were already accepted."""
+    gate = _gates[cost]
+    started = time.monotonic()
+    with gate.condition:
+        while not gate.try_acquire():
+            gate.condition.wait(POLL_SECONDS * 10)  # Also wakes up to re-check free memory
+    metrics.observe("admission_wait_seconds", time.monotonic() - started, cost=cost)
+    try:
+        yield
+    finally:
+        gate.release()
+
+
+# Per-client quotas
+async def client_key(request):
+    """The signed-in user's id, else the client address."""
+    user = await request.auser()
+    if user.is_authenticated:
+        return f"user:{user.pk}"
+    return f"ip:{request.META.get('REMOTE_ADDR', 'unknown')}"
+
+
+def _quota_wait(cost, client):
+    quotas = settings.ADMISSION_USER_QUOTAS if client.startswith("user:") else settings.ADMISSION_IP_QUOTAS
+    per_minute = quotas.get(cost)
+    if not per_minute:
+        return 0
+    return rate_limit.take(f"admission:{cost}:{client}", 1, per_minute)
+
+
+def too_many_requests(message, retry_after):
+    response = JsonResponse({"error": message}, status=429)
+    response["Retry-After"] = str(max(1, math.ceil(retry_after)))
+    return response
+
+
+async def _release_when_done(content, cost):
+    try:
+        async for chunk in content:
+            yield chunk
+    finally:
+        release(cost)
+
+
+def admit(cost, concurrency=True):
+    """Decorates an async view with per-client quotas and a cap on concurrent requests of its cost class.
+
+    Over quota, or with no slot free after a bounded wait, the client gets a
+    429 with a Retry-After header. A streaming response keeps its slot until
+    the stream ends. Views that only queue a job pass ``concurrency=False``;
+    the job takes its slot with ``hold`` when it runs.
+    """
+    def decorator(view):
+        @functools.wraps(view)
+        async def wrapper(request, *args, **kwargs):
+            if not settings.ADMISSION_CONTROL:
+                return await view(request, *args, **kwargs)
+
+            client = await client_key(request)
+            wait = await sync_to_async(_quota_wait)(cost, client)
+            if wait:
+                metrics.inc("admission_rejections_total", cost=cost, reason="quota")
+                return too_many_requests("Request quota exceeded. Please try again later.", wait)
+            if not concurrency:
+                return await view(request, *args, **kwargs)
+
+            if not await acquire(cost):
+                metrics.inc("admission_rejections_total", cost=cost, reason="capacity")
+                logger.error(f"Rejecting {cost} request from {client}: server at capacity")
+                return too_many_requests("Server is busy. Please try again later.", settings.ADMISSION_RETRY_AFTER)
+
+            metrics.inc("admission_admitted_total", cost=cost)
+            try:
+                response = await view(request, *args, **kwargs)
+            except BaseException:
+                release(cost)
+                raise
+            if isinstance(response, StreamingHttpResponse) and response.is_async:
+                response.streaming_content = _release_when_done(response.streaming_content, cost)
+            else:
+                release(cost)
+            return response
+        return wrapper
+    return decorator
+
+
+@metrics.collector
+def gauges():
+    samples = []
+    for cost, gate in list(_gates.items()):
+        samples += [
+            ("admission_in_flight", {"cost": cost}, gate.in_flight),
+            ("admission_waiting", {"cost": cost}, gate.waiting),
+            ("admission_capacity", {"cost": cost}, capacity(cost)),
+        ]
+    return samples
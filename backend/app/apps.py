@@ -4,3 +4,9 @@ from django.apps import AppConfig
 class AppConfig(AppConfig):
     default_auto_field = 'django.db.models.BigAutoField'
     name = 'app'
+
+    def ready(self):
+        from django.conf import settings
+        if settings.MODEL_WARM_ON_STARTUP and settings.WORKER_ROLE != "metadata":
+            from .model_registry import registry
+            registry.warm()
@@ -0,0 +1,193 @@
+import os
+import sys
+import threading
+import subprocess
+import logging
+from django.conf import settings
+from . import metrics
+from . import media_cache
+
+logger = logging.getLogger(__name__)
+
+# Whisper expects 16 kHz mono float32 audio
+SAMPLE_RATE = 16000
+BYTES_PER_SAMPLE = 2  # ffmpeg emits signed 16-bit PCM
+
+
+class AudioStreamError(Exception):
+    pass
+
+
+def _download_command(video_url):
+    return [sys.executable, "-m", "yt_dlp", "--quiet", "--no-warnings", "-f", "bestaudio/best", "-o", "-", video_url]
+
+
+def _decode_command(source="pipe:0"):
+    return [
+        "ffmpeg", "-nostdin", "-loglevel", "error",
+        "-i", source,
+        "-f", "s16le", "-ac", "1", "-ar", str(SAMPLE_RATE),
+        "pipe:1",
+    ]
+
+
+def _read_windows(decode, processes, window_bytes):
+    """Yields float32 windows from ffmpeg's PCM output and reaps ``processes`` afterwards."""
+    import numpy as np
+    finished = False
+    try:
+        while True:
+            data = decode.stdout.read(window_bytes)
+            if not data:
+                break
+            # Drop a trailing odd byte so the buffer holds whole samples
+            data = data[:len(data) - len(data) % BYTES_PER_SAMPLE]
+            yield np.frombuffer(data, np.int16).astype(np.float32) / 32768.0
+        finished = True
+    finally:
+        decode.stdout.close()
+        for process in processes.values():
+            # Only kill the subprocesses when the consumer stopped early or failed
+            if not finished and process.poll() is None:
+                process.kill()
+            process.wait()
+
+    # A process that exited with an error explains the failure better than one killed by a signal because of it
+    failed = sorted((item for item in processes.items() if item[1].returncode), key=lambda item: item[1].returncode < 0)
+    if failed:
+        name, process = failed[0]
+        raise AudioStreamError(f"{name} failed: {process.stderr.read().decode(errors='replace').strip()}")
+
+
+def _window_bytes(window_seconds):
+    window_seconds = window_seconds or settings.WHISPER_WINDOW_SECONDS
+    return int(window_seconds * SAMPLE_RATE) * BYTES_PER_SAMPLE
+
+
+def _tee(download, sink, path, failure):
+    """Copies yt-dlp's output into both ``sink`` (ffmpeg's stdin) and the file at ``path``.
+
+    However it stops, the pipe from yt-dlp and ``sink`` are closed, so
+    neither process is left blocked on the other. If it stops before yt-dlp
+    finished, yt-dlp is killed; a failure to read the download or write the
+    cache file is appended to ``failure`` and the partial file is deleted.
+    """
+    completed = False
+    try:
+        with open(path, "wb") as f:
+            while True:
+                chunk = download.stdout.read(1 << 16)
+                if not chunk:
+                    break
+                f.write(chunk)
+                try:
+                    sink.write(chunk)
+                except (BrokenPipeError, ValueError):
+                    return  # ffmpeg exited or was killed; _read_windows reports why
+        completed = True
+    except (OSError, ValueError) as e:
+        failure.append(e)
+    finally:
+        download.stdout.close()
+        try:
+            sink.close()
+        except OSError:
+            pass
+        if not completed:
+            if download.poll() is None:
+                download.kill()
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+
+
+def stream_audio_windows(video_url, window_seconds=None, cache_to=None):
+    """Yields fixed-size float32 windows of a video's audio as it downloads.
+
+    yt-dlp writes the audio stream to stdout, which is decoded once by ffmpeg
+    straight to 16 kHz PCM. At most one window is held in memory at a time.
+    With ``cache_to``, the downloaded bytes are also written to that file on
+    their way to ffmpeg; if that copy fails, ``AudioStreamError`` is raised.
+    """
+    download = subprocess.Popen(_download_command(video_url), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    if cache_to is None:
+        decode = subprocess.Popen(_decode_command(), stdin=download.stdout, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        # Let ffmpeg own the pipe so yt-dlp gets SIGPIPE if ffmpeg exits early
+        download.stdout.close()
+        yield from _read_windows(decode, {"yt-dlp": download, "ffmpeg": decode}, _window_bytes(window_seconds))
+        return
+
+    decode = subprocess.Popen(_decode_command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    failure = []
+    copier = threading.Thread(target=_tee, args=(download, decode.stdin, cache_to, failure), daemon=True)
+    copier.start()
+    try:
+        yield from _read_windows(decode, {"yt-dlp": download, "ffmpeg": decode}, _window_bytes(window_seconds))
+    except AudioStreamError:
+        copier.join()
+        if failure:
+            # yt-dlp was killed because of the copy failure; report that, not the kill
+            raise AudioStreamError(f"Copying the download failed: {failure[0]}") from failure[0]
+        raise
+    finally:
+        # The copier stops once ffmpeg's stdin is gone or yt-dlp is reaped, both of which _read_windows does
+        copier.join()
+    if failure:
+        raise AudioStreamError(f"Copying the download failed: {failure[0]}") from failure[0]
+
+
+def audio_windows(video_url, video_id=None, window_seconds=None):
+    """Audio windows for a video, read from the media cache when it has the audio (or the whole video).
+
+    On a miss the download is streamed as usual and kept in the cache once
+    it has been read to the end without errors.
+    """
+    cached = media_cache.lookup(video_id, media_cache.AUDIO)
+    if cached:
+        yield from file_audio_windows(cached, window_seconds)
+        return
+    with media_cache.writing(video_id, media_cache.AUDIO) as cache_path:
+        yield from stream_audio_windows(video_url, window_seconds, cache_to=cache_path)
+
+
+def file_audio_windows(path, window_seconds=None):
+    """Like ``stream_audio_windows``, for a local audio file."""
+    decode = subprocess.Popen(_decode_command(path), stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+    yield from _read_windows(decode, {"ffmpeg": decode}, _window_bytes(window_seconds))
+
+
+def transcribe_windows(windows, model, on_text=None, **transcribe_options):
+    """Runs Whisper over a sequence of audio windows and merges the results.
+
+    Returns the same shape as ``model.transcribe``: a dict with ``text``,
+    ``segments`` (timestamps relative to the start of the audio) and
+    ``language``. The tail of each window's text is passed as the prompt for
+    the next one to keep context across window boundaries. ``on_text`` is
+    called with each window's text as soon as it is transcribed.
+    """
+    texts, segments = [], []
+    language = None
+    offset = 0.0
+    for window in windows:
+        options = dict(transcribe_options)
+        if texts:
+            options.setdefault("initial_prompt", texts[-1][-200:])
+        if language:
+            options.setdefault("language", language)
+        with metrics.timed("whisper_transcribe"):
+            result = model.transcribe(window, **options)
+        language = language or result.get("language")
+        for segment in result.get("segments", []):
+            segment = dict(segment, id=len(segments), start=segment["start"] + offset, end=segment["end"] + offset)
+            segments.append(segment)
+        texts.append(result["text"].strip())
+        if on_text and texts[-1]:
+            on_text(texts[-1])
+        offset += len(window) / SAMPLE_RATE
+    return {"text": " ".join(text for text in texts if text), "segments": segments, "language": language}
+
+
+def transcribe_stream(video_url, model, window_seconds=None, video_id=None, on_text=None, **transcribe_options):
+    """Downloads, decodes and transcribes a video's audio incrementally."""
+    return transcribe_windows(audio_windows(video_url, video_id, window_seconds), model, on_text, **transcribe_options)
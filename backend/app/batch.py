@@ -0,0 +1,171 @@
+import re
+import json
+import asyncio
+import logging
+from urllib.parse import urlparse, parse_qs
+from django.conf import settings
+from . import clients
+from . import video_metadata
+from .video_metadata import PAGE_SIZE
+from . import summarization
+from . import single_flight
+from .concurrency import run_in, run_sync_in
+from .result_cache import result_cache
+
+logger = logging.getLogger(__name__)
+
+
+# Expanding playlists and channels
+def playlist_id_from_url(url):
+    """Returns the playlist id for a playlist URL, or the uploads playlist for a channel URL."""
+    parsed_url = urlparse(url)
+    if "youtube.com" not in parsed_url.netloc:
+        return None
+    query_params = parse_qs(parsed_url.query)
+    if "list" in query_params:
+        return query_params["list"][0]
+
+    match = re.match(r"^/channel/(UC[\w-]+)", parsed_url.path)
+    if match:
+        # A channel's uploads playlist id is its channel id with UC replaced by UU
+        return "UU" + match.group(1)[2:]
+
+    match = re.match(r"^/@([\w.-]+)", parsed_url.path)
+    if match:
+        response = clients.youtube().channels().list(part="contentDetails", forHandle=match.group(1)).execute()
+        if response.get("items"):
+            return response["items"][0]["contentDetails"]["relatedPlaylists"]["uploads"]
+    return None
+
+
+def expand_playlist(playlist_id, limit):
+    """Lists the video ids in a playlist, one playlistItems call per 50 videos."""
+    video_ids = []
+    page_token = None
+    while len(video_ids) < limit:
+        response = clients.youtube().playlistItems().list(
+            part="contentDetails", playlistId=playlist_id, maxResults=PAGE_SIZE, pageToken=page_token,
+        ).execute()
+        video_ids.extend(item["contentDetails"]["videoId"] for item in response.get("items", []))
+        page_token = response.get("nextPageToken")
+        if not page_token:
+            break
+    return video_ids[:limit]
+
+
+def fetch_metadata_batch(video_ids):
+    """Fetches metadata for many videos from the metadata cache, one videos.list call per 50 uncached ids."""
+    return video_metadata.get_many(video_ids)
+
+
+# Running the pipeline for many videos
+def _whisper_transcript(video_id):
+    """Runs on a plain thread: only the Whisper call itself takes a "models" thread, so a
+    follower waiting on another caller's flight can't hold the thread the leader needs."""
+    from . import views
+    video_url = f"https://www.youtube.com/watch?v={video_id}"
+    return single_flight.run(
+        "transcript", video_id,
+        lambda: result_cache.get_or_compute(
+            "transcript", video_id, lambda: run_sync_in("models", views.transcribe_segments, video_url)
+        ),
+    )
+
+
+def _summarize_group(transcripts):
+    """Summarizes a group of ``{video_id: transcript}`` in shared model batches, using cached summaries where present."""
+    summaries = {video_id: result_cache.get("summary", video_id) for video_id in transcripts}
+    missing = [video_id for video_id, summary in summaries.items() if not summary]
+    if missing:
+        for video_id, summary in zip(missing, summarization.summarize_many([transcripts[video_id] for video_id in missing])):
+            result_cache.set("summary", video_id, summary)
+            summaries[video_id] = summary
+    return summaries
+
+
+def _optimized_content(video_id, summary):
+    from . import views
+    return result_cache.get_or_compute("optimized_content", video_id, lambda: views.generate_optimized_content(summary))
+
+
+async def batch_results(video_ids):
+    """Async generator yielding one result dict per video, in the order they complete.
+
+    Transcripts are fetched concurrently; as soon as ``BATCH_SUMMARY_GROUP``
+    transcripts are ready (or no more are coming), they are summarized
+    together in shared model batches, and each summary goes to OpenAI on
+    its own.
+    """
+    results = asyncio.Queue()
+    metadata = await run_in("youtube_api", fetch_metadata_batch, video_ids)
+
+    async def finish(video_id, summary):
+        try:
+            optimized_content = await run_in("openai", _optimized_content, video_id, summary)
+        except Exception as e:
+            logger.error(f"Error generating optimized content for {video_id}: {e}")
+            optimized_content = None
+        if optimized_content:
+            await results.put({"video_id": video_id, **metadata.get(video_id, {}), "summary": summary, "optimized_content": optimized_content})
+        else:
+            await results.put({"video_id": video_id, "error": "Error generating optimized content."})
+
+    async def summarize_group(group):
+        try:
+            summaries = await run_in("models", _summarize_group, group)
+        except Exception as e:
+            logger.error(f"Error summarizing batch: {e}")
+            for video_id in group:
+                await results.put({"video_id": video_id, "error": "Error summarizing transcript."})
+            return
+        await asyncio.gather(*(finish(video_id, summary) for video_id, summary in summaries.items()))
+
+    async def fetch(video_id):
+        from . import views
+        try:
+            transcript = result_cache.get("transcript", video_id)
+            if not transcript:
+                transcript, _ = await run_in("transcript_api", views.fetch_segments_with_source, video_id)
+                result_cache.set("transcript", video_id, transcript)
+            if not transcript:
+                transcript = await asyncio.to_thread(_whisper_transcript, video_id)
+            return video_id, transcript
+        except Exception as e:
+            logger.error(f"Error fetching transcript for {video_id}: {e}")
+            return video_id, None
+
+    async def coordinate():
+        group, groups = {}, []
+        for task in asyncio.as_completed([fetch(video_id) for video_id in video_ids if video_id in metadata]):
+            video_id, transcript = await task
+            if not transcript:
+                await results.put({"video_id": video_id, "error": "Could not fetch or transcribe the video."})
+                continue
+            group[video_id] = transcript
+            if len(group) >= settings.BATCH_SUMMARY_GROUP:
+                groups.append(asyncio.ensure_future(summarize_group(group)))
+                group = {}
+        if group:
+            groups.append(asyncio.ensure_future(summarize_group(group)))
+        await asyncio.gather(*groups)
+
+    for video_id in video_ids:
+        if video_id not in metadata:
+            await results.put({"video_id": video_id, "error": "Video not found"})
+
+    coordinator = asyncio.ensure_future(coordinate())
+    for _ in range(len(video_ids)):
+        getter = asyncio.ensure_future(results.get())
+        await asyncio.wait({getter, coordinator}, return_when=asyncio.FIRST_COMPLETED)
+        if not getter.done():
+            # Re-raise a crash in the coordinator instead of waiting forever
+            coordinator.result()
+        yield await getter
+    await coordinator
+
+
+async def batch_lines(video_ids):
+    """NDJSON lines for the batch endpoint."""
+    yield json.dumps({"event": "accepted", "video_ids": video_ids}) + "\n"
+    async for result in batch_results(video_ids):
+        yield json.dumps(result) + "\n"
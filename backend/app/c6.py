@@ -1,21 +1,18 @@
-import googleapiclient.discovery
-import re
-import yt_dlp
-import whisper
-from pydub import AudioSegment
-import tempfile
-from transformers import pipeline
+from urllib.parse import urlparse, parse_qs
 from youtube_transcript_api import YouTubeTranscriptApi
-import torch
 import openai
 import json
 import os
 import asyncio
-from concurrent.futures import ThreadPoolExecutor
-
-# Initialize OpenAI API and Hugging Face summarizer once
+from .concurrency import run_in
+from . import clients
+from . import summarization
+from . import transcription
+from . import video_metadata
+from .segments import SegmentedTranscript
+
+# Initialize OpenAI API once; models are loaded lazily through the registry
 openai.api_key = os.getenv("OPENAI_API_KEY")
-summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=0 if torch.cuda.is_available() else -1)
 
 # Helper function to extract video ID
 def extract_video_id(url):
@@ -38,16 +35,9 @@ def extract_video_id(url):
 def get_video_duration(video_id, api_key):
     """Fetches the video duration in minutes."""
     try:
-        youtube = googleapiclient.discovery.build("youtube", "v3", developerKey=api_key)
-        request = youtube.videos().list(part="contentDetails", id=video_id)
-        response = request.execute()
-        if response["items"]:
-            duration = response["items"][0]["contentDetails"]["duration"]
-            match = re.match(r'PT(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?', duration)
-            hours = int(match.group(1)) if match.group(1) else 0
-            minutes = int(match.group(2)) if match.group(2) else 0
-            seconds = int(match.group(3)) if match.group(3) else 0
-            return hours * 60 + minutes + seconds / 60
+        metadata = video_metadata.get(video_id, api_key)
+        if metadata and metadata["duration_seconds"] is not None:
+            return metadata["duration_seconds"] / 60
         else:
             print("No video details found.")
             return None
@@ -58,51 +48,31 @@ def get_video_duration(video_id, api_key):
 # Download and transcribe audio with Whisper
 def download_and_transcribe_with_whisper(youtube_url):
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_audio_file = os.path.join(temp_dir, "audio.mp3")
-
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': temp_audio_file,
-                'extractaudio': True,
-                'audioquality': 1,
-            }
-
-            # Download audio using yt-dlp
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([youtube_url])
-
-            # Convert to wav for Whisper
-            audio = AudioSegment.from_file(temp_audio_file)
-            wav_file = os.path.join(temp_dir, "audio.wav")
-            audio.export(wav_file, format="wav")
-
-            # Run Whisper transcription
-            model = whisper.load_model("large")
-            result = model.transcribe(wav_file)
-            transcript = result['text']
-            return transcript
+        # Stream the audio through ffmpeg straight into Whisper
+        result = transcription.transcribe_video(youtube_url)
+        transcript = result['text']
+        return transcript
 
     except Exception as e:
         print(f"Error during transcription: {e}")
         return None
 
 # Fetch transcript from YouTube API
-def get_transcript_from_youtube_api(video_id, video_length):
+def get_transcript_from_youtube_api(video_id, video_length, transcript_list=None):
     """Fetches transcript using YouTube API if available."""
     try:
-        transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
+        transcript_list = transcript_list or YouTubeTranscriptApi.list_transcripts(video_id)
 
         for transcript in transcript_list:
             if not transcript.is_generated:
                 segments = transcript.fetch()
-                return " ".join(segment['text'] for segment in segments)
+                return SegmentedTranscript.from_segments(segments).text
 
         if video_length > 15:
             auto_transcript = transcript_list.find_generated_transcript(['en'])
             if auto_transcript:
                 segments = auto_transcript.fetch()
-                return " ".join(segment['text'] for segment in segments)
+                return SegmentedTranscript.from_segments(segments).text
 
         print("Manual transcript not available, and video is too short for auto-transcript.")
         return None
@@ -111,6 +81,13 @@ def get_transcript_from_youtube_api(video_id, video_length):
         print(f"Error fetching transcript: {e}")
         return None
 
+def list_transcripts(video_id):
+    try:
+        return YouTubeTranscriptApi.list_transcripts(video_id)
+    except Exception as e:
+        print(f"Error listing transcripts: {e}")
+        return None
+
 # Get transcript based on availability
 async def get_transcript(youtube_url, api_key):
     """Gets transcript from YouTube API or Whisper if unavailable."""
@@ -119,14 +96,18 @@ async def get_transcript(youtube_url, api_key):
         print("Invalid or unsupported YouTube URL.")
         return None
 
-    video_length = get_video_duration(video_id, api_key)
+    # The duration and the transcript listing don't depend on each other
+    video_length, transcript_list = await asyncio.gather(
+        run_in("youtube_api", get_video_duration, video_id, api_key),
+        run_in("transcript_api", list_transcripts, video_id),
+    )
     if video_length is not None:
         print(f"Video length: {video_length:.2f} minutes.")
-        transcript = get_transcript_from_youtube_api(video_id, video_length)
+        transcript = await run_in("transcript_api", get_transcript_from_youtube_api, video_id, video_length, transcript_list)
         if transcript:
             return transcript
         print("Using Whisper for transcription.")
-        return await asyncio.to_thread(download_and_transcribe_with_whisper, youtube_url)
+        return await run_in("models", download_and_transcribe_with_whisper, youtube_url)
     else:
         print("Error fetching video duration.")
         return None
@@ -134,17 +115,7 @@ async def get_transcript(youtube_url, api_key):
 # Summarize text using Hugging Face summarizer
 def summarize_text_huggingface(text):
     """Summarizes text using a Hugging Face summarization model."""
-    max_input_length = 1024
-    chunk_overlap = 100
-    text_chunks = [
-        text[i:i + max_input_length]
-        for i in range(0, len(text), max_input_length - chunk_overlap)
-    ]
-    summaries = [
-        summarizer(chunk, max_length=100, min_length=50, do_sample=False)[0]['summary_text']
-        for chunk in text_chunks
-    ]
-    return " ".join(summaries)
+    return summarization.summarize(text)
 
 # Generate optimized content
 async def generate_optimized_content(api_key, summarized_transcript):
@@ -169,7 +140,7 @@ async def generate_optimized_content(api_key, summarized_transcript):
 
     try:
         # Use the updated OpenAI API format for chat completions
-        response = await asyncio.to_thread(openai.ChatCompletion.create,
+        response = await run_in("openai", clients.openai().ChatCompletion.create,
                                             model="gpt-3.5-turbo",
                                             messages=[{"role": "system", "content": "You are an SEO expert."},
                                                       {"role": "user", "content": prompt}])
@@ -184,7 +155,7 @@ async def generate_optimized_content(api_key, summarized_transcript):
 # Main function to process the video
 async def main():
     youtube_url = input("Enter a YouTube video URL: ").strip()
-    youtube_api_key = "YOUR_YOUTUBE_API_KEY"
+    youtube_api_key = os.getenv("YOUTUBE_API_KEY")
     
     if not youtube_api_key or not openai.api_key:
         print("Missing API keys. Please set your YOUTUBE_API_KEY and OPENAI_API_KEY environment variables.")
@@ -205,5 +176,9 @@ async def main():
     else:
         print("Error generating optimized content.")
 
+# Run from backend/ as ``python -m app.c6``; the pipeline modules read their settings through Django
 if __name__ == "__main__":
+    import django
+    os.environ.setdefault("DJANGO_SETTINGS_MODULE", "backend.settings")
+    django.setup()
     asyncio.run(main())
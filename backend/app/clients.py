@@ -0,0 +1,138 @@
+import os
+import threading
+import logging
+from contextlib import contextmanager
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Clients are built once per process, except the YouTube client: its httplib2
+# transport is not thread-safe, so each thread gets its own.
+_lock = threading.Lock()
+_local = threading.local()
+_shared = {}
+_overrides = {}
+_generation = 0  # Bumped by reset() so every thread rebuilds its per-thread clients
+
+
+def youtube(api_key=None):
+    """Returns this thread's YouTube Data API client."""
+    if "youtube" in _overrides:
+        return _overrides["youtube"]
+
+    api_key = api_key or settings.YOUTUBE_API_KEY
+    if getattr(_local, "generation", None) != _generation:
+        _local.youtube = {}
+        _local.generation = _generation
+    clients = _local.youtube
+    if api_key not in clients:
+        import httplib2
+        from googleapiclient.discovery import build
+        http = httplib2.Http(timeout=settings.CLIENT_TIMEOUT)
+        # Static discovery uses the document bundled with the library instead of fetching it
+        clients[api_key] = build("youtube", "v3", developerKey=api_key, http=http,
+                                 cache_discovery=False, static_discovery=True)
+        metrics.inc("clients_built_total", client="youtube")
+    return clients[api_key]
+
+
+def s3():
+    """Returns the process-wide S3 client (boto3 clients are thread-safe)."""
+    if "s3" in _overrides:
+        return _overrides["s3"]
+
+    with _lock:
+        if "s3" not in _shared:
+            import boto3
+            from botocore.config import Config
+            config = Config(
+                max_pool_connections=settings.S3_MAX_POOL_CONNECTIONS,
+                tcp_keepalive=settings.CLIENT_KEEPALIVE,
+                connect_timeout=settings.CLIENT_TIMEOUT,
+                retries={"max_attempts": 5, "mode": "standard"},
+            )
+            _shared["s3"] = boto3.client(
+                's3',
+                aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
+                aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY,
+                region_name=settings.AWS_S3_REGION_NAME,
+                endpoint_url=settings.AWS_S3_ENDPOINT_URL,
+                config=config,
+            )
+            metrics.inc("clients_built_total", client="s3")
+        return _shared["s3"]
+
+
+def openai():
+    """Returns the ``openai`` module configured with a pooled HTTP session."""
+    if "openai" in _overrides:
+        return _overrides["openai"]
+
+    import openai as openai_module
+    with _lock:
+        if "openai" not in _shared:
+            import requests
+            from requests.adapters import HTTPAdapter
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=1, pool_maxsize=settings.OPENAI_MAX_POOL_CONNECTIONS)
+            session.mount("https://", adapter)
+            session.mount("http://", adapter)
+            if not settings.CLIENT_KEEPALIVE:
+                session.headers["Connection"] = "close"
+            openai_module.requestssession = session
+            openai_module.api_key = openai_module.api_key or os.getenv("OPENAI_API_KEY")
+            if settings.OPENAI_API_BASE:
+                openai_module.api_base = settings.OPENAI_API_BASE
+            _shared["openai"] = adapter
+            metrics.inc("clients_built_total", client="openai")
+    return openai_module
+
+
+def _pool_samples(client, manager):
+    """Gauge samples for the per-host pools of a urllib3 PoolManager."""
+    samples = []
+    for key in manager.pools.keys():
+        pool = manager.pools[key]
+        samples.append(("client_pool_open_connections", {"client": client, "host": pool.host}, pool.num_connections))
+        if pool.pool is not None:
+            # The queue holds idle connections (and unused slots), so the rest are checked out
+            samples.append(("client_pool_connections_in_use", {"client": client, "host": pool.host}, pool.maxsize - pool.pool.qsize()))
+    return samples
+
+
+@metrics.collector
+def pool_gauges():
+    """Connection-pool size and usage of the process-wide OpenAI and S3 clients, once built."""
+    with _lock:
+        adapter = _shared.get("openai")
+        s3_client = _shared.get("s3")
+    samples = []
+    if adapter is not None:
+        samples.append(("client_pool_max_connections", {"client": "openai"}, settings.OPENAI_MAX_POOL_CONNECTIONS))
+        samples += _pool_samples("openai", adapter.poolmanager)
+    if s3_client is not None:
+        samples.append(("client_pool_max_connections", {"client": "s3"}, s3_client.meta.config.max_pool_connections))
+        # botocore keeps its urllib3 PoolManager on the endpoint's session; absent on stand-in clients
+        manager = getattr(getattr(getattr(s3_client, "_endpoint", None), "http_session", None), "_manager", None)
+        if manager is not None:
+            samples += _pool_samples("s3", manager)
+    return samples
+
+
+@contextmanager
+def override(name, client):
+    """Swaps in a stand-in client (e.g. a moto S3 client or a fake OpenAI module) for tests."""
+    _overrides[name] = client
+    try:
+        yield client
+    finally:
+        _overrides.pop(name, None)
+
+
+def reset():
+    """Drops every cached client so the next call rebuilds it from settings."""
+    global _generation
+    with _lock:
+        _shared.clear()
+        _generation += 1
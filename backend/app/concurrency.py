@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import functools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+
+# One bounded executor per external dependency, so a slow class of work
+# (e.g. Whisper) can only ever occupy its own threads and never starves the
+# cheap YouTube API calls.
+DEPENDENCIES = ["youtube_api", "transcript_api", "yt_dlp", "s3", "openai", "models", "summarizer_overlap", "inference_server"]
+
+_executors = {}
+_executors_lock = threading.Lock()
+
+
+def get_executor(dependency):
+    with _executors_lock:
+        if dependency not in _executors:
+            _executors[dependency] = ThreadPoolExecutor(
+                max_workers=settings.DEPENDENCY_CONCURRENCY[dependency],
+                thread_name_prefix=dependency,
+            )
+        return _executors[dependency]
+
+
+async def run_in(dependency, fn, *args, **kwargs):
+    """Runs a blocking call on the dependency's executor without blocking the event loop."""
+    loop = asyncio.get_running_loop()
+    # Carry context variables (e.g. the metrics trace id) into the worker thread
+    context = contextvars.copy_context()
+    return await loop.run_in_executor(get_executor(dependency), functools.partial(context.run, fn, *args, **kwargs))
+
+
+def submit_in(dependency, fn, *args, **kwargs):
+    """Starts a blocking call on the dependency's executor and returns its future."""
+    context = contextvars.copy_context()
+    return get_executor(dependency).submit(context.run, fn, *args, **kwargs)
+
+
+def run_sync_in(dependency, fn, *args, **kwargs):
+    """Runs a blocking call on the dependency's executor from synchronous code and waits for it."""
+    return submit_in(dependency, fn, *args, **kwargs).result()
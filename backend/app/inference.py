@@ -0,0 +1,127 @@
+import re
+import logging
+from collections import Counter
+from pathlib import Path
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+# Backends that keep the stock ``whisper.transcribe`` / transformers pipeline output
+WHISPER_BACKENDS = ("torch", "torch-int8", "ctranslate2")
+SUMMARIZER_BACKENDS = ("torch", "torch-int8", "onnx")
+
+
+def _quantize(model):
+    """Dynamic int8 quantization of every Linear layer, for CPU inference."""
+    import torch
+    return torch.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+
+
+# Whisper
+class CTranslate2Whisper:
+    """faster-whisper (CTranslate2) model behind openai-whisper's ``transcribe`` interface."""
+
+    def __init__(self, size, compute_type="int8", threads=0):
+        from faster_whisper import WhisperModel
+        self.model = WhisperModel(size, device="cpu", compute_type=compute_type, cpu_threads=threads)
+
+    def transcribe(self, audio, language=None, initial_prompt=None, fp16=None, **options):
+        segments, info = self.model.transcribe(audio, language=language, initial_prompt=initial_prompt, **options)
+        segments = [
+            {"id": index, "start": segment.start, "end": segment.end, "text": segment.text}
+            for index, segment in enumerate(segments)
+        ]
+        return {"text": "".join(segment["text"] for segment in segments), "segments": segments, "language": info.language}
+
+
+def load_whisper(size, backend="torch", compute_type="int8", threads=0):
+    if backend not in WHISPER_BACKENDS:
+        raise ValueError(f"Unknown Whisper backend {backend!r}, expected one of {', '.join(WHISPER_BACKENDS)}")
+    if backend == "ctranslate2":
+        return CTranslate2Whisper(size, compute_type, threads)
+    import whisper
+    if backend == "torch-int8":
+        import torch
+        model = whisper.load_model(size, device="cpu")
+        # whisper.model.Linear only adds a dtype cast; quantize_dynamic matches exact types, so use the base class
+        for module in model.modules():
+            if isinstance(module, torch.nn.Linear):
+                module.__class__ = torch.nn.Linear
+        return _quantize(model)
+    return whisper.load_model(size)
+
+
+# Summarizer
+def _onnx_model(model_name):
+    """Loads the ONNX export of a seq2seq model, exporting it on first use."""
+    from optimum.onnxruntime import ORTModelForSeq2SeqLM
+    export_dir = Path(settings.ONNX_MODEL_DIR) / model_name.replace("/", "--")
+    if export_dir.exists():
+        return ORTModelForSeq2SeqLM.from_pretrained(export_dir)
+    logger.info(f"Exporting {model_name} to ONNX in {export_dir}")
+    model = ORTModelForSeq2SeqLM.from_pretrained(model_name, export=True)
+    model.save_pretrained(export_dir)
+    return model
+
+
+def load_summarizer(model_name, backend="torch"):
+    if backend not in SUMMARIZER_BACKENDS:
+        raise ValueError(f"Unknown summarizer backend {backend!r}, expected one of {', '.join(SUMMARIZER_BACKENDS)}")
+    from transformers import AutoTokenizer, pipeline
+    if backend == "onnx":
+        return pipeline("summarization", model=_onnx_model(model_name), tokenizer=AutoTokenizer.from_pretrained(model_name))
+    import torch
+    if backend == "torch-int8":
+        summarizer = pipeline("summarization", model=model_name, device=-1)
+        summarizer.model = _quantize(summarizer.model)
+        return summarizer
+    return pipeline("summarization", model=model_name, device=0 if torch.cuda.is_available() else -1)
+
+
+# Accuracy metrics for comparing backends
+def _tokens(text):
+    return re.findall(r"[a-z0-9']+", text.lower())
+
+
+def _edit_distance(reference, hypothesis):
+    previous = list(range(len(hypothesis) + 1))
+    for i, ref_word in enumerate(reference, 1):
+        current = [i]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + (ref_word != hyp_word)))
+        previous = current
+    return previous[-1]
+
+
+def word_error_rate(reference, hypothesis):
+    """Word-level edit distance divided by the reference length, ignoring case and punctuation."""
+    reference, hypothesis = _tokens(reference), _tokens(hypothesis)
+    if not reference:
+        return 0.0 if not hypothesis else 1.0
+    return _edit_distance(reference, hypothesis) / len(reference)
+
+
+def _f1(overlap, reference_count, hypothesis_count):
+    if not overlap:
+        return 0.0
+    precision, recall = overlap / hypothesis_count, overlap / reference_count
+    return 2 * precision * recall / (precision + recall)
+
+
+def rouge_n(reference, hypothesis, n=1):
+    def ngrams(words):
+        return Counter(tuple(words[i:i + n]) for i in range(len(words) - n + 1))
+    reference, hypothesis = ngrams(_tokens(reference)), ngrams(_tokens(hypothesis))
+    overlap = sum((reference & hypothesis).values())
+    return _f1(overlap, sum(reference.values()), sum(hypothesis.values()))
+
+
+def rouge_l(reference, hypothesis):
+    reference, hypothesis = _tokens(reference), _tokens(hypothesis)
+    previous = [0] * (len(hypothesis) + 1)
+    for ref_word in reference:
+        current = [0]
+        for j, hyp_word in enumerate(hypothesis, 1):
+            current.append(previous[j - 1] + 1 if ref_word == hyp_word else max(previous[j], current[j - 1]))
+        previous = current
+    return _f1(previous[-1], len(reference), len(hypothesis))
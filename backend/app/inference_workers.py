@@ -0,0 +1,428 @@
+import os
+import sys
+import hashlib
+import itertools
+import threading
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import Future, TimeoutError as FutureTimeout
+from contextlib import contextmanager
+from multiprocessing.connection import Client, Listener, wait
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Host-wide inference server. `manage.py inference_server` starts long-lived
+# worker processes that keep Whisper and the summarizer loaded; Django
+# processes send them work over a Unix socket instead of loading their own
+# copies. Audio goes through shared memory, only its name crosses the socket.
+WHISPER = "whisper"
+SUMMARIZER = "summarizer"
+OPERATIONS = {"transcribe": WHISPER, "summarize": SUMMARIZER}
+CLIENT_POLL_SECONDS = 0.5  # How often the server checks whether a waiting client hung up
+
+
+class InferenceError(Exception):
+    pass
+
+
+def _authkey():
+    return hashlib.sha256(settings.SECRET_KEY.encode()).digest()
+
+
+# Shared memory for audio
+@contextmanager
+def _shared_audio(audio):
+    """Copies float32 audio into a new shared memory block for the duration of the block."""
+    import numpy as np
+    from multiprocessing import shared_memory
+    audio = np.ascontiguousarray(audio, dtype=np.float32)
+    block = shared_memory.SharedMemory(create=True, size=max(1, audio.nbytes))
+    try:
+        np.ndarray(audio.shape, dtype=np.float32, buffer=block.buf)[:] = audio
+        yield {"name": block.name, "shape": audio.shape}
+    finally:
+        block.close()
+        block.unlink()
+
+
+def _attach_audio(reference):
+    """Maps the client's audio block; the array is a view of it, not a copy."""
+    import numpy as np
+    from multiprocessing import resource_tracker, shared_memory
+    block = shared_memory.SharedMemory(name=reference["name"])
+    if sys.version_info < (3, 13):
+        # The client owns and unlinks the block; don't let this process's tracker unlink it too
+        resource_tracker.unregister(block._name, "shared_memory")
+    return block, np.ndarray(reference["shape"], dtype=np.float32, buffer=block.buf)
+
+
+# Client side, used by the model registry when INFERENCE_SERVER_SOCKET is set
+_local = threading.local()
+
+
+def _connection():
+    connection = getattr(_local, "connection", None)
+    if connection is None:
+        try:
+            connection = Client(settings.INFERENCE_SERVER_SOCKET, family="AF_UNIX", authkey=_authkey())
+        except OSError as e:
+            raise InferenceError(f"Inference server not reachable at {settings.INFERENCE_SERVER_SOCKET}: {e}")
+        _local.connection = connection
+    return connection
+
+
+def _drop_connection():
+    connection = getattr(_local, "connection", None)
+    _local.connection = None
+    if connection is not None:
+        connection.close()
+
+
+def call(request):
+    """Sends one request on this thread's connection and waits for the reply."""
+    connection = _connection()
+    try:
+        connection.send(request)
+        if not connection.poll(settings.INFERENCE_REQUEST_TIMEOUT):
+            # A late reply would be read as the answer to the next request
+            _drop_connection()
+            raise InferenceError(f"No reply to {request['op']} within {settings.INFERENCE_REQUEST_TIMEOUT}s")
+        reply = connection.recv()
+    except (OSError, EOFError) as e:
+        _drop_connection()
+        metrics.inc("inference_server_requests_total", op=request["op"], outcome="unreachable")
+        raise InferenceError(f"Lost connection to the inference server: {e}")
+    metrics.inc("inference_server_requests_total", op=request["op"], outcome="ok" if reply["ok"] else "error")
+    if not reply["ok"]:
+        raise InferenceError(reply["error"])
+    return reply["result"]
+
+
+class RemoteWhisper:
+    """Whisper model held by the inference server, behind openai-whisper's ``transcribe`` interface."""
+
+    def __init__(self, size, backend):
+        self.size = size
+        self.backend = backend
+
+    def transcribe(self, audio, **options):
+        request = {"op": "transcribe", "size": self.size, "backend": self.backend, "options": options}
+        with metrics.timed("inference_server", op="transcribe"):
+            if isinstance(audio, str):
+                return call(dict(request, path=audio))
+            with _shared_audio(audio) as reference:
+                return call(dict(request, audio=reference))
+
+
+class RemoteSummarizer:
+    """Summarization pipeline held by the inference server.
+
+    The tokenizer is loaded locally (it carries no weights), since chunking
+    counts tokens before anything is sent.
+    """
+
+    def __init__(self, model_name, backend):
+        from transformers import AutoTokenizer
+        self.model_name = model_name
+        self.backend = backend
+        self.tokenizer = AutoTokenizer.from_pretrained(model_name)
+
+    def __call__(self, inputs, **options):
+        request = {"op": "summarize", "model": self.model_name, "backend": self.backend, "inputs": inputs, "options": options}
+        with metrics.timed("inference_server", op="summarize"):
+            return call(request)
+
+
+def server_stats():
+    return call({"op": "stats"})
+
+
+# Worker processes
+def _run(registry, request):
+    if request["op"] == "summarize":
+        with registry.use("summarizer", request["model"], request["backend"]) as summarizer:
+            return summarizer(request["inputs"], **request["options"])
+
+    if "path" in request:
+        with registry.use("whisper", request["size"], request["backend"]) as model:
+            return model.transcribe(request["path"], **request["options"])
+    block, audio = _attach_audio(request["audio"])
+    try:
+        with registry.use("whisper", request["size"], request["backend"]) as model:
+            result = model.transcribe(audio, **request["options"])
+    finally:
+        del audio
+        try:
+            block.close()
+        except BufferError:
+            pass  # A tensor still views the buffer; the mapping goes when it is collected
+    return {"text": result["text"], "segments": result.get("segments", []), "language": result.get("language")}
+
+
+def _worker_main(kind, connection, threads, preload, handler):
+    # This process is where models run, so its registry must load them rather than call the server
+    settings.INFERENCE_SERVER_SOCKET = ""
+    from .model_registry import ModelRegistry
+    try:
+        import torch
+        torch.set_num_threads(threads)
+    except ImportError:
+        pass
+    registry = ModelRegistry(max_loaded=settings.INFERENCE_MAX_MODELS_PER_WORKER)
+    for variant in preload:
+        try:
+            registry.get(kind, variant)
+        except Exception as e:
+            logger.error(f"Error preloading {kind} {variant}: {e}")
+
+    connection.send("ready")
+    while True:
+        try:
+            task = connection.recv()
+        except EOFError:
+            return
+        if task is None:
+            return
+        key, request = task
+        try:
+            connection.send((key, True, handler(registry, request)))
+        except Exception as e:
+            logger.exception(f"Inference request {request['op']} failed")
+            connection.send((key, False, f"{type(e).__name__}: {e}"))
+
+
+# Server
+class _Worker:
+    """A worker process, the server's end of its pipe, and the request it is running."""
+
+    def __init__(self, process, connection):
+        self.process = process
+        self.connection = connection
+        self.ready = False
+        self.key = None
+
+
+class InferenceServer:
+    """Accepts requests on a Unix socket and hands them to warm worker processes.
+
+    Whisper and summarizer requests have their own backlog and workers, so
+    the number of processes per kind is how the host's model memory is
+    budgeted. Each worker has its own pipe and the server assigns requests to
+    idle workers itself, so it always knows what a worker was running: when a
+    worker dies it is replaced and that request fails instead of hanging.
+    """
+
+    def __init__(self, path=None, whisper_workers=None, summarizer_workers=None, threads=None, handler=_run):
+        self.path = path or settings.INFERENCE_SERVER_SOCKET
+        self.counts = {
+            WHISPER: settings.INFERENCE_WHISPER_WORKERS if whisper_workers is None else whisper_workers,
+            SUMMARIZER: settings.INFERENCE_SUMMARIZER_WORKERS if summarizer_workers is None else summarizer_workers,
+        }
+        self.threads = threads or settings.INFERENCE_WORKER_THREADS
+        self.preload = {
+            WHISPER: settings.INFERENCE_PRELOAD_WHISPER,
+            SUMMARIZER: [settings.SUMMARIZER_MODEL] if settings.INFERENCE_PRELOAD_SUMMARIZER else [],
+        }
+        self.handler = handler  # Module-level function run in the workers as handler(registry, request)
+        self.context = multiprocessing.get_context("spawn")
+        self.workers = {kind: [] for kind in self.counts}
+        self.backlog = {kind: deque() for kind in self.counts}  # (key, request) waiting for an idle worker
+        self.pending = {}  # key -> Future, until the result arrives or the client gives up
+        self.lock = threading.Lock()
+        self.ids = itertools.count()
+        self.stopping = threading.Event()
+        self.listener = None
+        self.restarts = 0
+
+    def _spawn(self, kind):
+        connection, child = self.context.Pipe()
+        process = self.context.Process(
+            target=_worker_main, name=f"inference-{kind}",
+            args=(kind, child, self.threads, self.preload[kind], self.handler), daemon=True,
+        )
+        process.start()
+        child.close()
+        logger.info(f"Started {kind} worker {process.pid}")
+        return _Worker(process, connection)
+
+    def _assign(self, kind):
+        """Hands queued requests to idle workers of ``kind``; called with the lock held."""
+        idle = [worker for worker in self.workers[kind] if worker.ready and worker.key is None]
+        while idle and self.backlog[kind]:
+            key, request = self.backlog[kind].popleft()
+            if key not in self.pending:
+                continue  # Its client already gave up
+            worker = idle.pop()
+            try:
+                worker.connection.send((key, request))
+            except OSError:
+                self.backlog[kind].appendleft((key, request))
+                continue  # The worker just died; the supervision loop replaces it
+            worker.key = key
+
+    def enqueue(self, request):
+        """Queues one request for a worker of its kind; the future resolves to ``(ok, result or error)``."""
+        kind = OPERATIONS[request["op"]]
+        future = Future()
+        with self.lock:
+            key = next(self.ids)
+            if not self.counts[kind]:
+                future.set_result((False, f"No {kind} workers are running"))
+                return key, future
+            self.pending[key] = future
+            self.backlog[kind].append((key, request))
+            self._assign(kind)
+        return key, future
+
+    def cancel(self, key):
+        """Forgets a request whose client gave up. If a worker is already running it, its result is dropped."""
+        with self.lock:
+            self.pending.pop(key, None)
+            for kind, backlog in self.backlog.items():
+                self.backlog[kind] = deque(item for item in backlog if item[0] != key)
+
+    def submit(self, request, timeout=None):
+        """Runs one request and returns ``(ok, result or error)``, waiting at most ``timeout`` seconds if given."""
+        key, future = self.enqueue(request)
+        try:
+            return future.result(timeout=timeout)
+        except FutureTimeout:
+            self.cancel(key)
+            return False, f"No result within {timeout}s"
+
+    def _receive(self, kind, worker, message):
+        with self.lock:
+            if message == "ready":
+                worker.ready = True
+                self._assign(kind)
+                return
+            key, ok, payload = message
+            worker.key = None
+            future = self.pending.pop(key, None)
+            self._assign(kind)
+        if future is not None:
+            future.set_result((ok, payload))
+
+    def _replace(self, kind, worker):
+        logger.error(f"{kind} worker {worker.process.pid} exited with {worker.process.exitcode}, restarting")
+        replacement = None if self.stopping.is_set() else self._spawn(kind)
+        with self.lock:
+            future = self.pending.pop(worker.key, None) if worker.key is not None else None
+            self.workers[kind].remove(worker)
+            if replacement is not None:
+                self.workers[kind].append(replacement)
+            self.restarts += 1
+        worker.connection.close()
+        if future is not None:
+            future.set_result((False, f"Inference worker exited with {worker.process.exitcode}"))
+
+    def _supervise(self):
+        """Reads results from every worker's pipe and replaces workers that exit."""
+        while not self.stopping.is_set():
+            with self.lock:
+                workers = [(kind, worker) for kind, group in self.workers.items() for worker in group]
+            if not workers:
+                self.stopping.wait(1)
+                continue
+            ready = wait([worker.connection for _, worker in workers] + [worker.process.sentinel for _, worker in workers], timeout=1)
+            for kind, worker in workers:
+                if worker.connection in ready:
+                    try:
+                        self._receive(kind, worker, worker.connection.recv())
+                        continue
+                    except (EOFError, OSError):
+                        worker.process.join()  # Its end of the pipe is gone, so it is exiting
+                if not worker.process.is_alive() and not self.stopping.is_set():
+                    self._replace(kind, worker)
+
+    def _handle(self, connection):
+        with connection:
+            while True:
+                try:
+                    request = connection.recv()
+                except (EOFError, OSError):
+                    return
+                if request.get("op") == "stats":
+                    reply = {"ok": True, "result": self.stats()}
+                elif request.get("op") in OPERATIONS:
+                    # No deadline here: the client decides how long to wait, and hangs up when it stops
+                    key, future = self.enqueue(request)
+                    while True:
+                        try:
+                            ok, payload = future.result(timeout=CLIENT_POLL_SECONDS)
+                            break
+                        except FutureTimeout:
+                            # Clients send nothing while waiting, so a readable connection means it closed
+                            if connection.poll():
+                                self.cancel(key)
+                                return
+                    reply = {"ok": True, "result": payload} if ok else {"ok": False, "error": payload}
+                else:
+                    reply = {"ok": False, "error": f"Unknown operation {request.get('op')!r}"}
+                try:
+                    connection.send(reply)
+                except OSError:
+                    return
+
+    def stats(self):
+        with self.lock:
+            return {
+                "workers": {kind: sum(worker.process.is_alive() for worker in group) for kind, group in self.workers.items()},
+                "busy": {kind: sum(worker.key is not None for worker in group) for kind, group in self.workers.items()},
+                "queued": {kind: len(backlog) for kind, backlog in self.backlog.items()},
+                "in_flight": len(self.pending),
+                "restarts": self.restarts,
+            }
+
+    def serve_forever(self):
+        if os.path.exists(self.path):
+            os.remove(self.path)  # Left behind by a server that didn't shut down cleanly
+        for kind, count in self.counts.items():
+            self.workers[kind] = [self._spawn(kind) for _ in range(count)]
+        threading.Thread(target=self._supervise, name="inference-supervise", daemon=True).start()
+
+        self.listener = Listener(self.path, family="AF_UNIX", authkey=_authkey())
+        os.chmod(self.path, 0o660)
+        logger.info(f"Inference server listening on {self.path}")
+        try:
+            while not self.stopping.is_set():
+                try:
+                    connection = self.listener.accept()
+                except multiprocessing.AuthenticationError as e:
+                    logger.error(f"Rejected inference client: {e}")
+                    continue
+                if self.stopping.is_set():
+                    connection.close()
+                    break
+                threading.Thread(target=self._handle, args=(connection,), name="inference-client", daemon=True).start()
+        finally:
+            self.listener.close()
+            self.stop()
+
+    def stop(self):
+        if self.stopping.is_set():
+            return
+        self.stopping.set()
+        if self.listener is not None:
+            try:
+                # Wake the accept() in serve_forever so it sees the flag and closes the listener
+                Client(self.path, family="AF_UNIX", authkey=_authkey()).close()
+            except OSError:
+                pass
+        with self.lock:
+            workers = [worker for group in self.workers.values() for worker in group]
+            pending, self.pending = self.pending, {}
+        for worker in workers:
+            try:
+                worker.connection.send(None)
+            except OSError:
+                pass
+        for worker in workers:
+            worker.process.join(timeout=10)
+            if worker.process.is_alive():
+                worker.process.terminate()
+        for future in pending.values():
+            future.set_result((False, "Inference server stopped"))
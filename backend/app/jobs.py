@@ -0,0 +1,284 @@
+import os
+import time
+import uuid
+import socket
+import threading
+import logging
+from datetime import timedelta
+from contextlib import nullcontext
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from django.db import close_old_connections
+from django.db.models import Q
+from django.utils import timezone
+from .models import PipelineJob
+from .result_cache import result_cache
+from .segments import SegmentedTranscript
+from .concurrency import run_sync_in
+from . import single_flight
+from . import metrics
+from . import routing
+from . import admission
+from . import summarization
+
+logger = logging.getLogger(__name__)
+
+# Pipeline stages in the order they run
+STAGES = ["transcript", "summary", "optimized_content"]
+ACTIVE = [PipelineJob.QUEUED, PipelineJob.RUNNING]
+
+_executor = None
+_executor_lock = threading.Lock()
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class PipelineError(Exception):
+    pass
+
+
+def get_executor():
+    """Returns the process-wide worker pool, starting the heartbeat that keeps this process's jobs claimed."""
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=settings.JOB_WORKERS, thread_name_prefix="pipeline-job")
+            threading.Thread(target=_heartbeat, args=(_executor,), name="pipeline-job-heartbeat", daemon=True).start()
+    return _executor
+
+
+def start():
+    """Starts the worker pool and heartbeat of a serving process, so it takes over jobs whose owner died.
+
+    Called from the ASGI/WSGI entry points rather than ``AppConfig.ready()``,
+    which also runs for management commands and tests. Metadata-only workers
+    run no jobs.
+    """
+    if settings.WORKER_ROLE != "metadata":
+        get_executor()
+
+
+# Ownership: each web process claims the jobs it runs and keeps their heartbeat
+# fresh, so sibling processes only take over jobs whose owner has gone away.
+_owners = {}
+
+
+def owner():
+    """This process's owner id; looked up by pid so forked workers don't share their parent's."""
+    return _owners.setdefault(os.getpid(), f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}")
+
+
+def _stale():
+    return Q(heartbeat_at__isnull=True) | Q(heartbeat_at__lt=timezone.now() - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT))
+
+
+def claim(job_id):
+    """Atomically makes this process the job's owner, unless another live process already is."""
+    return PipelineJob.objects.filter(id=job_id, status__in=ACTIVE).filter(Q(owner=owner()) | _stale()).update(
+        owner=owner(), heartbeat_at=timezone.now()
+    ) == 1
+
+
+def resume_pending_jobs(executor):
+    """Re-queues unfinished jobs whose owner stopped heartbeating (it crashed or was restarted)."""
+    try:
+        stale = list(PipelineJob.objects.filter(_stale(), status__in=ACTIVE).values_list("id", flat=True))
+        for job_id in stale:
+            if claim(job_id):
+                logger.info(f"Resuming job {job_id}")
+                executor.submit(run_job, job_id)
+    except Exception as e:
+        logger.error(f"Error resuming pending jobs: {e}")
+
+
+def _heartbeat(executor):
+    while True:
+        try:
+            PipelineJob.objects.filter(owner=owner(), status__in=ACTIVE).update(heartbeat_at=timezone.now())
+        except Exception as e:
+            logger.error(f"Error refreshing job heartbeats: {e}")
+        resume_pending_jobs(executor)
+        close_old_connections()
+        time.sleep(settings.JOB_HEARTBEAT_SECONDS)
+
+
+def submit_job(video_url, video_id):
+    """Persists a new job, claimed by this process, and hands it to the worker pool."""
+    executor = get_executor()
+    active = PipelineJob.objects.filter(status__in=ACTIVE).count()
+    if active >= settings.JOB_QUEUE_LIMIT:
+        raise JobQueueFull(f"{active} jobs already pending.")
+
+    job = PipelineJob.objects.create(video_url=video_url, video_id=video_id, owner=owner(), heartbeat_at=timezone.now())
+    executor.submit(run_job, job.id)
+    return job
+
+
+def run_job(job_id):
+    """Runs the optimization pipeline for one job, skipping stages already finished."""
+    try:
+        if not claim(job_id):
+            logger.info(f"Job {job_id} is finished or owned by another process")
+            return
+        job = PipelineJob.objects.get(id=job_id)
+    except PipelineJob.DoesNotExist:
+        logger.error(f"Job {job_id} no longer exists")
+        close_old_connections()
+        return
+
+    try:
+        job.status = PipelineJob.RUNNING
+        job.save(update_fields=["status", "updated_at"])
+        with metrics.trace(str(job.id)), metrics.timed("job"), _heavy_slot():
+            run_pipeline(job)
+        job.status = PipelineJob.SUCCEEDED
+        job.stage = ""
+        job.save(update_fields=["status", "stage", "updated_at"])
+    except PipelineError as e:
+        _fail(job, str(e))
+    except Exception as e:
+        logger.exception(f"Job {job_id} failed")
+        _fail(job, f"Unexpected error: {e}")
+    finally:
+        close_old_connections()
+
+
+def _heavy_slot():
+    """Shares the heavy-work cap with the streaming and batch endpoints, so jobs can't pile models into memory."""
+    return admission.hold(admission.HEAVY) if settings.ADMISSION_CONTROL else nullcontext()
+
+
+def run_pipeline(job):
+    from . import views
+
+    video_url, video_id = job.video_url, job.video_id
+
+    overlap = {}
+    # True when the previous stage's result rests on a transcript routing downgraded for
+    # latency: this job still uses it, but nothing built on it is cached as the video's result
+    downgraded = False
+    # The transcript stage's SegmentedTranscript, handed to the summary stage without a round trip through text
+    segmented = {}
+
+    def on_text(text):
+        # Started on the first Whisper output only; caption transcripts arrive whole and gain nothing
+        if "summary" not in overlap:
+            overlap["summary"] = summarization.BackgroundSummary()
+        overlap["summary"].feed(text)
+
+    def transcript_stage():
+        feed = on_text if settings.SUMMARIZER_OVERLAP and result_cache.get("summary", video_id) is None else None
+        try:
+            transcript_downgraded = False
+            if settings.TRANSCRIPT_ROUTING:
+                transcript, _, transcript_downgraded = routing.get_transcript(video_id, video_url, feed, job.id)
+            else:
+                transcript, _ = run_sync_in("transcript_api", views.fetch_segments_with_source, video_id)
+                if not transcript:
+                    transcript = run_sync_in("models", views.transcribe_segments, video_url, None, feed)
+        except BaseException:
+            if "summary" in overlap:
+                overlap.pop("summary").cancel()
+            raise
+        if not transcript:
+            if "summary" in overlap:
+                overlap.pop("summary").cancel()
+            raise PipelineError("Could not fetch or transcribe the video.")
+        if "summary" in overlap:
+            overlap["finished"] = _finish_overlapped_summary(overlap.pop("summary"))
+        return transcript, transcript_downgraded
+
+    def summary_stage():
+        transcript = segmented.pop("transcript", None) or job.result["transcript"]
+        summary = overlap.pop("finished", None) or run_sync_in("models", views.summarize_text, transcript)
+        if not summary:
+            raise PipelineError("Error summarizing transcript.")
+        return summary, downgraded
+
+    def optimized_content_stage():
+        optimized_content = run_sync_in("openai", views.generate_optimized_content, job.result["summary"])
+        if not optimized_content:
+            raise PipelineError("Error generating optimized content.")
+        return optimized_content, downgraded
+
+    runners = {
+        "transcript": transcript_stage,
+        "summary": summary_stage,
+        "optimized_content": optimized_content_stage,
+    }
+    def cached_stage(stage):
+        """Returns the stage's result and whether it is downgraded; only results that aren't are cached."""
+        flag = {}
+
+        def compute():
+            result, flag["downgraded"] = runners[stage]()
+            return result
+
+        result = result_cache.get_or_compute(stage, video_id, compute, keep=lambda _: not flag["downgraded"])
+        return result, flag.get("downgraded", False)
+
+    for stage in STAGES:
+        if stage in job.result:
+            downgraded = job.progress.get(stage, {}).get("downgraded", False)
+            continue
+        _start_stage(job, stage)
+        # Jobs for the same video share one run of each stage, across threads and processes.
+        # The flag is part of the shared result, so a job adopting a downgraded one knows it.
+        result, downgraded = single_flight.run(stage, video_id, lambda: cached_stage(stage))
+        if isinstance(result, SegmentedTranscript):
+            # Cached in the compact form; the job row keeps the JSON-friendly text
+            segmented[stage], result = result, result.text
+        job.result[stage] = result
+        _finish_stage(job, stage, downgraded)
+
+
+def _finish_overlapped_summary(background):
+    """Waits for the summary built alongside transcription; None if it failed and the summary stage must start over."""
+    try:
+        with metrics.timed("summarize", mode="overlapped_tail"):
+            return background.finish()
+    except Exception as e:
+        logger.error(f"Error summarizing transcript alongside transcription, summarizing again: {e}")
+        return None
+
+
+def _start_stage(job, stage):
+    job.stage = stage
+    job.progress[stage] = {"status": PipelineJob.RUNNING, "started_at": timezone.now().isoformat()}
+    job.save(update_fields=["stage", "progress", "updated_at"])
+
+
+def _finish_stage(job, stage, downgraded=False):
+    job.progress[stage].update({"status": PipelineJob.SUCCEEDED, "finished_at": timezone.now().isoformat()})
+    if downgraded:
+        job.progress[stage]["downgraded"] = True  # Read back when the job is resumed
+    job.save(update_fields=["progress", "result", "updated_at"])
+
+
+def _fail(job, error):
+    job.status = PipelineJob.FAILED
+    job.error = error
+    if job.stage in job.progress:
+        job.progress[job.stage]["status"] = PipelineJob.FAILED
+    job.save(update_fields=["status", "error", "progress", "updated_at"])
+
+
+def job_payload(job):
+    """Serializes a job for the status endpoint."""
+    payload = {
+        "job_id": str(job.id),
+        "video_id": job.video_id,
+        "status": job.status,
+        "stage": job.stage,
+        "progress": {stage: job.progress.get(stage, {"status": PipelineJob.QUEUED}) for stage in STAGES},
+        "created_at": job.created_at.isoformat(),
+        "updated_at": job.updated_at.isoformat(),
+    }
+    if job.status == PipelineJob.SUCCEEDED:
+        payload["summary"] = job.result.get("summary")
+        payload["optimized_content"] = job.result.get("optimized_content")
+    if job.status == PipelineJob.FAILED:
+        payload["error"] = job.error
+    return payload
@@ -0,0 +1,193 @@
+import re
+import json
+import time
+import random
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import caches
+from . import clients
+from . import rate_limit
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+CHARS_PER_TOKEN = 4  # Estimate used when tiktoken isn't installed
+
+_encodings = {}
+
+
+class LLMError(Exception):
+    pass
+
+
+# Token accounting
+def _encoding(model):
+    if model not in _encodings:
+        try:
+            import tiktoken
+            try:
+                _encodings[model] = tiktoken.encoding_for_model(model)
+            except KeyError:
+                _encodings[model] = tiktoken.get_encoding("o200k_base")
+        except ImportError:
+            _encodings[model] = None
+    return _encodings[model]
+
+
+def count_tokens(text, model=None):
+    encoding = _encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def trim_to_budget(text, max_tokens, model=None):
+    """Cuts ``text`` to at most ``max_tokens`` tokens, at a sentence or word boundary where possible."""
+    if max_tokens <= 0:
+        return ""
+    if count_tokens(text, model) <= max_tokens:
+        return text
+    encoding = _encoding(model or settings.OPENAI_MODEL)
+    if encoding is None:
+        trimmed = text[:max_tokens * CHARS_PER_TOKEN]
+    else:
+        trimmed = encoding.decode(encoding.encode(text)[:max_tokens])
+    boundary = max(trimmed.rfind(". "), trimmed.rfind("\n"))
+    if boundary < len(trimmed) // 2:
+        boundary = trimmed.rfind(" ")
+    if boundary > 0:
+        trimmed = trimmed[:boundary + 1]
+    metrics.inc("openai_prompt_trimmed_total")
+    return trimmed.strip()
+
+
+# Rate limiting
+def acquire(prompt_tokens):
+    """Blocks until both the request and the token rate limits allow another call."""
+    limits = [
+        ("openai:requests", 1, settings.LLM_REQUESTS_PER_MINUTE),
+        ("openai:tokens", prompt_tokens + settings.LLM_MAX_COMPLETION_TOKENS, settings.LLM_TOKENS_PER_MINUTE),
+    ]
+    for name, amount, per_minute in limits:
+        if not per_minute:
+            continue
+        waited = 0.0
+        while True:
+            delay = rate_limit.take(name, amount, per_minute)
+            if not delay:
+                break
+            waited += delay
+            time.sleep(delay)
+        if waited:
+            metrics.observe("openai_rate_limit_wait_seconds", waited, limit=name)
+
+
+# Requests
+def _retry_delay(error, attempt):
+    headers = getattr(error, "headers", None) or {}
+    retry_after = headers.get("retry-after") or headers.get("Retry-After")
+    if retry_after:
+        try:
+            return min(float(retry_after), settings.LLM_BACKOFF_MAX)
+        except ValueError:
+            pass
+    delay = min(settings.LLM_BACKOFF_BASE * 2 ** attempt, settings.LLM_BACKOFF_MAX)
+    return delay * random.uniform(0.5, 1)
+
+
+def _retryable(openai_module, error):
+    if isinstance(error, (openai_module.error.Timeout, openai_module.error.APIConnectionError,
+                          openai_module.error.ServiceUnavailableError, openai_module.error.TryAgain)):
+        return True
+    return getattr(error, "http_status", None) in RETRY_STATUSES
+
+
+def create(messages, model=None, json_mode=False, **options):
+    """Calls ChatCompletion.create under the rate limits, with exponential backoff on 429/5xx."""
+    openai_module = clients.openai()
+    model = model or settings.OPENAI_MODEL
+    prompt_tokens = sum(count_tokens(message["content"], model) for message in messages)
+    options.setdefault("max_tokens", settings.LLM_MAX_COMPLETION_TOKENS)
+    options.setdefault("request_timeout", settings.LLM_REQUEST_TIMEOUT)
+    if json_mode:
+        options["response_format"] = {"type": "json_object"}
+
+    for attempt in range(settings.LLM_MAX_RETRIES + 1):
+        acquire(prompt_tokens)
+        try:
+            return openai_module.ChatCompletion.create(model=model, messages=messages, **options)
+        except openai_module.error.OpenAIError as e:
+            if attempt == settings.LLM_MAX_RETRIES or not _retryable(openai_module, e):
+                raise
+            delay = _retry_delay(e, attempt)
+            metrics.inc("openai_retries_total", status=str(getattr(e, "http_status", None) or type(e).__name__))
+            logger.error(f"OpenAI request failed ({e}), retrying in {delay:.1f}s")
+            time.sleep(delay)
+
+
+def _record_usage(response):
+    usage = response.get("usage") or {}
+    metrics.inc("openai_tokens_total", usage.get("prompt_tokens", 0), direction="prompt")
+    metrics.inc("openai_tokens_total", usage.get("completion_tokens", 0), direction="completion")
+
+
+# Structured output
+FENCE = re.compile(r"```(?:json)?\s*(.*?)```", re.S)
+
+
+def parse_json(text):
+    """Parses a JSON object from a model reply, tolerating markdown fences and surrounding prose."""
+    text = text.strip()
+    candidates = [text] + FENCE.findall(text)
+    start, end = text.find("{"), text.rfind("}")
+    if 0 <= start < end:
+        candidates.append(text[start:end + 1])
+    for candidate in candidates:
+        try:
+            return json.loads(candidate.strip())
+        except ValueError:
+            continue
+    raise LLMError(f"Reply is not valid JSON: {text[:200]}")
+
+
+def _cache_key(model, messages, json_mode):
+    payload = json.dumps({"model": model, "messages": messages, "json_mode": json_mode}, sort_keys=True)
+    return "llm:" + hashlib.sha256(payload.encode()).hexdigest()
+
+
+def chat_json(messages, model=None, use_cache=None):
+    """Returns the parsed JSON reply for ``messages``.
+
+    Replies are cached by a hash of the model and prompt. Transport errors
+    are retried inside ``create``; an unparseable reply asks for a new
+    completion up to ``LLM_PARSE_RETRIES`` times.
+    """
+    model = model or settings.OPENAI_MODEL
+    json_mode = settings.LLM_JSON_MODE
+    use_cache = settings.LLM_RESPONSE_CACHE if use_cache is None else use_cache
+    key = _cache_key(model, messages, json_mode)
+    cache = caches[settings.RESULT_CACHE_ALIAS]
+    if use_cache:
+        cached = cache.get(key)
+        if cached is not None:
+            metrics.inc("openai_cache_requests_total", outcome="hit")
+            return cached
+        metrics.inc("openai_cache_requests_total", outcome="miss")
+
+    for attempt in range(settings.LLM_PARSE_RETRIES + 1):
+        response = create(messages, model, json_mode=json_mode)
+        _record_usage(response)
+        try:
+            result = parse_json(response["choices"][0]["message"]["content"])
+            break
+        except LLMError as e:
+            if attempt == settings.LLM_PARSE_RETRIES:
+                raise
+            metrics.inc("openai_parse_retries_total")
+            logger.error(f"{e}; requesting a new completion")
+
+    if use_cache:
+        cache.set(key, result, timeout=settings.LLM_CACHE_TTL or None)
+    return result
@@ -0,0 +1,343 @@
+import os
+import sys
+import json
+import time
+import resource
+import platform
+import tempfile
+import threading
+import statistics
+import subprocess
+from pathlib import Path
+from unittest import mock
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.test import override_settings
+
+DEFAULT_FIXTURES = Path(settings.BASE_DIR) / "benchmarks" / "fixtures"
+DEFAULT_AUDIO_SECONDS = [15, 60, 180]  # Lengths of the clips generated when no recorded audio is given
+AUDIO_SUFFIXES = {".wav", ".mp3", ".m4a", ".webm", ".ogg", ".flac"}
+
+
+def reset_peak_rss():
+    """Resets this process's peak RSS to its current RSS (Linux 4.0+), so the next reading covers one stage."""
+    try:
+        with open("/proc/self/clear_refs", "w") as f:
+            f.write("5")
+        return True
+    except OSError:
+        return False
+
+
+def peak_rss_mb():
+    """Peak RSS since the last ``reset_peak_rss()``, or since the process started."""
+    try:
+        with open("/proc/self/status") as f:
+            for line in f:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    # ru_maxrss is in KB on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * (len(ordered) - 1))))
+    return ordered[index]
+
+
+class StageTimer:
+    """Times each stage and records the process's peak RSS while it ran.
+
+    The peak is reset before every run where the kernel allows it; elsewhere
+    it is the high-water mark since startup, so only the first stage to reach
+    it is told apart.
+    """
+
+    def __init__(self):
+        self.samples = {}
+        self.units = {}
+        self.rss = {}
+        self.peak = peak_rss_mb()
+
+    def measure(self, fn, *args):
+        """Returns ``fn(*args)``, its duration in seconds and the peak RSS in MB while it ran."""
+        reset_peak_rss()
+        started = time.perf_counter()
+        result = fn(*args)
+        elapsed = time.perf_counter() - started
+        rss = peak_rss_mb()
+        self.peak = max(self.peak, rss)
+        return result, elapsed, rss
+
+    def run(self, stage, fn, *args, units=1):
+        result, elapsed, rss = self.measure(fn, *args)
+        self.samples.setdefault(stage, []).append(elapsed)
+        self.units[stage] = self.units.get(stage, 0) + units
+        self.rss[stage] = max(self.rss.get(stage, 0), rss)
+        return result
+
+    def report(self):
+        report = {}
+        for stage, samples in self.samples.items():
+            total = sum(samples)
+            report[stage] = {
+                "runs": len(samples),
+                "p50_ms": percentile(samples, 50) * 1000,
+                "p90_ms": percentile(samples, 90) * 1000,
+                "p99_ms": percentile(samples, 99) * 1000,
+                "mean_ms": statistics.mean(samples) * 1000,
+                "throughput_per_s": self.units[stage] / total if total else None,
+                "peak_rss_mb": self.rss[stage],
+            }
+        return report
+
+
+# Offline stand-ins for the network services
+class FixtureTranscript:
+    def __init__(self, segments):
+        self.is_generated = False
+        self.language_code = "en"
+        self._segments = segments
+
+    def fetch(self):
+        return self._segments
+
+
+class FixtureTranscriptList(list):
+    def find_generated_transcript(self, languages):
+        return None
+
+
+class FixtureTranscriptApi:
+    """Serves saved caption JSON (``captions/<video_id>.json``) in place of YouTubeTranscriptApi."""
+
+    def __init__(self, captions_dir):
+        self.captions_dir = captions_dir
+
+    def list_transcripts(self, video_id):
+        path = self.captions_dir / f"{video_id}.json"
+        if not path.exists():
+            raise LookupError(f"No caption fixture for {video_id}")
+        return FixtureTranscriptList([FixtureTranscript(json.loads(path.read_text()))])
+
+
+def start_fake_openai(response_content, latency):
+    """Starts a local server answering OpenAI chat completion requests with a canned reply."""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            body = json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+            prompt = " ".join(message.get("content", "") for message in body.get("messages", []))
+            time.sleep(latency)
+            payload = json.dumps({
+                "id": "bench",
+                "object": "chat.completion",
+                "model": body.get("model"),
+                "choices": [{"index": 0, "message": {"role": "assistant", "content": response_content}, "finish_reason": "stop"}],
+                "usage": {"prompt_tokens": len(prompt.split()), "completion_tokens": len(response_content.split())},
+            }).encode()
+            self.send_response(200)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def generate_audio_clips(directory, lengths):
+    """Writes one 16 kHz mono WAV per length in seconds with ffmpeg and returns their paths.
+
+    The clips are a gliding tone over pink noise: they exercise decoding and
+    the model's forward passes, not transcript quality. Recorded speech
+    (``--audio`` or the fixtures' ``audio/``) is used instead when present.
+    """
+    clips = []
+    for seconds in lengths:
+        path = Path(directory) / f"generated_{seconds:g}s.wav"
+        tone = f"aevalsrc='0.3*sin(2*PI*(200+100*sin(t))*t)':s=16000:d={seconds:g}"
+        noise = f"anoisesrc=color=pink:amplitude=0.05:r=16000:d={seconds:g}"
+        try:
+            subprocess.run(
+                ["ffmpeg", "-v", "error", "-y", "-f", "lavfi", "-i", tone, "-f", "lavfi", "-i", noise,
+                 "-filter_complex", "amix=inputs=2", "-ac", "1", "-ar", "16000", str(path)],
+                check=True, capture_output=True,
+            )
+        except FileNotFoundError:
+            raise CommandError("ffmpeg is needed to generate audio clips: pass --audio, add clips to audio/ or pass --skip-whisper.")
+        except subprocess.CalledProcessError as e:
+            raise CommandError(f"Could not generate a {seconds:g}s audio clip: {e.stderr.decode().strip()}")
+        clips.append(path)
+    return clips
+
+
+def compare(baseline, current, threshold):
+    """Returns printable lines and whether any stage's p50 regressed by more than ``threshold`` percent."""
+    lines, regressed = [], False
+    for stage, stats in current["stages"].items():
+        before = baseline["stages"].get(stage)
+        if not before:
+            lines.append(f"{stage}: new stage, p50 {stats['p50_ms']:.1f}ms")
+            continue
+        change = (stats["p50_ms"] - before["p50_ms"]) / before["p50_ms"] * 100 if before["p50_ms"] else 0
+        flag = ""
+        if change > threshold:
+            flag, regressed = "  REGRESSION", True
+        rss = ""
+        if "peak_rss_mb" in before:
+            rss = f", peak RSS {before['peak_rss_mb']:.0f}MB -> {stats['peak_rss_mb']:.0f}MB"
+        lines.append(f"{stage}: p50 {before['p50_ms']:.1f}ms -> {stats['p50_ms']:.1f}ms ({change:+.1f}%){rss}{flag}")
+    audio = baseline.get("settings", {}).get("audio"), current["settings"].get("audio")
+    if audio[0] != audio[1]:
+        lines.append(f"audio: {audio[0]} -> {audio[1]}, transcribe_file timings are not comparable")
+    rss_change = current["peak_rss_mb"] - baseline["peak_rss_mb"]
+    lines.append(f"peak RSS: {baseline['peak_rss_mb']:.0f}MB -> {current['peak_rss_mb']:.0f}MB ({rss_change:+.0f}MB)")
+    return lines, regressed
+
+
+class Command(BaseCommand):
+    help = "Benchmarks every pipeline stage offline against recorded fixtures and optionally compares with a previous run."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--fixtures", default=str(DEFAULT_FIXTURES),
+                            help="Directory with urls.txt, captions/<id>.json, audio/* and openai_response.json")
+        parser.add_argument("--repeat", type=int, default=3)
+        parser.add_argument("--openai-latency", type=float, default=0.0, help="Seconds the fake OpenAI server waits per call")
+        parser.add_argument("--output", help="Write the results as JSON to this path")
+        parser.add_argument("--compare", help="Previous results JSON to compare against")
+        parser.add_argument("--max-regression", type=float, default=10.0,
+                            help="Fail when a stage's p50 is this many percent slower than the baseline")
+        parser.add_argument("--skip-whisper", action="store_true")
+        parser.add_argument("--audio", help="Directory of recorded speech clips to transcribe, instead of the fixtures' audio/")
+        parser.add_argument("--audio-seconds", type=float, nargs="+", default=DEFAULT_AUDIO_SECONDS,
+                            help="Lengths of the synthetic clips generated with ffmpeg when no recorded audio is found")
+
+    def handle(self, *args, **options):
+        # Never reach out to the Hugging Face hub; models must already be cached locally
+        os.environ.setdefault("HF_HUB_OFFLINE", "1")
+        os.environ.setdefault("TRANSFORMERS_OFFLINE", "1")
+
+        from app import views, clients, transcription
+        from app.model_registry import registry
+
+        fixtures = Path(options["fixtures"])
+        if not fixtures.is_dir():
+            raise CommandError(f"Fixture directory not found: {fixtures}")
+        urls = [line.strip() for line in (fixtures / "urls.txt").read_text().splitlines() if line.strip()]
+        audio_dir = Path(options["audio"]) if options["audio"] else fixtures / "audio"
+        if options["audio"] and not audio_dir.is_dir():
+            raise CommandError(f"Audio directory not found: {audio_dir}")
+        audio_clips = sorted(path for path in audio_dir.glob("*") if path.suffix.lower() in AUDIO_SUFFIXES) if audio_dir.is_dir() else []
+        audio_source = "recorded" if audio_clips else None
+        response_content = (fixtures / "openai_response.json").read_text()
+
+        timer = StageTimer()
+        model_load, model_load_rss = {}, {}
+        server = start_fake_openai(response_content, options["openai_latency"])
+        api_base = f"http://127.0.0.1:{server.server_port}/v1"
+        generated = tempfile.TemporaryDirectory()
+
+        try:
+            if not audio_clips and not options["skip_whisper"]:
+                self.stderr.write(f"No recorded audio in {audio_dir}, transcribing synthetic clips; timings won't reflect real speech.")
+                audio_clips = generate_audio_clips(generated.name, options["audio_seconds"])
+                audio_source = "synthetic"
+            # The transcript store and reply cache would turn every repeat after the first into a lookup
+            with override_settings(OPENAI_API_BASE=api_base, TRANSCRIPT_STORE=False, LLM_RESPONSE_CACHE=False,
+                                   LLM_REQUESTS_PER_MINUTE=0, LLM_TOKENS_PER_MINUTE=0), \
+                    mock.patch.object(views, "YouTubeTranscriptApi", FixtureTranscriptApi(fixtures / "captions")):
+                clients.reset()
+
+                for _ in range(options["repeat"]):
+                    for url in urls:
+                        timer.run("extract_video_id", views.extract_video_id, url)
+
+                transcripts = []
+                for url in urls:
+                    video_id = views.extract_video_id(url)
+                    for _ in range(options["repeat"]):
+                        transcript = timer.run("fetch_transcript", views.fetch_transcript, video_id)
+                    if transcript:
+                        transcripts.append(transcript)
+
+                if audio_clips and not options["skip_whisper"]:
+                    _, model_load["whisper"], model_load_rss["whisper"] = timer.measure(registry.whisper)
+                    for clip in audio_clips:
+                        duration = _clip_seconds(clip)
+                        for _ in range(options["repeat"]):
+                            result = timer.run("transcribe_file", transcription.transcribe_file, str(clip), units=duration)
+                        if result["text"].strip():
+                            transcripts.append(result["text"])
+
+                if not transcripts:
+                    raise CommandError("No transcripts: add caption fixtures or audio clips.")
+
+                _, model_load["summarizer"], model_load_rss["summarizer"] = timer.measure(registry.summarizer)
+                summaries = []
+                for transcript in transcripts:
+                    for _ in range(options["repeat"]):
+                        summary = timer.run("summarize_text", views.summarize_text, transcript)
+                    summaries.append(summary)
+
+                for summary in summaries:
+                    for _ in range(options["repeat"]):
+                        timer.run("generate_optimized_content", views.generate_optimized_content, summary)
+        finally:
+            server.shutdown()
+            clients.reset()
+            generated.cleanup()
+
+        results = {
+            "host": {"python": sys.version.split()[0], "platform": platform.platform(), "cpus": os.cpu_count()},
+            "settings": {"whisper": settings.WHISPER_MODEL_SIZE, "summarizer": settings.SUMMARIZER_MODEL,
+                         "whisper_parallel": settings.WHISPER_PARALLEL, "audio": None if options["skip_whisper"] else audio_source},
+            "stages": timer.report(),
+            "model_load_s": model_load,
+            "model_load_peak_rss_mb": model_load_rss,
+            "peak_rss_mb": max(timer.peak, peak_rss_mb()),
+        }
+        self._print(results)
+
+        if options["output"]:
+            Path(options["output"]).write_text(json.dumps(results, indent=2))
+        if options["compare"]:
+            baseline = json.loads(Path(options["compare"]).read_text())
+            lines, regressed = compare(baseline, results, options["max_regression"])
+            self.stdout.write("\nCompared with " + options["compare"])
+            for line in lines:
+                self.stdout.write(line)
+            if regressed:
+                raise CommandError("Performance regression detected.")
+
+    def _print(self, results):
+        self.stdout.write(f"{'stage':<28}{'runs':>6}{'p50 ms':>12}{'p90 ms':>12}{'p99 ms':>12}{'per s':>12}{'peak MB':>10}")
+        for stage, stats in results["stages"].items():
+            throughput = stats["throughput_per_s"]
+            self.stdout.write(
+                f"{stage:<28}{stats['runs']:>6}{stats['p50_ms']:>12.1f}{stats['p90_ms']:>12.1f}{stats['p99_ms']:>12.1f}"
+                f"{throughput if throughput is not None else 0:>12.2f}{stats['peak_rss_mb']:>10.0f}"
+            )
+        for model, seconds in results["model_load_s"].items():
+            self.stdout.write(f"model load {model}: {seconds:.1f}s, peak RSS {results['model_load_peak_rss_mb'][model]:.0f}MB")
+        self.stdout.write(f"peak RSS: {results['peak_rss_mb']:.0f}MB")
+
+
+def _clip_seconds(path):
+    """Audio length in seconds, so Whisper throughput is reported as audio seconds per wall second."""
+    output = subprocess.run(
+        ["ffprobe", "-v", "error", "-show_entries", "format=duration", "-of", "default=noprint_wrappers=1:nokey=1", str(path)],
+        capture_output=True, text=True,
+    ).stdout.strip()
+    try:
+        return float(output)
+    except ValueError:
+        return 1
@@ -0,0 +1,63 @@
+import time
+from django.core.management.base import BaseCommand, CommandError
+from app.model_registry import registry
+from app import summarization
+
+
+def summarize_char_slices(text, summarizer):
+    """The previous implementation: 1024-character slices, one pipeline call per slice."""
+    max_input_length = 1024
+    chunk_overlap = 100
+    text_chunks = [
+        text[i:i + max_input_length]
+        for i in range(0, len(text), max_input_length - chunk_overlap)
+    ]
+    summaries = [
+        summarizer(chunk, max_length=100, min_length=50, do_sample=False)[0]['summary_text']
+        for chunk in text_chunks
+    ]
+    return " ".join(summaries), len(text_chunks)
+
+
+def summarize_token_batches(text, summarizer, batch_size):
+    chunks = summarization.chunk_text(text, summarizer.tokenizer, summarization.max_input_tokens(summarizer.tokenizer))
+    return summarization.summarize(text, summarizer=summarizer, batch_size=batch_size), len(chunks)
+
+
+class Command(BaseCommand):
+    help = "Compares character-sliced and token-batched summarization on a transcript file."
+
+    def add_arguments(self, parser):
+        parser.add_argument("transcript", help="Path to a plain-text transcript")
+        parser.add_argument("--words-per-minute", type=float, default=150,
+                            help="Speaking rate used to convert the transcript length to hours of video")
+        parser.add_argument("--batch-size", type=int, default=None)
+
+    def handle(self, *args, **options):
+        try:
+            with open(options["transcript"], encoding="utf-8") as f:
+                text = f.read()
+        except OSError as e:
+            raise CommandError(f"Could not read transcript: {e}")
+
+        hours = len(text.split()) / options["words_per_minute"] / 60
+        if not hours:
+            raise CommandError("Transcript is empty.")
+
+        started = time.perf_counter()
+        summarizer = registry.summarizer()
+        self.stdout.write(f"Model load: {time.perf_counter() - started:.1f}s")
+        self.stdout.write(f"Transcript: {len(text)} chars, ~{hours:.2f} hours of speech")
+
+        runs = [
+            ("before (char slices)", lambda: summarize_char_slices(text, summarizer)),
+            ("after (token batches)", lambda: summarize_token_batches(text, summarizer, options["batch_size"])),
+        ]
+        for label, run in runs:
+            started = time.perf_counter()
+            _, chunks = run()
+            elapsed = time.perf_counter() - started
+            self.stdout.write(
+                f"{label}: {chunks} chunks, {elapsed:.1f}s, "
+                f"{chunks / hours:.1f} chunks/hour, {elapsed / hours:.1f}s/hour"
+            )
@@ -0,0 +1,111 @@
+import json
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from app.model_registry import registry
+from app import audio_stream, inference, summarization
+
+
+def _read(path):
+    try:
+        with open(path, encoding="utf-8") as f:
+            return f.read()
+    except OSError as e:
+        raise CommandError(f"Could not read {path}: {e}")
+
+
+def _timed_runs(run, repeat):
+    """Returns the last output and the best wall time over ``repeat`` runs."""
+    best, output = None, None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        output = run()
+        elapsed = time.perf_counter() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return output, best
+
+
+class Command(BaseCommand):
+    help = "Runs Whisper and the summarizer on two inference backends and reports speedup and WER/ROUGE deltas."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--audio", help="Audio file to transcribe with each Whisper backend")
+        parser.add_argument("--text", help="Transcript to summarize (defaults to the baseline transcription of --audio)")
+        parser.add_argument("--reference", help="Human transcript of --audio; WER is measured against the baseline otherwise")
+        parser.add_argument("--whisper-backends", default="torch,ctranslate2", help="Baseline and candidate, comma-separated")
+        parser.add_argument("--summarizer-backends", default="torch,onnx", help="Baseline and candidate, comma-separated")
+        parser.add_argument("--size", default=None, help="Whisper model size (default WHISPER_MODEL_SIZE)")
+        parser.add_argument("--repeat", type=int, default=1)
+        parser.add_argument("--output", help="Write the report as JSON to this path")
+
+    def handle(self, *args, **options):
+        if not options["audio"] and not options["text"]:
+            raise CommandError("Pass --audio, --text or both.")
+        report = {}
+        text = _read(options["text"]) if options["text"] else None
+
+        if options["audio"]:
+            backends = options["whisper_backends"].split(",")
+            reference = _read(options["reference"]) if options["reference"] else None
+            report["whisper"], baseline_text = self.compare_whisper(options["audio"], backends, options["size"], reference, options["repeat"])
+            text = text or baseline_text
+
+        if text:
+            backends = options["summarizer_backends"].split(",")
+            report["summarizer"] = self.compare_summarizer(text, backends, options["repeat"])
+
+        if options["output"]:
+            with open(options["output"], "w", encoding="utf-8") as f:
+                json.dump(report, f, indent=2)
+
+    def compare_whisper(self, path, backends, size, reference, repeat):
+        size = size or settings.WHISPER_MODEL_SIZE
+        results = []
+        for backend in backends:
+            started = time.perf_counter()
+            model = registry.whisper(size, backend)
+            load_seconds = time.perf_counter() - started
+            output, seconds = _timed_runs(
+                lambda: audio_stream.transcribe_windows(audio_stream.file_audio_windows(path), model), repeat,
+            )
+            results.append({"backend": backend, "load_seconds": load_seconds, "seconds": seconds, "text": output["text"]})
+            del model
+            registry.evict("whisper", size, backend)
+
+        baseline = results[0]
+        reference = reference or baseline["text"]
+        for result in results:
+            result["speedup"] = baseline["seconds"] / result["seconds"] if result["seconds"] else None
+            result["wer"] = inference.word_error_rate(reference, result["text"])
+        for result in results:
+            result["wer_delta"] = result["wer"] - baseline["wer"]
+        self._print(f"Whisper {size}", results, ["wer", "wer_delta"])
+        return results, baseline["text"]
+
+    def compare_summarizer(self, text, backends, repeat):
+        results = []
+        for backend in backends:
+            started = time.perf_counter()
+            summarizer = registry.summarizer(None, backend)
+            load_seconds = time.perf_counter() - started
+            output, seconds = _timed_runs(lambda: summarization.summarize(text, summarizer=summarizer), repeat)
+            results.append({"backend": backend, "load_seconds": load_seconds, "seconds": seconds, "text": output})
+            del summarizer
+            registry.evict("summarizer", None, backend)
+
+        baseline = results[0]
+        for result in results:
+            result["speedup"] = baseline["seconds"] / result["seconds"] if result["seconds"] else None
+            result["rouge1"] = inference.rouge_n(baseline["text"], result["text"], 1)
+            result["rouge2"] = inference.rouge_n(baseline["text"], result["text"], 2)
+            result["rougeL"] = inference.rouge_l(baseline["text"], result["text"])
+        self._print(f"Summarizer {settings.SUMMARIZER_MODEL}", results, ["rouge1", "rouge2", "rougeL"])
+        return results
+
+    def _print(self, title, results, scores):
+        self.stdout.write(f"\n{title} (baseline: {results[0]['backend']})")
+        for result in results:
+            speedup = f"{result['speedup']:.2f}x" if result["speedup"] is not None else "n/a"
+            columns = [f"load {result['load_seconds']:.1f}s", f"run {result['seconds']:.2f}s", f"speedup {speedup}"]
+            columns += [f"{score} {result[score]:.3f}" for score in scores]
+            self.stdout.write(f"  {result['backend']:<12} " + ", ".join(columns))
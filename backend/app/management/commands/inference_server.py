@@ -0,0 +1,25 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from app.inference_workers import InferenceServer
+
+
+class Command(BaseCommand):
+    help = "Runs the host-wide inference workers that keep Whisper and the summarizer loaded for every Django process."
+
+    def add_arguments(self, parser):
+        parser.add_argument("--socket", default=settings.INFERENCE_SERVER_SOCKET, help="Unix socket path to listen on")
+        parser.add_argument("--whisper-workers", type=int, default=settings.INFERENCE_WHISPER_WORKERS)
+        parser.add_argument("--summarizer-workers", type=int, default=settings.INFERENCE_SUMMARIZER_WORKERS)
+        parser.add_argument("--threads", type=int, default=settings.INFERENCE_WORKER_THREADS, help="Torch threads per worker")
+
+    def handle(self, *args, **options):
+        if not options["socket"]:
+            raise CommandError("Set INFERENCE_SERVER_SOCKET or pass --socket")
+        server = InferenceServer(
+            options["socket"], options["whisper_workers"], options["summarizer_workers"], options["threads"],
+        )
+        self.stdout.write(f"Serving inference on {options['socket']}")
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            self.stdout.write("Stopping inference workers")
@@ -0,0 +1,152 @@
+import os
+import time
+import uuid
+import logging
+from contextlib import contextmanager
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+# Formats stored per video. A cached video file also carries the audio track,
+# so audio lookups fall back to it; the reverse isn't possible.
+VIDEO = "video"
+AUDIO = "audio"
+READABLE_AS = {
+    AUDIO: [AUDIO, VIDEO],
+    VIDEO: [VIDEO],
+}
+
+STALE_PART_SECONDS = 6 * 3600  # Unfinished writes older than this are left over from a crash
+
+
+
+def _directory():
+    path = settings.MEDIA_CACHE_DIR
+    os.makedirs(path, exist_ok=True)
+    return path
+
+
+def _entry_path(video_id, fmt):
+    return os.path.join(_directory(), f"{video_id}.{fmt}")
+
+
+def _count(outcome, fmt, nbytes=0):
+    metrics.inc("media_cache_requests_total", format=fmt, outcome=outcome)
+    if nbytes:
+        metrics.inc("media_cache_bytes_saved_total", nbytes, format=fmt)
+
+
+def lookup(video_id, fmt):
+    """Returns the path of a cached file usable as ``fmt`` for the video, or None.
+
+    A hit refreshes the entry's modification time, which is what LRU eviction
+    goes by, so recency is shared by every process using the directory.
+    """
+    if not settings.MEDIA_CACHE or not video_id:
+        return None
+    for stored_format in READABLE_AS[fmt]:
+        path = _entry_path(video_id, stored_format)
+        try:
+            os.utime(path)
+            size = os.path.getsize(path)
+        except FileNotFoundError:
+            continue
+        _count("hit", fmt, size)
+        return path
+    _count("miss", fmt)
+    return None
+
+
+@contextmanager
+def writing(video_id, fmt):
+    """Yields a temporary path to write a new entry to; it is published when the block exits cleanly.
+
+    The file is renamed into place atomically, so readers never see a partial
+    entry. Concurrent writers of the same entry each use their own temporary
+    file and the last rename wins. Yields None when the cache is disabled, in
+    which case the caller must provide its own file.
+    """
+    if not settings.MEDIA_CACHE or not video_id:
+        yield None
+        return
+    final_path = _entry_path(video_id, fmt)
+    # Not created here: yt-dlp skips downloads whose output file already exists
+    temp_path = os.path.join(_directory(), f".{video_id}.{fmt}.{uuid.uuid4().hex}.part")
+    try:
+        yield temp_path
+        if os.path.exists(temp_path) and os.path.getsize(temp_path):
+            os.replace(temp_path, final_path)
+            evict()
+    finally:
+        for leftover in (temp_path, temp_path + ".part"):
+            try:
+                os.remove(leftover)
+            except FileNotFoundError:
+                pass
+
+
+def evict(max_bytes=None):
+    """Deletes least recently used entries until the cache fits ``MEDIA_CACHE_MAX_BYTES``."""
+    max_bytes = settings.MEDIA_CACHE_MAX_BYTES if max_bytes is None else max_bytes
+    entries, total = [], 0
+    now = time.time()
+    with os.scandir(_directory()) as listing:
+        for entry in listing:
+            try:
+                info = entry.stat()
+            except FileNotFoundError:
+                continue
+            if entry.name.startswith("."):
+                if entry.name.endswith(".part") and now - info.st_mtime > STALE_PART_SECONDS:
+                    _remove(entry.path)
+                continue
+            entries.append((info.st_mtime, info.st_size, entry.path))
+            total += info.st_size
+
+    for _, size, path in sorted(entries):
+        if total <= max_bytes:
+            break
+        if _remove(path):
+            total -= size
+            metrics.inc("media_cache_evictions_total")
+            logger.info(f"Evicted {os.path.basename(path)} from the media cache ({size} bytes)")
+    return total
+
+
+def _remove(path):
+    try:
+        os.remove(path)
+        return True
+    except FileNotFoundError:
+        return False
+
+
+def clear(video_id=None):
+    """Removes one video's entries, or every entry."""
+    if video_id is None:
+        evict(0)
+        return
+    for fmt in READABLE_AS:
+        _remove(_entry_path(video_id, fmt))
+
+
+@metrics.collector
+def gauges():
+    """Size of the shared cache directory; hits, misses and evictions are counters."""
+    entries = total = 0
+    if os.path.isdir(settings.MEDIA_CACHE_DIR):
+        with os.scandir(settings.MEDIA_CACHE_DIR) as listing:
+            for entry in listing:
+                if entry.name.startswith("."):
+                    continue
+                try:
+                    total += entry.stat().st_size
+                    entries += 1
+                except FileNotFoundError:
+                    continue
+    return [
+        ("media_cache_entries", {}, entries),
+        ("media_cache_bytes", {}, total),
+        ("media_cache_max_bytes", {}, settings.MEDIA_CACHE_MAX_BYTES),
+    ]
@@ -0,0 +1,189 @@
+import time
+import uuid
+import bisect
+import threading
+import logging
+import contextvars
+from contextlib import contextmanager
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+trace_logger = logging.getLogger("app.trace")
+
+# Counters and histograms are plain dicts behind one lock: an update is a
+# dict lookup and an add, cheap enough to leave on in production. Values
+# are per worker process.
+_lock = threading.Lock()
+_counters = {}
+_histograms = {}
+_help = {}
+_collectors = []  # Called at render time for gauges read from live state (pools, slots, disk usage)
+
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800)
+
+_trace_id = contextvars.ContextVar("trace_id", default=None)
+
+
+def _key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def describe(name, help_text):
+    _help[name] = help_text
+
+
+def inc(name, amount=1, **labels):
+    key = (name, _key(labels))
+    with _lock:
+        _counters[key] = _counters.get(key, 0) + amount
+
+
+def observe(name, value, buckets=DEFAULT_BUCKETS, **labels):
+    key = (name, _key(labels))
+    with _lock:
+        histogram = _histograms.get(key)
+        if histogram is None:
+            histogram = _histograms[key] = {"buckets": buckets, "counts": [0] * len(buckets), "sum": 0.0, "count": 0}
+        index = bisect.bisect_left(histogram["buckets"], value)
+        if index < len(buckets):
+            histogram["counts"][index] += 1
+        histogram["sum"] += value
+        histogram["count"] += 1
+
+
+def collector(fn):
+    """Registers ``fn``, which returns ``[(name, labels, value)]`` gauge samples, to be read on every render."""
+    _collectors.append(fn)
+    return fn
+
+
+def start_trace(trace_id=None):
+    """Sets the trace id for the rest of the current task or thread."""
+    _trace_id.set(trace_id or uuid.uuid4().hex[:16])
+    return _trace_id.get()
+
+
+@contextmanager
+def trace(trace_id=None):
+    """Tags the spans recorded inside this block with one trace id."""
+    token = _trace_id.set(trace_id or uuid.uuid4().hex[:16])
+    try:
+        yield _trace_id.get()
+    finally:
+        _trace_id.reset(token)
+
+
+@contextmanager
+def timed(stage, **labels):
+    """Records how long the block took in ``pipeline_stage_seconds`` and, if enabled, logs a trace span."""
+    started = time.perf_counter()
+    outcome = "ok"
+    try:
+        yield
+    except BaseException:
+        outcome = "error"
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        observe("pipeline_stage_seconds", elapsed, stage=stage, **labels)
+        if settings.METRICS_TRACE_SPANS:
+            trace_id = _trace_id.get()
+            extra = "".join(f" {name}={value}" for name, value in labels.items())
+            trace_logger.info(f"trace={trace_id or '-'} span={stage}{extra} outcome={outcome} duration_ms={elapsed * 1000:.1f}")
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels, extra=()):
+    pairs = list(labels) + list(extra)
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+def render():
+    """Returns all metrics in the Prometheus text exposition format."""
+    with _lock:
+        counters = dict(_counters)
+        histograms = {key: dict(value, counts=list(value["counts"])) for key, value in _histograms.items()}
+
+    lines = []
+    seen = set()
+    for (name, labels), value in sorted(counters.items()):
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+
+    for (name, labels), histogram in sorted(histograms.items()):
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} histogram")
+        cumulative = 0
+        for bound, count in zip(histogram["buckets"], histogram["counts"]):
+            cumulative += count
+            lines.append(f"{name}_bucket{_format_labels(labels, [('le', bound)])} {cumulative}")
+        lines.append(f"{name}_bucket{_format_labels(labels, [('le', '+Inf')])} {histogram['count']}")
+        lines.append(f"{name}_sum{_format_labels(labels)} {histogram['sum']}")
+        lines.append(f"{name}_count{_format_labels(labels)} {histogram['count']}")
+
+    gauges = []
+    for fn in _collectors:
+        try:
+            gauges.extend((name, _key(labels), value) for name, labels, value in fn())
+        except Exception as e:
+            logger.error(f"Error collecting gauges from {fn.__module__}.{fn.__name__}: {e}")
+    for name, labels, value in sorted(gauges, key=lambda sample: sample[:2]):
+        if name not in seen:
+            seen.add(name)
+            if name in _help:
+                lines.append(f"# HELP {name} {_help[name]}")
+            lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name}{_format_labels(labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def reset():
+    with _lock:
+        _counters.clear()
+        _histograms.clear()
+
+
+describe("pipeline_stage_seconds", "Time spent in each pipeline stage.")
+describe("transcript_source_total", "Transcripts served by source (manual captions, auto captions, Whisper).")
+describe("model_loads_total", "Models loaded into the process-wide registry.")
+describe("result_cache_requests_total", "Pipeline result cache lookups by stage and outcome.")
+describe("bytes_downloaded_total", "Bytes downloaded from YouTube.")
+describe("bytes_uploaded_total", "Bytes uploaded to S3.")
+describe("openai_tokens_total", "Tokens sent to and received from OpenAI.")
+describe("transcript_store_requests_total", "Transcript store lookups by outcome (hit or miss).")
+describe("transcript_routes_total", "Transcript routing decisions by path, Whisper model and reason.")
+describe("openai_retries_total", "OpenAI requests retried, by HTTP status or error type.")
+describe("openai_parse_retries_total", "New completions requested because a reply was not valid JSON.")
+describe("openai_cache_requests_total", "OpenAI response cache lookups by outcome.")
+describe("openai_prompt_trimmed_total", "Prompts cut down to LLM_MAX_PROMPT_TOKENS.")
+describe("openai_rate_limit_wait_seconds", "Time spent waiting on the shared OpenAI rate limits.")
+describe("media_cache_requests_total", "Media cache lookups by format and outcome.")
+describe("media_cache_bytes_saved_total", "Bytes served from the media cache instead of downloaded again.")
+describe("media_cache_evictions_total", "Files evicted from the media cache to stay under MEDIA_CACHE_MAX_BYTES.")
+describe("admission_admitted_total", "Requests admitted to a cost class.")
+describe("admission_rejections_total", "Requests rejected with a 429, by cost class and reason (quota or capacity).")
+describe("admission_wait_seconds", "Time requests and jobs waited for a slot in their cost class.")
+describe("video_metadata_requests_total", "Video metadata lookups by outcome: hit (cached), revalidated (304 on ETag) or miss.")
+describe("inference_server_requests_total", "Requests sent to the host inference server, by operation and outcome.")
+describe("clients_built_total", "Shared API clients built (once per process, per thread for YouTube).")
+describe("client_pool_max_connections", "Connection pool size of each shared client.")
+describe("client_pool_open_connections", "Connections each shared client's pool has opened, per host.")
+describe("client_pool_connections_in_use", "Connections checked out of each shared client's pool, per host.")
+describe("media_cache_entries", "Files in the media cache directory.")
+describe("media_cache_bytes", "Bytes in the media cache directory.")
+describe("media_cache_max_bytes", "MEDIA_CACHE_MAX_BYTES.")
+describe("admission_in_flight", "Requests and jobs holding a slot in their cost class.")
+describe("admission_waiting", "Requests waiting for a slot in their cost class.")
+describe("admission_capacity", "Slots in each cost class.")
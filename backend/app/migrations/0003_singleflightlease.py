@@ -0,0 +1,22 @@
+# Generated by Django 5.1.3 on 2026-10-18 09:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_pipelinejob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SingleFlightLease',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.CharField(max_length=200, unique=True)),
+                ('owner', models.CharField(max_length=200)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+            ],
+        ),
+    ]
@@ -0,0 +1,78 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+# External-content FTS5 index over TranscriptSegment.text, kept in sync by triggers
+FTS_CREATE = [
+    "CREATE VIRTUAL TABLE app_transcriptsegment_fts USING fts5("
+    "text, content='app_transcriptsegment', content_rowid='id', tokenize='porter unicode61')",
+    "CREATE TRIGGER app_transcriptsegment_ai AFTER INSERT ON app_transcriptsegment BEGIN "
+    "INSERT INTO app_transcriptsegment_fts(rowid, text) VALUES (new.id, new.text); END",
+    "CREATE TRIGGER app_transcriptsegment_ad AFTER DELETE ON app_transcriptsegment BEGIN "
+    "INSERT INTO app_transcriptsegment_fts(app_transcriptsegment_fts, rowid, text) VALUES ('delete', old.id, old.text); END",
+    "CREATE TRIGGER app_transcriptsegment_au AFTER UPDATE ON app_transcriptsegment BEGIN "
+    "INSERT INTO app_transcriptsegment_fts(app_transcriptsegment_fts, rowid, text) VALUES ('delete', old.id, old.text); "
+    "INSERT INTO app_transcriptsegment_fts(rowid, text) VALUES (new.id, new.text); END",
+]
+FTS_DROP = [
+    "DROP TRIGGER IF EXISTS app_transcriptsegment_au",
+    "DROP TRIGGER IF EXISTS app_transcriptsegment_ad",
+    "DROP TRIGGER IF EXISTS app_transcriptsegment_ai",
+    "DROP TABLE IF EXISTS app_transcriptsegment_fts",
+]
+
+
+def create_fts_index(apps, schema_editor):
+    # FTS5 is SQLite-only; other databases fall back to a LIKE search (see app/transcript_store.py)
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in FTS_CREATE:
+            schema_editor.execute(statement)
+
+
+def drop_fts_index(apps, schema_editor):
+    if schema_editor.connection.vendor == "sqlite":
+        for statement in FTS_DROP:
+            schema_editor.execute(statement)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_singleflightlease'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Transcript',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(db_index=True, max_length=32)),
+                ('source', models.CharField(choices=[('manual_captions', 'Manual captions'), ('auto_captions', 'Auto-generated captions'), ('whisper', 'Whisper')], max_length=20)),
+                ('model', models.CharField(blank=True, max_length=64)),
+                ('language', models.CharField(blank=True, max_length=16)),
+                ('text', models.TextField()),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('video_id', 'source', 'model'), name='unique_transcript_per_source')],
+            },
+        ),
+        migrations.CreateModel(
+            name='TranscriptSegment',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('index', models.PositiveIntegerField()),
+                ('start', models.FloatField()),
+                ('duration', models.FloatField()),
+                ('text', models.TextField()),
+                ('transcript', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='segments', to='app.transcript')),
+            ],
+            options={
+                'ordering': ['transcript', 'index'],
+                'constraints': [models.UniqueConstraint(fields=('transcript', 'index'), name='unique_segment_index')],
+            },
+        ),
+        migrations.RunPython(create_fts_index, drop_fts_index),
+    ]
@@ -0,0 +1,33 @@
+# Generated by Django 5.1.3 on 2026-10-18 10:40
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_transcript'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='RoutingDecision',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('video_id', models.CharField(db_index=True, max_length=32)),
+                ('path', models.CharField(db_index=True, max_length=20)),
+                ('model', models.CharField(blank=True, max_length=64)),
+                ('reason', models.CharField(max_length=50)),
+                ('duration_seconds', models.FloatField(null=True)),
+                ('language', models.CharField(blank=True, max_length=16)),
+                ('queue_depth', models.PositiveIntegerField(default=0)),
+                ('estimated_seconds', models.FloatField(null=True)),
+                ('elapsed_seconds', models.FloatField(null=True)),
+                ('succeeded', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField(auto_now_add=True, db_index=True)),
+            ],
+            options={
+                'ordering': ['-created_at'],
+            },
+        ),
+    ]
@@ -0,0 +1,229 @@
+import os
+import threading
+import time
+import logging
+from collections import Counter, OrderedDict
+from contextlib import contextmanager
+from django.conf import settings
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+# Loaders for each model the pipeline uses; see app/inference.py for the backends.
+# With INFERENCE_SERVER_SOCKET set they return proxies to the host's inference
+# server (app/inference_workers.py) and no weights are loaded in this process.
+def _load_whisper(size, backend):
+    if getattr(settings, "INFERENCE_SERVER_SOCKET", ""):
+        from .inference_workers import RemoteWhisper
+        return RemoteWhisper(size, backend)
+    from .inference import load_whisper
+    return load_whisper(size, backend, getattr(settings, "WHISPER_CT2_COMPUTE_TYPE", "int8"))
+
+
+def _load_summarizer(model_name, backend):
+    if getattr(settings, "INFERENCE_SERVER_SOCKET", ""):
+        from .inference_workers import RemoteSummarizer
+        return RemoteSummarizer(model_name, backend)
+    from .inference import load_summarizer
+    return load_summarizer(model_name, backend)
+
+
+LOADERS = {
+    "whisper": _load_whisper,
+    "summarizer": _load_summarizer,
+}
+
+
+def _default_variant(kind):
+    if kind == "whisper":
+        return getattr(settings, "WHISPER_MODEL_SIZE", "large")
+    if kind == "summarizer":
+        return getattr(settings, "SUMMARIZER_MODEL", "facebook/bart-large-cnn")
+    return None
+
+
+def _default_backend(kind):
+    if kind == "whisper":
+        return getattr(settings, "WHISPER_BACKEND", "torch")
+    if kind == "summarizer":
+        return getattr(settings, "SUMMARIZER_BACKEND", "torch")
+    return "torch"
+
+
+def _available_memory_mb():
+    """Returns the free physical memory in MB, or None if the platform can't tell."""
+    try:
+        return os.sysconf("SC_AVPHYS_PAGES") * os.sysconf("SC_PAGE_SIZE") // (1024 * 1024)
+    except (ValueError, OSError, AttributeError):
+        return None
+
+
+class ModelRegistry:
+    """Process-wide cache of loaded models, keyed by (kind, variant, backend).
+
+    Models are loaded lazily on first use and shared by every thread in the
+    worker process. Least recently used models are evicted when the registry
+    holds more than ``max_loaded`` entries, when free memory drops below
+    ``min_free_mb``, or when they sit idle longer than ``idle_timeout``; a
+    background thread checks for idle models, so they are freed even when no
+    further requests arrive. Models held through ``use`` are never evicted
+    that way, or the next request would load a second copy while the first
+    is still running.
+    """
+
+    def __init__(self, max_loaded=None, idle_timeout=None, min_free_mb=None):
+        self.max_loaded = max_loaded if max_loaded is not None else getattr(settings, "MODEL_MAX_LOADED", 2)
+        self.idle_timeout = idle_timeout if idle_timeout is not None else getattr(settings, "MODEL_IDLE_TIMEOUT", 0)
+        self.min_free_mb = min_free_mb if min_free_mb is not None else getattr(settings, "MODEL_MIN_FREE_MB", 0)
+        self._models = OrderedDict()
+        self._last_used = {}
+        self._in_use = Counter()
+        self._lock = threading.RLock()
+        self._load_locks = {}
+        self._reaper = None
+
+    def get(self, kind, variant=None, backend=None):
+        """Returns the model for ``kind``, loading it on first use."""
+        if getattr(settings, "WORKER_ROLE", "full") == "metadata":
+            raise RuntimeError(f"Model {kind} requested on a metadata-only worker")
+        key = self._key(kind, variant, backend)
+        kind, variant, backend = key
+
+        with self._lock:
+            if key in self._models:
+                self._touch(key)
+                return self._models[key]
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        # Only one thread loads a given model; the others wait for it.
+        with load_lock:
+            with self._lock:
+                if key in self._models:
+                    self._touch(key)
+                    return self._models[key]
+
+            self.evict_idle()
+            self._make_room()
+            logger.info(f"Loading model {kind}:{variant} ({backend})")
+            started = time.monotonic()
+            with metrics.timed("model_load", model=f"{kind}:{variant}", backend=backend):
+                model = LOADERS[kind](variant, backend)
+            metrics.inc("model_loads_total", kind=kind, variant=variant, backend=backend)
+            logger.info(f"Loaded model {kind}:{variant} ({backend}) in {time.monotonic() - started:.1f}s")
+
+            with self._lock:
+                self._models[key] = model
+                self._touch(key)
+                self._start_reaper()
+            return model
+
+    @contextmanager
+    def use(self, kind, variant=None, backend=None):
+        """Same as ``get``, holding the model for the block: it is not evicted while any thread is using it."""
+        key = self._key(kind, variant, backend)
+        with self._lock:
+            self._in_use[key] += 1
+        try:
+            yield self.get(kind, variant, backend)
+        finally:
+            with self._lock:
+                self._in_use[key] -= 1
+                if not self._in_use[key]:
+                    del self._in_use[key]
+                if key in self._models:
+                    self._touch(key)  # Idle from the end of its last use, not the start
+
+    def whisper(self, size=None, backend=None):
+        return self.get("whisper", size, backend)
+
+    def summarizer(self, model_name=None, backend=None):
+        return self.get("summarizer", model_name, backend)
+
+    def warm(self, kinds=None):
+        """Loads the given model kinds (all known kinds by default) ahead of traffic."""
+        for kind in kinds or LOADERS:
+            try:
+                self.get(kind)
+            except Exception as e:
+                logger.error(f"Error warming model {kind}: {e}")
+
+    def evict(self, kind=None, variant=None, backend=None):
+        """Drops matching models from the registry. With no arguments, drops everything."""
+        with self._lock:
+            for key in list(self._models):
+                if kind and key[0] != kind:
+                    continue
+                if variant and key[1] != variant:
+                    continue
+                if backend and key[2] != backend:
+                    continue
+                self._drop(key)
+        self._release_memory()
+
+    def evict_idle(self):
+        """Drops models that have not been used within ``idle_timeout`` seconds."""
+        if not self.idle_timeout:
+            return
+        cutoff = time.monotonic() - self.idle_timeout
+        with self._lock:
+            stale = [key for key, used in self._last_used.items() if used < cutoff and not self._in_use[key]]
+            for key in stale:
+                self._drop(key)
+        if stale:
+            self._release_memory()
+
+    def loaded(self):
+        with self._lock:
+            return list(self._models)
+
+    def _start_reaper(self):
+        if not self.idle_timeout or self._reaper is not None:
+            return
+        self._reaper = threading.Thread(target=self._reap, name="model-reaper", daemon=True)
+        self._reaper.start()
+
+    def _reap(self):
+        while True:
+            time.sleep(max(1, self.idle_timeout / 2))
+            self.evict_idle()
+
+    def _key(self, kind, variant, backend):
+        return kind, variant or _default_variant(kind), backend or _default_backend(kind)
+
+    def _evictable(self):
+        """The least recently used model no one is using, or None."""
+        return next((key for key in self._models if not self._in_use[key]), None)
+
+    def _touch(self, key):
+        self._models.move_to_end(key)
+        self._last_used[key] = time.monotonic()
+
+    def _drop(self, key):
+        logger.info(f"Evicting model {key[0]}:{key[1]} ({key[2]})")
+        self._models.pop(key, None)
+        self._last_used.pop(key, None)
+
+    def _make_room(self):
+        with self._lock:
+            while self._evictable() and self.max_loaded and len(self._models) >= self.max_loaded:
+                self._drop(self._evictable())
+            if self.min_free_mb:
+                free_mb = _available_memory_mb()
+                while self._evictable() and free_mb is not None and free_mb < self.min_free_mb:
+                    self._drop(self._evictable())
+                    self._release_memory()
+                    free_mb = _available_memory_mb()
+
+    def _release_memory(self):
+        import gc
+        gc.collect()
+        try:
+            import torch
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+
+registry = ModelRegistry()
@@ -1,3 +1,4 @@
+import uuid
 from django.db import models
 
 # Create your models here.
@@ -5,3 +6,119 @@ class React(models.Model):
     employee=models.CharField(max_length=30)
     department=models.CharField(max_length=200)
 
+
+class PipelineJob(models.Model):
+    """A queued or running /api/generate-video/ request."""
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+    STATUS_CHOICES = [
+        (QUEUED, "Queued"),
+        (RUNNING, "Running"),
+        (SUCCEEDED, "Succeeded"),
+        (FAILED, "Failed"),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    video_url = models.CharField(max_length=500)
+    video_id = models.CharField(max_length=32, db_index=True)
+    status = models.CharField(max_length=20, choices=STATUS_CHOICES, default=QUEUED, db_index=True)
+    stage = models.CharField(max_length=50, blank=True)
+    progress = models.JSONField(default=dict)  # {stage: {"status": ..., "started_at": ..., "finished_at": ...}}
+    result = models.JSONField(default=dict)  # Stage outputs, filled in as each stage finishes
+    error = models.TextField(blank=True)
+    owner = models.CharField(max_length=100, blank=True)  # Process that claimed the job (see jobs.claim)
+    heartbeat_at = models.DateTimeField(null=True, blank=True, db_index=True)  # Refreshed by the owner while the job is active
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ["created_at"]
+
+    def __str__(self):
+        return f"{self.video_id} ({self.status})"
+
+
+class SingleFlightLease(models.Model):
+    """Cross-process lock so only one worker runs a given operation on a video at a time."""
+    key = models.CharField(max_length=200, unique=True)
+    owner = models.CharField(max_length=200)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.key} held by {self.owner}"
+
+
+class Transcript(models.Model):
+    """A stored transcript of a video, one per source (and Whisper model size)."""
+    MANUAL_CAPTIONS = "manual_captions"
+    AUTO_CAPTIONS = "auto_captions"
+    WHISPER = "whisper"
+    SOURCE_CHOICES = [
+        (MANUAL_CAPTIONS, "Manual captions"),
+        (AUTO_CAPTIONS, "Auto-generated captions"),
+        (WHISPER, "Whisper"),
+    ]
+
+    video_id = models.CharField(max_length=32, db_index=True)
+    source = models.CharField(max_length=20, choices=SOURCE_CHOICES)
+    model = models.CharField(max_length=64, blank=True)  # Whisper model size; empty for captions
+    language = models.CharField(max_length=16, blank=True)
+    text = models.TextField()
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=["video_id", "source", "model"], name="unique_transcript_per_source"),
+        ]
+
+    def __str__(self):
+        return f"{self.video_id} ({self.source}{' ' + self.model if self.model else ''})"
+
+
+class TranscriptSegment(models.Model):
+    """One timed line of a transcript. Indexed for full-text search by the app_transcriptsegment_fts table."""
+    transcript = models.ForeignKey(Transcript, on_delete=models.CASCADE, related_name="segments")
+    index = models.PositiveIntegerField()
+    start = models.FloatField()  # Seconds from the start of the video
+    duration = models.FloatField()
+    text = models.TextField()
+
+    class Meta:
+        ordering = ["transcript", "index"]
+        constraints = [
+            models.UniqueConstraint(fields=["transcript", "index"], name="unique_segment_index"),
+        ]
+
+
+class RoutingDecision(models.Model):
+    """Which transcript path the router picked for a video, and how it went (see app/routing.py)."""
+    video_id = models.CharField(max_length=32, db_index=True)
+    path = models.CharField(max_length=20, db_index=True)  # manual_captions, auto_captions or whisper
+    model = models.CharField(max_length=64, blank=True)  # Whisper model size
+    reason = models.CharField(max_length=50)
+    duration_seconds = models.FloatField(null=True)
+    language = models.CharField(max_length=16, blank=True)
+    queue_depth = models.PositiveIntegerField(default=0)
+    estimated_seconds = models.FloatField(null=True)
+    elapsed_seconds = models.FloatField(null=True)
+    succeeded = models.BooleanField(default=False)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ["-created_at"]
+
+    def __str__(self):
+        return f"{self.video_id} -> {self.path}{' ' + self.model if self.model else ''}"
+
+
+class RateLimitBucket(models.Model):
+    """Token bucket shared by every worker process (see app/llm.py)."""
+    name = models.CharField(max_length=100, unique=True)
+    tokens = models.FloatField()
+    updated_at = models.FloatField()  # Unix time of the last refill
+
+    def __str__(self):
+        return f"{self.name}: {self.tokens:.0f}"
@@ -0,0 +1,51 @@
+import time
+from django.db import IntegrityError
+from django.db.models import F, Value
+from django.db.models.functions import Least
+from .models import RateLimitBucket
+
+# Token buckets kept in the database, so every worker process draws from the same budget
+
+# Every bucket refills completely within a minute, and a full bucket behaves
+# exactly like a missing one, so rows idle longer than that can be deleted.
+# Per-client admission buckets would otherwise pile up for every IP ever seen.
+IDLE_SECONDS = 120
+PRUNE_INTERVAL = 300  # Seconds between prunes in each process
+
+_last_prune = 0.0
+
+
+def prune(now=None):
+    """Deletes buckets nobody has drawn from in ``IDLE_SECONDS``. Returns how many were deleted."""
+    now = time.time() if now is None else now
+    deleted, _ = RateLimitBucket.objects.filter(updated_at__lt=now - IDLE_SECONDS).delete()
+    return deleted
+
+
+def take(name, amount, per_minute):
+    """Takes ``amount`` from a shared bucket refilled at ``per_minute``. Returns seconds to wait, 0 if taken."""
+    global _last_prune
+    capacity = float(per_minute)
+    rate = capacity / 60
+    amount = min(amount, capacity)
+    now = time.time()
+    if now - _last_prune >= PRUNE_INTERVAL:
+        _last_prune = now
+        prune(now)
+    refilled = Least(Value(capacity), F("tokens") + (Value(now) - F("updated_at")) * Value(rate))
+    # One conditional UPDATE, so concurrent workers can never both spend the same tokens
+    taken = RateLimitBucket.objects.filter(
+        name=name, tokens__gte=Value(amount) - (Value(now) - F("updated_at")) * Value(rate),
+    ).update(tokens=refilled - Value(amount), updated_at=now)
+    if taken:
+        return 0
+    try:
+        bucket = RateLimitBucket.objects.get(name=name)
+    except RateLimitBucket.DoesNotExist:
+        try:
+            RateLimitBucket.objects.create(name=name, tokens=capacity - amount, updated_at=now)
+            return 0
+        except IntegrityError:
+            return 0.01  # Another worker created it first; try again
+    available = min(capacity, bucket.tokens + (now - bucket.updated_at) * rate)
+    return max(0.01, (amount - available) / rate)
@@ -0,0 +1,154 @@
+import hashlib
+import threading
+import time
+import logging
+from collections import OrderedDict, defaultdict
+from django.conf import settings
+from django.core.cache import caches
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Small thread-safe in-process LRU with per-entry expiry."""
+
+    def __init__(self, max_entries, ttl):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return _MISSING
+            value, expires_at = entry
+            if expires_at and expires_at < time.monotonic():
+                del self._data[key]
+                return _MISSING
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+
+def _version(*parts):
+    return hashlib.sha1("|".join(str(part) for part in parts).encode()).hexdigest()[:12]
+
+
+class ResultCache:
+    """Per-stage pipeline results, keyed by video id and the versions that produced them.
+
+    Lookups go to the in-process LRU first and then to the persistent Django
+    cache named by ``RESULT_CACHE_ALIAS``. Each stage's version folds in the
+    versions of the stages before it, so changing e.g. the OpenAI prompt only
+    invalidates the final stage.
+    """
+
+    def __init__(self):
+        self.local = LRUCache(settings.RESULT_CACHE_LOCAL_ENTRIES, settings.RESULT_CACHE_TTL)
+        self.counters = defaultdict(int)
+        self._counter_lock = threading.Lock()
+
+    @property
+    def persistent(self):
+        return caches[settings.RESULT_CACHE_ALIAS]
+
+    def stage_versions(self):
+        """Returns the cache version of every pipeline stage under the current settings."""
+        from . import views
+        # With routing on, the quality floor decides which Whisper models' transcripts may be cached
+        floor = (settings.ROUTING_MIN_WHISPER_MODEL, settings.ROUTING_MIN_WHISPER_MODEL_NON_ENGLISH) if settings.TRANSCRIPT_ROUTING else ()
+        transcript = _version("transcript", settings.WHISPER_MODEL_SIZE, settings.WHISPER_BACKEND, *floor)
+        summary = _version(transcript, settings.SUMMARIZER_MODEL, settings.SUMMARIZER_BACKEND, views.SUMMARY_VERSION)
+        optimized_content = _version(summary, views.OPENAI_MODEL, views.PROMPT_VERSION)
+        return {"transcript": transcript, "summary": summary, "optimized_content": optimized_content}
+
+    def key(self, stage, video_id):
+        return f"pipeline:{stage}:{video_id}:{self.stage_versions()[stage]}"
+
+    def get(self, stage, video_id):
+        key = self.key(stage, video_id)
+        value = self.local.get(key)
+        if value is not _MISSING:
+            self._count(stage, "local_hits")
+            return value
+
+        try:
+            value = self.persistent.get(key, _MISSING)
+        except Exception as e:
+            logger.error(f"Error reading result cache: {e}")
+            value = _MISSING
+        if value is not _MISSING:
+            self._count(stage, "persistent_hits")
+            self.local.set(key, value)
+            return value
+
+        self._count(stage, "misses")
+        return None
+
+    def set(self, stage, video_id, value):
+        if value is None:
+            return
+        key = self.key(stage, video_id)
+        self.local.set(key, value)
+        try:
+            self.persistent.set(key, value, timeout=settings.RESULT_CACHE_TTL or None)
+        except Exception as e:
+            logger.error(f"Error writing result cache: {e}")
+
+    def get_or_compute(self, stage, video_id, compute, keep=None):
+        """Returns the cached result for ``stage``, computing and storing it on a miss.
+
+        A computed value is left out of the cache when ``keep(value)`` is false.
+        """
+        value = self.get(stage, video_id)
+        if value is not None:
+            return value
+        value = compute()
+        if keep is None or keep(value):
+            self.set(stage, video_id, value)
+        return value
+
+    def invalidate(self, video_id, stages=None):
+        for stage in stages or self.stage_versions():
+            key = self.key(stage, video_id)
+            self.local.delete(key)
+            try:
+                self.persistent.delete(key)
+            except Exception as e:
+                logger.error(f"Error deleting from result cache: {e}")
+
+    def stats(self):
+        with self._counter_lock:
+            counters = dict(self.counters)
+        return {"local_entries": len(self.local), "counters": counters}
+
+    def _count(self, stage, outcome):
+        with self._counter_lock:
+            self.counters[f"{stage}.{outcome}"] += 1
+        metrics.inc("result_cache_requests_total", stage=stage, outcome=outcome)
+
+
+result_cache = ResultCache()
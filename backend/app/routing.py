@@ -0,0 +1,202 @@
+import time
+import logging
+import statistics
+from collections import namedtuple
+from django.conf import settings
+from .models import PipelineJob, RoutingDecision, Transcript
+from .segments import SegmentedTranscript
+from .concurrency import run_sync_in
+from . import metrics
+from . import transcript_store
+from . import video_metadata
+
+logger = logging.getLogger(__name__)
+
+# The chosen transcript path: "manual_captions", "auto_captions" or "whisper" (with a model size)
+Route = namedtuple("Route", ["path", "model", "reason", "estimated_seconds"])
+
+# Facts the policy decides on; transcripts are youtube_transcript_api objects or None
+VideoFacts = namedtuple("VideoFacts", ["duration_seconds", "manual", "auto", "language"])
+
+
+def video_duration(video_id):
+    from . import views
+    try:
+        metadata = video_metadata.get(video_id, views.YOUTUBE_API_KEY)
+        return metadata["duration_seconds"] if metadata else None
+    except Exception as e:
+        logger.error(f"Error fetching video duration: {e}")
+        return None
+
+
+def caption_tracks(video_id):
+    """Returns ``(manual, auto)`` caption tracks for a video; either may be None."""
+    from . import views
+    try:
+        transcript_list = views.YouTubeTranscriptApi.list_transcripts(video_id)
+    except Exception as e:
+        logger.error(f"Error listing transcripts: {e}")
+        return None, None
+    manual = next((transcript for transcript in transcript_list if not transcript.is_generated), None)
+    try:
+        auto = transcript_list.find_generated_transcript(["en"])
+    except Exception:
+        auto = next((transcript for transcript in transcript_list if transcript.is_generated), None)
+    return manual, auto
+
+
+def gather_facts(video_id):
+    duration = run_sync_in("youtube_api", video_duration, video_id)
+    manual, auto = run_sync_in("transcript_api", caption_tracks, video_id)
+    track = manual or auto
+    language = getattr(track, "language_code", "") if track else ""
+    return VideoFacts(duration, manual, auto, language)
+
+
+def queue_depth(exclude=None):
+    """Jobs queued or running, not counting the job ``exclude`` (the caller's own)."""
+    jobs = PipelineJob.objects.filter(status__in=[PipelineJob.QUEUED, PipelineJob.RUNNING])
+    if exclude is not None:
+        jobs = jobs.exclude(id=exclude)
+    return jobs.count()
+
+
+def realtime_factors():
+    """Whisper seconds per audio second for each model: measured from past runs, else the configured defaults."""
+    factors = dict(settings.WHISPER_REALTIME_FACTORS)
+    for model in settings.ROUTING_WHISPER_MODELS:
+        runs = (
+            RoutingDecision.objects
+            .filter(path=Transcript.WHISPER, model=model, succeeded=True, duration_seconds__gt=0, elapsed_seconds__isnull=False)
+            .values_list("elapsed_seconds", "duration_seconds")[:50]
+        )
+        samples = [elapsed / duration for elapsed, duration in runs]
+        if len(samples) >= settings.ROUTING_MIN_SAMPLES:
+            factors[model] = statistics.median(samples)
+    return factors
+
+
+def quality_floor(language):
+    """Index in ``ROUTING_WHISPER_MODELS`` of the smallest Whisper model accepted for a language."""
+    models = settings.ROUTING_WHISPER_MODELS
+    english = not language or language.startswith("en")
+    minimum = settings.ROUTING_MIN_WHISPER_MODEL if english else settings.ROUTING_MIN_WHISPER_MODEL_NON_ENGLISH
+    return models.index(minimum) if minimum in models else 0
+
+
+def below_floor(model, language):
+    """Whether a Whisper transcript from ``model`` was a downgrade for latency rather than an acceptable result."""
+    models = settings.ROUTING_WHISPER_MODELS
+    return model in models and models.index(model) < quality_floor(language)
+
+
+def choose(facts, depth=0, budget=None, factors=None):
+    """Picks the cheapest acceptable transcript path for a video.
+
+    Manual captions are always acceptable. Auto captions are trusted for
+    videos of at least ``ROUTING_AUTO_CAPTIONS_MIN_SECONDS``. Otherwise the
+    smallest Whisper model meeting the quality floor is used, provided it
+    finishes within the latency budget at the current queue depth. When it
+    can't, auto captions (whatever the length) or a smaller model are used
+    instead.
+    """
+    budget = budget if budget is not None else settings.ROUTING_LATENCY_BUDGET
+    factors = factors or settings.WHISPER_REALTIME_FACTORS
+
+    if facts.manual:
+        return Route(Transcript.MANUAL_CAPTIONS, "", "manual_captions", None)
+    if facts.auto and facts.duration_seconds and facts.duration_seconds >= settings.ROUTING_AUTO_CAPTIONS_MIN_SECONDS:
+        return Route(Transcript.AUTO_CAPTIONS, "", "long_video", None)
+
+    models = settings.ROUTING_WHISPER_MODELS
+    floor_index = quality_floor(facts.language)
+
+    if not facts.duration_seconds:
+        return Route(Transcript.WHISPER, models[floor_index], "unknown_duration", None)
+
+    # Queued jobs share the same model threads, so each one ahead stretches the wait
+    slowdown = 1 + depth / max(1, settings.JOB_WORKERS)
+
+    def estimate(model):
+        return facts.duration_seconds * factors.get(model, 1.0) * slowdown
+
+    floor = models[floor_index]
+    if estimate(floor) <= budget:
+        return Route(Transcript.WHISPER, floor, "within_budget", estimate(floor))
+    if facts.auto:
+        return Route(Transcript.AUTO_CAPTIONS, "", "over_budget", None)
+    for model in reversed(models[:floor_index]):
+        if estimate(model) <= budget:
+            return Route(Transcript.WHISPER, model, "downgraded", estimate(model))
+    return Route(Transcript.WHISPER, models[0], "over_budget", estimate(models[0]))
+
+
+def _timed_call(fn, *args):
+    """Runs ``fn`` and returns its result with the seconds it took, not counting time queued for a thread."""
+    started = time.perf_counter()
+    return fn(*args), time.perf_counter() - started
+
+
+def get_transcript(video_id, video_url, on_text=None, job_id=None):
+    """Returns ``(SegmentedTranscript, source, downgraded)`` along the route ``choose`` picks.
+
+    ``downgraded`` is True when Whisper ran below the quality floor to meet
+    the latency budget; such a transcript is good enough for this request but
+    must not be cached as the video's result. ``on_text`` is passed on to
+    Whisper if that is the route taken. ``job_id`` is the calling job, left
+    out of the queue depth so an idle server doesn't count its own work.
+    """
+    if settings.TRANSCRIPT_STORE:
+        try:
+            stored, source = transcript_store.load_with_source(video_id)
+        except Exception as e:
+            logger.error(f"Error reading transcript store: {e}")
+            stored = None
+        if stored:
+            metrics.inc("transcript_store_requests_total", outcome="hit")
+            return stored, source, False
+
+    facts = gather_facts(video_id)
+    depth = queue_depth(exclude=job_id)
+    route = choose(facts, depth, factors=realtime_factors())
+    transcript = run_route(video_id, video_url, facts, route, depth, on_text)
+    if not transcript and route.path != Transcript.WHISPER:
+        # The captions were listed but couldn't be fetched; route again as if there were none
+        route = choose(facts._replace(manual=None, auto=None), depth, factors=realtime_factors())._replace(reason="captions_failed")
+        transcript = run_route(video_id, video_url, facts, route, depth, on_text)
+    return transcript, route.path, route.path == Transcript.WHISPER and below_floor(route.model, facts.language)
+
+
+def run_route(video_id, video_url, facts, route, depth=0, on_text=None):
+    """Produces the transcript along ``route`` and records the decision with its outcome and timing."""
+    from . import views
+
+    decision = RoutingDecision.objects.create(
+        video_id=video_id, path=route.path, model=route.model, reason=route.reason,
+        duration_seconds=facts.duration_seconds, language=facts.language or "",
+        queue_depth=depth, estimated_seconds=route.estimated_seconds,
+    )
+    metrics.inc("transcript_routes_total", path=route.path, model=route.model or "none", reason=route.reason)
+    logger.info(f"Routing {video_id} to {route.path} {route.model} ({route.reason})")
+
+    transcript, elapsed = None, None
+    with metrics.timed("transcript_route", path=route.path, model=route.model or "none"):
+        if route.path == Transcript.WHISPER:
+            transcript, elapsed = run_sync_in("models", _timed_call, views.transcribe_segments, video_url, route.model, on_text)
+        else:
+            track = facts.manual if route.path == Transcript.MANUAL_CAPTIONS else facts.auto
+            try:
+                segments, elapsed = run_sync_in("transcript_api", _timed_call, track.fetch)
+                segments = SegmentedTranscript.from_segments(segments)
+            except Exception as e:
+                logger.error(f"Error fetching {route.path} for {video_id}: {e}")
+                segments = None
+            metrics.inc("transcript_source_total", source=route.path if segments else "unavailable")
+            if segments:
+                views.store_transcript(video_id, segments, route.path, track.language_code)
+                transcript = segments
+
+    decision.elapsed_seconds = elapsed
+    decision.succeeded = bool(transcript)
+    decision.save(update_fields=["elapsed_seconds", "succeeded"])
+    return transcript
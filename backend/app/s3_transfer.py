@@ -0,0 +1,171 @@
+import sys
+import time
+import hashlib
+import tempfile
+import threading
+import subprocess
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from django.conf import settings
+from . import clients
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+class StreamUploadError(Exception):
+    pass
+
+
+def object_exists(key, bucket=None):
+    """HEAD check for an object already in the bucket."""
+    from botocore.exceptions import ClientError
+    try:
+        clients.s3().head_object(Bucket=bucket or settings.AWS_STORAGE_BUCKET_NAME, Key=key)
+        return True
+    except ClientError as e:
+        if e.response.get("Error", {}).get("Code") in ("404", "NoSuchKey", "NotFound"):
+            return False
+        raise
+
+
+def _find_pending_upload(s3_client, bucket, key):
+    """Returns ``(upload_id, {part_number: etag})`` for an unfinished upload of ``key``, if any."""
+    response = s3_client.list_multipart_uploads(Bucket=bucket, Prefix=key)
+    uploads = [upload for upload in response.get("Uploads", []) if upload["Key"] == key]
+    if not uploads:
+        return None, {}
+    upload_id = max(uploads, key=lambda upload: upload["Initiated"])["UploadId"]
+    parts = {}
+    paginator = s3_client.get_paginator("list_parts")
+    for page in paginator.paginate(Bucket=bucket, Key=key, UploadId=upload_id):
+        for part in page.get("Parts", []):
+            parts[part["PartNumber"]] = part["ETag"].strip('"')
+    return upload_id, parts
+
+
+def _upload_part(s3_client, bucket, key, upload_id, part_number, data):
+    """Uploads one part, retrying with exponential backoff."""
+    for attempt in range(settings.S3_PART_RETRIES + 1):
+        try:
+            response = s3_client.upload_part(Bucket=bucket, Key=key, UploadId=upload_id, PartNumber=part_number, Body=data)
+            return response["ETag"].strip('"')
+        except Exception as e:
+            if attempt == settings.S3_PART_RETRIES:
+                raise
+            delay = 2 ** attempt
+            logger.error(f"Part {part_number} of {key} failed ({e}), retrying in {delay}s")
+            time.sleep(delay)
+
+
+def _download_command(video_url):
+    return [sys.executable, "-m", "yt_dlp", "--quiet", "--no-warnings", "-f", "best[ext=mp4]/best", "-o", "-", video_url]
+
+
+def _read_part(stream, size):
+    """Reads exactly ``size`` bytes unless the stream ends first."""
+    chunks, remaining = [], size
+    while remaining:
+        chunk = stream.read(remaining)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        remaining -= len(chunk)
+    return b"".join(chunks)
+
+
+def stream_upload(video_url, key, bucket=None, tee=None):
+    """Uploads a video to S3 while yt-dlp is still downloading it.
+
+    yt-dlp writes the video to stdout and each ``S3_MULTIPART_PART_SIZE``
+    block becomes a multipart part, uploaded concurrently. At most
+    ``S3_MAX_INFLIGHT_PARTS`` parts are held in memory. If an earlier
+    attempt left an unfinished upload for the same key, parts whose MD5
+    matches what S3 already has are not sent again. If ``tee`` is given,
+    every byte downloaded is also written to that file object.
+
+    A part that still fails after its retries stops the download at once;
+    the parts already stored are kept for the next attempt to resume from.
+
+    Returns the number of bytes transferred.
+    """
+    bucket = bucket or settings.AWS_STORAGE_BUCKET_NAME
+    s3_client = clients.s3()
+
+    upload_id, existing_parts = _find_pending_upload(s3_client, bucket, key)
+    if upload_id:
+        logger.info(f"Resuming multipart upload of {key} ({len(existing_parts)} parts already stored)")
+    else:
+        upload_id = s3_client.create_multipart_upload(Bucket=bucket, Key=key, ContentType="video/mp4")["UploadId"]
+
+    # stderr goes to a file: a pipe nobody reads until stdout ends stalls yt-dlp once it fills up
+    errors = tempfile.TemporaryFile()
+    download = subprocess.Popen(_download_command(video_url), stdout=subprocess.PIPE, stderr=errors)
+    inflight = threading.BoundedSemaphore(settings.S3_MAX_INFLIGHT_PARTS)
+    futures = {}
+    failures = []
+    total_bytes = 0
+    uploaded_sizes = []
+
+    def upload(part_number, data):
+        try:
+            return _upload_part(s3_client, bucket, key, upload_id, part_number, data)
+        except Exception as e:
+            failures.append(e)
+            raise
+        finally:
+            inflight.release()
+
+    executor = ThreadPoolExecutor(max_workers=settings.S3_UPLOAD_CONCURRENCY, thread_name_prefix="s3-part")
+    try:
+        try:
+            part_number = 1
+            while True:
+                inflight.acquire()
+                if failures:
+                    inflight.release()
+                    raise failures[0]
+                data = _read_part(download.stdout, settings.S3_MULTIPART_PART_SIZE)
+                if not data:
+                    inflight.release()
+                    break
+                total_bytes += len(data)
+                if tee is not None:
+                    tee.write(data)
+                etag = hashlib.md5(data).hexdigest()
+                if existing_parts.get(part_number) == etag:
+                    inflight.release()
+                    futures[part_number] = None
+                else:
+                    futures[part_number] = executor.submit(upload, part_number, data)
+                    uploaded_sizes.append(len(data))
+                part_number += 1
+        finally:
+            # Parts not started yet are dropped if the loop stopped on a failure
+            executor.shutdown(wait=True, cancel_futures=True)
+
+        download.wait()
+        if download.returncode:
+            errors.seek(0)
+            raise StreamUploadError(f"yt-dlp failed: {errors.read().decode(errors='replace').strip()}")
+        if not futures:
+            raise StreamUploadError("yt-dlp produced no data.")
+
+        parts = [
+            {"PartNumber": number, "ETag": future.result() if future else existing_parts[number]}
+            for number, future in sorted(futures.items())
+        ]
+        s3_client.complete_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id, MultipartUpload={"Parts": parts})
+        metrics.inc("bytes_downloaded_total", total_bytes, source="yt_dlp")
+        metrics.inc("bytes_uploaded_total", sum(uploaded_sizes), destination="s3")
+        return total_bytes
+
+    except StreamUploadError:
+        # The download itself failed; the stored parts can't be trusted to resume from
+        s3_client.abort_multipart_upload(Bucket=bucket, Key=key, UploadId=upload_id)
+        raise
+    finally:
+        if download.poll() is None:
+            download.kill()
+            download.wait()
+        errors.close()
@@ -0,0 +1,210 @@
+import sys
+import bisect
+import struct
+from array import array
+
+# to_bytes layout: header, then start times, end times, text start and text
+# end offsets (8-byte little-endian values), then the UTF-8 text. The header
+# is 16 bytes so the arrays stay 8-byte aligned for from_bytes to view in place.
+_HEADER = struct.Struct("<4sIQ")
+_MAGIC = b"SEG1"
+
+
+def _little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+
+def _view(data, offset, count, typecode):
+    """A zero-copy view of ``count`` values in ``data`` starting at byte ``offset``."""
+    view = data[offset:offset + count * 8].cast(typecode)
+    if sys.byteorder == "big":
+        values = array(typecode, view)
+        values.byteswap()
+        view = memoryview(values)
+    return view
+
+
+class Segment:
+    """One segment of a ``SegmentedTranscript``, read from its shared buffers on access."""
+
+    __slots__ = ("_transcript", "_index")
+
+    def __init__(self, transcript, index):
+        self._transcript = transcript
+        self._index = index
+
+    @property
+    def start(self):
+        return self._transcript._starts[self._index]
+
+    @property
+    def end(self):
+        return self._transcript._ends[self._index]
+
+    @property
+    def duration(self):
+        return self.end - self.start
+
+    @property
+    def text(self):
+        transcript = self._transcript
+        return transcript._text[transcript._text_starts[self._index]:transcript._text_ends[self._index]]
+
+    def as_dict(self):
+        """The caption shape youtube_transcript_api returns: ``text``, ``start`` and ``duration``."""
+        return {"text": self.text, "start": self.start, "duration": self.duration}
+
+    def __repr__(self):
+        return f"Segment({self.start:.2f}-{self.end:.2f}, {self.text[:40]!r})"
+
+
+class SegmentedTranscript:
+    """A transcript kept as one text buffer plus per-segment times and text offsets.
+
+    The joined ``text`` is built once, with one space between segments, and
+    segments read their text out of it by offset. Start/end times and offsets
+    are ``array`` buffers seen through memoryviews, so slicing by index, time
+    or token window returns a view over the same buffers without copying.
+    """
+
+    __slots__ = ("_text", "_starts", "_ends", "_text_starts", "_text_ends")
+
+    def __init__(self, text, starts, ends, text_starts, text_ends):
+        self._text = text
+        self._starts = memoryview(starts)
+        self._ends = memoryview(ends)
+        self._text_starts = memoryview(text_starts)
+        self._text_ends = memoryview(text_ends)
+
+    @classmethod
+    def from_segments(cls, segments):
+        """Builds a transcript from caption entries (``text``, ``start``, ``duration``)
+        or Whisper segments (``text``, ``start``, ``end``). Blank segments are dropped.
+        """
+        texts = []
+        starts, ends = array("d"), array("d")
+        for segment in segments:
+            text = segment["text"].strip()
+            if not text:
+                continue
+            start = float(segment.get("start", 0))
+            if "duration" in segment:
+                end = start + float(segment["duration"])
+            else:
+                end = float(segment.get("end", start))
+            texts.append(text)
+            starts.append(start)
+            ends.append(end)
+
+        text_starts, text_ends = array("q"), array("q")
+        position = 0
+        for text in texts:
+            text_starts.append(position)
+            position += len(text)
+            text_ends.append(position)
+            position += 1
+        return cls(" ".join(texts), starts, ends, text_starts, text_ends)
+
+    @classmethod
+    def from_whisper(cls, result):
+        return cls.from_segments(result.get("segments") or [])
+
+    # Sequence access
+    def __len__(self):
+        return len(self._starts)
+
+    def __iter__(self):
+        return (Segment(self, index) for index in range(len(self)))
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            start, stop, step = index.indices(len(self))
+            if step != 1:
+                raise ValueError("SegmentedTranscript slices must be contiguous")
+            return SegmentedTranscript(
+                self._text, self._starts[start:stop], self._ends[start:stop],
+                self._text_starts[start:stop], self._text_ends[start:stop],
+            )
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("segment index out of range")
+        return Segment(self, index)
+
+    def __bool__(self):
+        return len(self) > 0
+
+    def __repr__(self):
+        return f"SegmentedTranscript({len(self)} segments, {self.start:.2f}-{self.end:.2f})" if self else "SegmentedTranscript(empty)"
+
+    # Derived values
+    @property
+    def text(self):
+        """The segments' text joined by single spaces."""
+        if not self:
+            return ""
+        return self._text[self._text_starts[0]:self._text_ends[-1]]
+
+    @property
+    def start(self):
+        return self._starts[0] if self else 0.0
+
+    @property
+    def end(self):
+        return max(self._ends) if self else 0.0
+
+    def as_dicts(self):
+        return [segment.as_dict() for segment in self]
+
+    # Views
+    def between(self, start, end):
+        """Segments starting at or after ``start`` and before ``end`` (seconds)."""
+        return self[bisect.bisect_left(self._starts, start):bisect.bisect_left(self._starts, end)]
+
+    def windows(self, max_tokens, count_tokens):
+        """Yields consecutive views of at most ``max_tokens`` tokens as counted by ``count_tokens(text)``.
+
+        Segments are never split, so a single segment over the budget is a window of its own.
+        """
+        first, used = 0, 0
+        for index, segment in enumerate(self):
+            tokens = count_tokens(segment.text)
+            if index > first and used + tokens > max_tokens:
+                yield self[first:index]
+                first, used = index, 0
+            used += tokens
+        if first < len(self):
+            yield self[first:]
+
+    # Serialization
+    def to_bytes(self):
+        text = self.text.encode("utf-8")
+        base = self._text_starts[0] if self else 0
+        arrays = [
+            array("d", self._starts), array("d", self._ends),
+            array("q", (offset - base for offset in self._text_starts)),
+            array("q", (offset - base for offset in self._text_ends)),
+        ]
+        return b"".join([_HEADER.pack(_MAGIC, len(self), len(text))] + [_little_endian(values).tobytes() for values in arrays] + [text])
+
+    @classmethod
+    def from_bytes(cls, data):
+        """Reads ``to_bytes`` output; the time and offset arrays are views into ``data``, not copies."""
+        data = memoryview(data)
+        magic, count, text_length = _HEADER.unpack_from(data)
+        if magic != _MAGIC:
+            raise ValueError("Not a serialized SegmentedTranscript")
+        offset = _HEADER.size
+        views = []
+        for typecode in ("d", "d", "q", "q"):
+            views.append(_view(data, offset, count, typecode))
+            offset += count * 8
+        text = str(data[offset:offset + text_length], "utf-8")
+        return cls(text, *views)
+
+    def __reduce__(self):
+        # memoryviews don't pickle; the byte form is also what result caches and worker processes get
+        return (SegmentedTranscript.from_bytes, (self.to_bytes(),))
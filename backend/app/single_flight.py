@@ -0,0 +1,121 @@
+import os
+import time
+import uuid
+import socket
+import threading
+import logging
+from datetime import timedelta
+from contextlib import contextmanager
+from django.conf import settings
+from django.db import IntegrityError, transaction, close_old_connections
+from django.utils import timezone
+from .models import SingleFlightLease
+
+logger = logging.getLogger(__name__)
+
+
+class SingleFlightTimeout(Exception):
+    pass
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+_flights = {}
+_flights_lock = threading.Lock()
+
+
+def run(operation, video_id, fn, timeout=None):
+    """Runs ``fn`` at most once at a time per (operation, video id).
+
+    Threads in this process that ask for the same key while it is running
+    wait for the first caller, up to ``timeout`` seconds (default
+    SINGLE_FLIGHT_WAIT_TIMEOUT), and share its result or exception. Across
+    worker processes, callers queue on a lease row in the database; ``fn``
+    should therefore look for an existing result first (result cache, S3
+    HEAD) so a caller that got the lease after another process finished
+    just picks that result up.
+    """
+    key = f"{operation}:{video_id}"
+    timeout = timeout if timeout is not None else settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    with _flights_lock:
+        flight = _flights.get(key)
+        leader = flight is None
+        if leader:
+            flight = _flights[key] = _Flight()
+
+    if not leader:
+        logger.debug(f"Waiting for in-flight {key}")
+        if not flight.done.wait(timeout):
+            raise SingleFlightTimeout(f"Timed out waiting for in-flight {key}")
+        if flight.error:
+            raise flight.error
+        return flight.result
+
+    try:
+        with lease(key, timeout=timeout):
+            flight.result = fn()
+        return flight.result
+    except BaseException as e:
+        flight.error = e
+        raise
+    finally:
+        with _flights_lock:
+            _flights.pop(key, None)
+        flight.done.set()
+
+
+def _owner():
+    return f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+
+
+def _try_acquire(key, owner, ttl):
+    now = timezone.now()
+    expires_at = now + timedelta(seconds=ttl)
+    try:
+        with transaction.atomic():
+            SingleFlightLease.objects.create(key=key, owner=owner, expires_at=expires_at)
+        return True
+    except IntegrityError:
+        # Take over a lease whose holder died without releasing it
+        return SingleFlightLease.objects.filter(key=key, expires_at__lt=now).update(owner=owner, expires_at=expires_at) == 1
+
+
+@contextmanager
+def lease(key, ttl=None, timeout=None):
+    """Holds the database lease for ``key``, waiting for another process to release it first.
+
+    The lease is renewed in the background while held, so a live holder never
+    loses it; a crashed holder's lease expires after ``ttl`` seconds.
+    """
+    ttl = ttl or settings.SINGLE_FLIGHT_LEASE_SECONDS
+    timeout = timeout if timeout is not None else settings.SINGLE_FLIGHT_WAIT_TIMEOUT
+    owner = _owner()
+    deadline = time.monotonic() + timeout
+    while not _try_acquire(key, owner, ttl):
+        if time.monotonic() > deadline:
+            raise SingleFlightTimeout(f"Timed out waiting for {key}")
+        time.sleep(settings.SINGLE_FLIGHT_POLL_INTERVAL)
+
+    stop = threading.Event()
+
+    def renew():
+        while not stop.wait(ttl / 3):
+            try:
+                SingleFlightLease.objects.filter(key=key, owner=owner).update(expires_at=timezone.now() + timedelta(seconds=ttl))
+            except Exception as e:
+                logger.error(f"Error renewing lease {key}: {e}")
+        close_old_connections()
+
+    renewer = threading.Thread(target=renew, name=f"lease-{key}", daemon=True)
+    renewer.start()
+    try:
+        yield
+    finally:
+        stop.set()
+        renewer.join()
+        SingleFlightLease.objects.filter(key=key, owner=owner).delete()
@@ -0,0 +1,163 @@
+import json
+import time
+import asyncio
+import threading
+import logging
+from django.conf import settings
+from . import summarization
+from .result_cache import result_cache
+from .concurrency import run_in, run_sync_in
+from . import llm
+from . import single_flight
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+
+def format_event(event, data):
+    """Formats one Server-Sent Event."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+class StreamCancelled(Exception):
+    pass
+
+
+async def pipeline_events(video_url, video_id):
+    """Async generator of SSE messages for one video.
+
+    Each blocking step runs on its dependency's executor (see
+    ``concurrency``), with metadata and transcript listing fetched
+    concurrently. Chunk summaries and OpenAI tokens produced inside worker
+    threads are handed back to the event loop through a queue. If the client
+    disconnects, the worker threads stop at the next chunk or token.
+    """
+    from . import views
+
+    loop = asyncio.get_running_loop()
+    queue = asyncio.Queue()
+    cancelled = threading.Event()
+
+    def emit_threadsafe(event, data):
+        if cancelled.is_set():
+            raise StreamCancelled()
+        loop.call_soon_threadsafe(queue.put_nowait, (event, data))
+
+    async def drain(task):
+        """Yields queued events until ``task`` finishes, then returns its result."""
+        task = asyncio.ensure_future(task)
+        while True:
+            getter = asyncio.ensure_future(queue.get())
+            done, _ = await asyncio.wait({task, getter}, return_when=asyncio.FIRST_COMPLETED)
+            if getter in done:
+                yield format_event(*getter.result())
+                continue
+            getter.cancel()
+            while not queue.empty():
+                yield format_event(*queue.get_nowait())
+            return
+
+    # Each ASGI request runs in its own task, so the trace id stays with this request
+    metrics.start_trace()
+    try:
+        metadata, (transcript, source) = await asyncio.gather(
+            run_in("youtube_api", _safe_metadata, video_id),
+            _cached_transcript(video_id),
+        )
+        yield format_event("metadata", {"video_id": video_id, **(metadata or {})})
+
+        if not transcript:
+            yield format_event("transcript_source", {"source": "whisper"})
+            # Wait for another caller's run on a plain thread, not a "models" thread: with
+            # MODEL_CONCURRENCY=1 a waiting follower would hold the thread the leader needs
+            transcript = await asyncio.to_thread(
+                single_flight.run, "transcript", video_id,
+                lambda: result_cache.get_or_compute(
+                    "transcript", video_id, lambda: run_sync_in("models", views.transcribe_segments, video_url)
+                ),
+            )
+            source = "whisper"
+            if not transcript:
+                yield format_event("error", {"error": "Could not fetch or transcribe the video."})
+                return
+        else:
+            yield format_event("transcript_source", {"source": source})
+
+        summary = result_cache.get("summary", video_id)
+        if not summary:
+            def on_chunk(index, total, chunk_summary):
+                emit_threadsafe("chunk_summary", {"index": index, "total": total, "summary": chunk_summary})
+
+            summarize = asyncio.ensure_future(run_in("models", summarization.summarize, transcript, on_chunk=on_chunk))
+            async for event in drain(summarize):
+                yield event
+            try:
+                summary = await summarize
+            except Exception as e:
+                logger.error(f"Error summarizing text: {e}")
+                yield format_event("error", {"error": "Error summarizing transcript."})
+                return
+            result_cache.set("summary", video_id, summary)
+        yield format_event("summary", {"summary": summary})
+
+        optimized_content = result_cache.get("optimized_content", video_id)
+        if not optimized_content:
+            generate = asyncio.ensure_future(run_in("openai", stream_optimized_content, summary, emit_threadsafe))
+            async for event in drain(generate):
+                yield event
+            optimized_content = await generate
+            if not optimized_content:
+                yield format_event("error", {"error": "Error generating optimized content."})
+                return
+            result_cache.set("optimized_content", video_id, optimized_content)
+        yield format_event("optimized_content", optimized_content)
+        yield format_event("done", {})
+    except Exception as e:
+        logger.exception("Unexpected error in streaming pipeline")
+        yield format_event("error", {"error": f"Unexpected error: {e}"})
+    finally:
+        # Don't wait for worker threads here: they stop on their own at the next emit
+        cancelled.set()
+
+
+def _safe_metadata(video_id):
+    from . import views
+    try:
+        return views.get_video_metadata(video_id)
+    except Exception as e:
+        logger.error(f"Error fetching video metadata: {e}")
+        return None
+
+
+async def _cached_transcript(video_id):
+    """Returns ``(transcript, source)`` from the result cache or YouTube captions."""
+    from . import views
+    transcript = result_cache.get("transcript", video_id)
+    if transcript:
+        return transcript, "cache"
+    transcript, source = await run_in("transcript_api", views.fetch_segments_with_source, video_id)
+    if transcript:
+        result_cache.set("transcript", video_id, transcript)
+    return transcript, source
+
+
+def stream_optimized_content(summary, emit):
+    """Streams the OpenAI reply token by token and returns the parsed JSON."""
+    from . import views
+
+    parts = []
+    try:
+        started = time.perf_counter()
+        response = llm.create(views.optimization_messages(summary), json_mode=settings.LLM_JSON_MODE, stream=True)
+        for chunk in response:
+            content = chunk['choices'][0].get('delta', {}).get('content')
+            if content:
+                parts.append(content)
+                emit("token", {"content": content})
+        metrics.observe("pipeline_stage_seconds", time.perf_counter() - started, stage="openai")
+        return llm.parse_json("".join(parts))
+    except StreamCancelled:
+        raise
+    except Exception as e:
+        logger.error(f"Error generating optimized content: {e}")
+        return None
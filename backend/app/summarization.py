@@ -0,0 +1,266 @@
+import re
+import queue
+import logging
+from contextlib import nullcontext
+from django.conf import settings
+from .concurrency import submit_in
+from .model_registry import registry
+from .segments import SegmentedTranscript
+
+logger = logging.getLogger(__name__)
+
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_sentences(text):
+    return [sentence for sentence in SENTENCE_END.split(text.strip()) if sentence]
+
+
+def max_input_tokens(tokenizer):
+    """Token budget for one chunk, leaving room for the special tokens the model adds."""
+    limit = min(tokenizer.model_max_length, settings.SUMMARIZER_MAX_INPUT_TOKENS)
+    return limit - tokenizer.num_special_tokens_to_add()
+
+
+def chunk_text(text, tokenizer, max_tokens):
+    """Packs whole sentences into chunks of at most ``max_tokens`` tokens.
+
+    Sentences longer than the budget (e.g. unpunctuated auto-captions) are
+    split on token boundaries instead of characters, so no word is cut in half.
+    """
+    chunks = []
+    current, current_tokens = [], 0
+
+    def flush():
+        nonlocal current, current_tokens
+        if current:
+            chunks.append(" ".join(current))
+        current, current_tokens = [], 0
+
+    for sentence in split_sentences(text):
+        ids = tokenizer.encode(sentence, add_special_tokens=False)
+        if len(ids) > max_tokens:
+            flush()
+            for start in range(0, len(ids), max_tokens):
+                chunks.append(tokenizer.decode(ids[start:start + max_tokens]).strip())
+            continue
+        if current_tokens + len(ids) > max_tokens:
+            flush()
+        current.append(sentence)
+        current_tokens += len(ids)
+    flush()
+    return chunks
+
+
+def chunk_segments(transcript, tokenizer, max_tokens):
+    """Chunks a ``SegmentedTranscript`` along segment boundaries.
+
+    Each segment is tokenized once on its own, and each chunk is one slice of
+    the transcript's text buffer rather than sentences split out and joined
+    again. Segments longer than the budget are cut by ``chunk_text``.
+    """
+    def count_tokens(text):
+        return len(tokenizer.encode(text, add_special_tokens=False))
+
+    chunks = []
+    for window in transcript.windows(max_tokens, count_tokens):
+        if len(window) == 1 and count_tokens(window.text) > max_tokens:
+            chunks.extend(chunk_text(window.text, tokenizer, max_tokens))
+        else:
+            chunks.append(window.text)
+    return chunks
+
+
+def chunk(transcript, tokenizer, max_tokens):
+    """Chunks a transcript given as a ``SegmentedTranscript`` or plain text."""
+    if isinstance(transcript, SegmentedTranscript):
+        return chunk_segments(transcript, tokenizer, max_tokens)
+    return chunk_text(transcript, tokenizer, max_tokens)
+
+
+def iter_chunk_summaries(chunks, summarizer, batch_size=None, max_length=100, min_length=50):
+    """Yields one summary per chunk, running the pipeline a padded batch at a time."""
+    batch_size = batch_size or settings.SUMMARIZER_BATCH_SIZE
+    for start in range(0, len(chunks), batch_size):
+        outputs = summarizer(
+            chunks[start:start + batch_size],
+            batch_size=batch_size,
+            truncation=True,
+            max_length=max_length,
+            min_length=min_length,
+            do_sample=False,
+        )
+        for output in outputs:
+            yield output['summary_text']
+
+
+def summarize_chunks(chunks, summarizer, batch_size=None, max_length=100, min_length=50):
+    """Summarizes all chunks in padded batches through the pipeline."""
+    return list(iter_chunk_summaries(chunks, summarizer, batch_size, max_length, min_length))
+
+
+def _held(summarizer):
+    """The given summarizer, or the registry's, held for the block so it isn't evicted mid-summary."""
+    return nullcontext(summarizer) if summarizer else registry.use("summarizer")
+
+
+def summarize(text, summarizer=None, batch_size=None, max_length=100, min_length=50, on_chunk=None, levels=None):
+    """Summarizes a transcript of any length, given as a ``SegmentedTranscript`` or plain text.
+
+    Chunks are summarized as a batch and joined. When the joined summary is
+    still longer than ``SUMMARIZER_REDUCE_TOKENS`` (very long transcripts),
+    it is chunked and summarized again until it fits, at most ``levels``
+    times in all. ``on_chunk(index, total, summary)`` is called as each
+    first-level chunk summary completes.
+    """
+    with _held(summarizer) as summarizer:
+        tokenizer = summarizer.tokenizer
+        max_tokens = max_input_tokens(tokenizer)
+        levels = settings.SUMMARIZER_MAX_REDUCE_LEVELS + 1 if levels is None else levels
+
+        summary = text
+        for level in range(levels):
+            chunks = chunk(summary, tokenizer, max_tokens)
+            logger.debug(f"Summarizing {len(chunks)} chunks at level {level}")
+            summaries = []
+            for chunk_summary in iter_chunk_summaries(chunks, summarizer, batch_size, max_length, min_length):
+                summaries.append(chunk_summary)
+                if on_chunk and level == 0:
+                    on_chunk(len(summaries) - 1, len(chunks), chunk_summary)
+            summary = " ".join(summaries)
+            if len(chunks) <= 1 or len(tokenizer.encode(summary, add_special_tokens=False)) <= settings.SUMMARIZER_REDUCE_TOKENS:
+                break
+        return summary
+
+
+def summarize_many(texts, summarizer=None, batch_size=None, max_length=100, min_length=50):
+    """Summarizes several transcripts (``SegmentedTranscript`` or text), sharing pipeline batches across them.
+
+    The first-level chunks of every transcript go through the model
+    together, so short videos fill out each other's batches. Transcripts
+    whose joined summary is still too long are then reduced one by one.
+    """
+    with _held(summarizer) as summarizer:
+        tokenizer = summarizer.tokenizer
+        max_tokens = max_input_tokens(tokenizer)
+
+        owners, chunks = [], []
+        for index, text in enumerate(texts):
+            for text_chunk in chunk(text, tokenizer, max_tokens):
+                owners.append(index)
+                chunks.append(text_chunk)
+
+        summaries = [[] for _ in texts]
+        for owner, chunk_summary in zip(owners, iter_chunk_summaries(chunks, summarizer, batch_size, max_length, min_length)):
+            summaries[owner].append(chunk_summary)
+
+        results = []
+        for parts in summaries:
+            summary = " ".join(parts)
+            if len(parts) > 1 and len(tokenizer.encode(summary, add_special_tokens=False)) > settings.SUMMARIZER_REDUCE_TOKENS:
+                summary = summarize(summary, summarizer, batch_size, max_length, min_length)
+            results.append(summary)
+        return results
+
+
+# Summarizing while the transcript is still being produced
+def summarize_stream(pieces, summarizer=None, batch_size=None, max_length=100, min_length=50, on_chunk=None):
+    """Summarizes text that arrives piece by piece, e.g. transcript segments as Whisper finishes them.
+
+    Each chunk is summarized as soon as enough text has built up behind it,
+    so only the last chunk and the reduce step are left once the final piece
+    arrives. Chunks are cut the way ``chunk_text`` cuts the whole text: the
+    trailing, possibly unfinished sentence always waits for more text.
+    ``on_chunk(index, summary)`` is called as each chunk summary completes.
+    """
+    with _held(summarizer) as summarizer:
+        tokenizer = summarizer.tokenizer
+        max_tokens = max_input_tokens(tokenizer)
+        summaries = []
+
+        def summarize_ready(chunks):
+            for chunk_summary in iter_chunk_summaries(chunks, summarizer, batch_size, max_length, min_length):
+                summaries.append(chunk_summary)
+                if on_chunk:
+                    on_chunk(len(summaries) - 1, chunk_summary)
+
+        buffer, buffered_tokens = "", 0
+        for piece in pieces:
+            piece = piece.strip()
+            if not piece:
+                continue
+            buffer = f"{buffer} {piece}" if buffer else piece
+            buffered_tokens += len(tokenizer.encode(piece, add_special_tokens=False))
+            if buffered_tokens <= max_tokens:
+                continue
+            *ready, buffer = chunk_text(buffer, tokenizer, max_tokens)
+            buffered_tokens = len(tokenizer.encode(buffer, add_special_tokens=False))
+            if ready:
+                summarize_ready(ready)
+        if buffer:
+            summarize_ready(chunk_text(buffer, tokenizer, max_tokens))
+
+        summary = " ".join(summaries)
+        if len(summaries) > 1 and len(tokenizer.encode(summary, add_special_tokens=False)) > settings.SUMMARIZER_REDUCE_TOKENS:
+            summary = summarize(summary, summarizer, batch_size, max_length, min_length, levels=settings.SUMMARIZER_MAX_REDUCE_LEVELS)
+        return summary
+
+
+class SummaryCancelled(Exception):
+    pass
+
+
+_END = object()
+
+
+class BackgroundSummary:
+    """Runs ``summarize_stream`` over the text passed to ``feed``, on the "summarizer_overlap" executor.
+
+    At most ``SUMMARIZER_OVERLAP_QUEUE`` pieces wait in between, so ``feed``
+    blocks once the transcriber is that far ahead of the summarizer, or
+    while every overlap thread is busy with other jobs' summaries.
+    """
+
+    def __init__(self, summarizer=None, on_chunk=None):
+        self.pieces = queue.Queue(maxsize=settings.SUMMARIZER_OVERLAP_QUEUE)
+        self.summary = None
+        self.error = None
+        self.cancelled = False
+        self.ended = False
+        self.future = submit_in("summarizer_overlap", self._run, summarizer, on_chunk)
+
+    def _pieces(self):
+        while True:
+            piece = self.pieces.get()
+            if piece is _END:
+                self.ended = True
+                return
+            if self.cancelled:
+                raise SummaryCancelled()
+            yield piece
+
+    def _run(self, summarizer, on_chunk):
+        try:
+            self.summary = summarize_stream(self._pieces(), summarizer, on_chunk=on_chunk)
+        except Exception as e:
+            self.error = e
+            # Keep taking pieces until the end marker so feed() never blocks on a dead consumer
+            while not self.ended:
+                self.ended = self.pieces.get() is _END
+
+    def feed(self, text):
+        if self.error is None and not self.cancelled:
+            self.pieces.put(text)
+
+    def finish(self):
+        """Waits for the summary of everything fed so far and returns it."""
+        self.pieces.put(_END)
+        self.future.result()
+        if self.error:
+            raise self.error
+        return self.summary
+
+    def cancel(self):
+        self.cancelled = True
+        if not self.future.cancel():
+            self.pieces.put(_END)  # Already running: it drains up to the end marker and stops
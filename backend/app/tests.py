@@ -1,3 +1,1401 @@
-from django.test import TestCase
+import os
+import sys
+import json
+import time
+import tempfile
+import threading
+import subprocess
+from unittest import mock, skipUnless
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from django.conf import settings
+from django.test import SimpleTestCase, TestCase, TransactionTestCase
 
-# Create your tests here.
+try:
+    from moto import mock_aws
+except ImportError:
+    mock_aws = None
+
+# Modules that must only be imported by the pipeline stage that uses them
+HEAVY_MODULES = ["torch", "whisper", "transformers", "numpy", "boto3", "botocore", "yt_dlp", "googleapiclient.discovery", "openai"]
+
+STARTUP_PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import django
+django.setup()
+import app.urls
+import backend.urls
+print(json.dumps({"seconds": time.perf_counter() - started, "modules": sorted(sys.modules)}))
+"""
+
+
+class StartupImportTests(SimpleTestCase):
+    """Guards the cost of starting a worker: Django setup plus the URLconf, in a fresh interpreter."""
+
+    def run_probe(self, **env):
+        env = dict(os.environ, DJANGO_SETTINGS_MODULE="backend.settings", MODEL_WARM_ON_STARTUP="False", **env)
+        env.setdefault("YOUTUBE_API_KEY", "test")
+        env.setdefault("OPENAI_API_KEY", "test")
+        result = subprocess.run(
+            [sys.executable, "-c", STARTUP_PROBE],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True,
+        )
+        self.assertEqual(result.returncode, 0, result.stderr)
+        return json.loads(result.stdout.strip().splitlines()[-1])
+
+    def test_heavy_dependencies_are_lazy(self):
+        modules = set(self.run_probe()["modules"])
+        self.assertEqual([name for name in HEAVY_MODULES if name in modules], [])
+
+    def test_startup_within_budget(self):
+        seconds = self.run_probe()["seconds"]
+        self.assertLess(seconds, settings.IMPORT_TIME_BUDGET, f"Startup took {seconds:.2f}s")
+
+    def test_metadata_worker_refuses_models(self):
+        from .model_registry import ModelRegistry
+        with self.settings(WORKER_ROLE="metadata"):
+            with self.assertRaises(RuntimeError):
+                ModelRegistry().get("whisper")
+
+
+class ModelRegistryTests(SimpleTestCase):
+    def test_idle_models_are_evicted_without_further_requests(self):
+        from . import model_registry
+        registry = model_registry.ModelRegistry(idle_timeout=1)
+        with mock.patch.dict(model_registry.LOADERS, fake=lambda variant, backend: object()):
+            registry.get("fake")
+        self.assertEqual(len(registry.loaded()), 1)
+        deadline = time.monotonic() + 10
+        while registry.loaded() and time.monotonic() < deadline:
+            time.sleep(0.1)
+        self.assertEqual(registry.loaded(), [])
+
+    def test_models_in_use_are_not_evicted(self):
+        from . import model_registry
+        registry = model_registry.ModelRegistry(max_loaded=1, idle_timeout=0.05)
+        loader = lambda variant, backend: object()
+        with mock.patch.dict(model_registry.LOADERS, fake=loader, other=loader):
+            with registry.use("fake") as model:
+                time.sleep(0.1)
+                registry.evict_idle()
+                registry.get("other")  # Over max_loaded, but only the idle model can make room
+                self.assertIs(registry.get("fake"), model)
+            self.assertEqual(len(registry.loaded()), 2)
+            time.sleep(0.1)
+            registry.evict_idle()
+        self.assertEqual(registry.loaded(), [])
+
+
+class MockOpenAI:
+    """Local chat completions server that plays back ``(status, content)`` replies in order."""
+
+    def __init__(self, replies):
+        self.replies = list(replies)
+        self.requests = []
+        mock = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_POST(self):
+                mock.requests.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+                status, content = mock.replies.pop(0)
+                if status == 200:
+                    body = {"choices": [{"index": 0, "message": {"role": "assistant", "content": content}}],
+                            "usage": {"prompt_tokens": 10, "completion_tokens": 5}}
+                else:
+                    body = {"error": {"message": content, "type": "server_error"}}
+                payload = json.dumps(body).encode()
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(payload)))
+                if status == 429:
+                    self.send_header("Retry-After", "0")
+                self.end_headers()
+                self.wfile.write(payload)
+
+            def log_message(self, *args):
+                pass
+
+        self.server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.api_base = f"http://127.0.0.1:{self.server.server_port}/v1"
+
+
+class LLMClientTests(TestCase):
+    REPLY = {"title": "T", "description": "D", "keywords": ["k"], "tags": ["t"]}
+
+    def chat(self, replies, **overrides):
+        from . import clients, llm
+        mock = MockOpenAI(replies)
+        self.addCleanup(mock.server.shutdown)
+        self.addCleanup(clients.reset)
+        clients.reset()
+        options = dict(OPENAI_API_BASE=mock.api_base, LLM_BACKOFF_BASE=0, LLM_RESPONSE_CACHE=False)
+        options.update(overrides)
+        with self.settings(**options):
+            result = llm.chat_json([{"role": "user", "content": "Describe this video."}])
+        return result, mock
+
+    def test_retries_rate_limited_and_server_errors(self):
+        result, mock = self.chat([(429, "slow down"), (503, "busy"), (200, json.dumps(self.REPLY))])
+        self.assertEqual(result, self.REPLY)
+        self.assertEqual(len(mock.requests), 3)
+
+    def test_parses_reply_wrapped_in_markdown(self):
+        result, _ = self.chat([(200, "Here you go:\n```json\n" + json.dumps(self.REPLY) + "\n```")])
+        self.assertEqual(result, self.REPLY)
+
+    def test_requests_new_completion_when_reply_is_not_json(self):
+        result, mock = self.chat([(200, "Sorry, I can't."), (200, json.dumps(self.REPLY))])
+        self.assertEqual(result, self.REPLY)
+        self.assertEqual(len(mock.requests), 2)
+
+    def test_caches_replies_by_prompt(self):
+        from django.core.cache import caches
+        self.addCleanup(caches["default"].clear)
+        self.chat([(200, json.dumps(self.REPLY))], LLM_RESPONSE_CACHE=True, RESULT_CACHE_ALIAS="default")
+        result, mock = self.chat([], LLM_RESPONSE_CACHE=True, RESULT_CACHE_ALIAS="default")
+        self.assertEqual(result, self.REPLY)
+        self.assertEqual(mock.requests, [])
+
+    def test_metrics_export_connection_pool_usage(self):
+        self.chat([(200, json.dumps(self.REPLY))], OPENAI_MAX_POOL_CONNECTIONS=3)
+        body = self.client.get("/metrics").content.decode()
+        self.assertIn("# TYPE client_pool_max_connections gauge", body)
+        self.assertIn('client_pool_max_connections{client="openai"} 3', body)
+        self.assertIn('client_pool_open_connections{client="openai",host="127.0.0.1"} 1', body)
+        self.assertIn('client_pool_connections_in_use{client="openai",host="127.0.0.1"} 0', body)
+
+    def test_trims_prompt_to_budget(self):
+        from . import llm
+        text = "One sentence here. " * 500
+        trimmed = llm.trim_to_budget(text, 50)
+        self.assertLessEqual(llm.count_tokens(trimmed), 50)
+        self.assertTrue(trimmed.endswith("."))
+
+    def test_shared_bucket_blocks_when_empty(self):
+        from . import rate_limit
+        self.assertEqual(rate_limit.take("test", 60, 60), 0)
+        self.assertGreater(rate_limit.take("test", 30, 60), 0)
+
+    def test_prunes_idle_buckets(self):
+        from . import rate_limit
+        from .models import RateLimitBucket
+        rate_limit.take("idle", 1, 60)
+        rate_limit.take("busy", 1, 60)
+        RateLimitBucket.objects.filter(name="idle").update(updated_at=time.time() - rate_limit.IDLE_SECONDS - 1)
+        self.assertEqual(rate_limit.prune(), 1)
+        self.assertEqual(list(RateLimitBucket.objects.values_list("name", flat=True)), ["busy"])
+
+
+class MetricsTests(SimpleTestCase):
+    def setUp(self):
+        from . import metrics
+        metrics.reset()
+        self.addCleanup(metrics.reset)
+
+    def lines(self):
+        from . import metrics
+        return metrics.render().splitlines()
+
+    def test_counters(self):
+        from . import metrics
+        metrics.inc("bytes_uploaded_total", 5, destination="s3")
+        metrics.inc("bytes_uploaded_total", 5, destination="s3")
+        metrics.inc("bytes_uploaded_total", 1, destination="disk")
+        lines = self.lines()
+        start = lines.index("# HELP bytes_uploaded_total Bytes uploaded to S3.")
+        self.assertEqual(lines[start:start + 4], [
+            "# HELP bytes_uploaded_total Bytes uploaded to S3.",
+            "# TYPE bytes_uploaded_total counter",
+            'bytes_uploaded_total{destination="disk"} 1',
+            'bytes_uploaded_total{destination="s3"} 10',
+        ])
+
+    def test_histograms_are_cumulative(self):
+        from . import metrics
+        metrics.observe("test_seconds", 0.3, buckets=(0.1, 0.5, 1), stage="x")
+        metrics.observe("test_seconds", 2, buckets=(0.1, 0.5, 1), stage="x")
+        self.assertEqual(self.lines()[:7], [
+            "# TYPE test_seconds histogram",
+            'test_seconds_bucket{stage="x",le="0.1"} 0',
+            'test_seconds_bucket{stage="x",le="0.5"} 1',
+            'test_seconds_bucket{stage="x",le="1"} 1',
+            'test_seconds_bucket{stage="x",le="+Inf"} 2',
+            'test_seconds_sum{stage="x"} 2.3',
+            'test_seconds_count{stage="x"} 2',
+        ])
+
+    def test_label_values_are_escaped(self):
+        from . import metrics
+        metrics.inc("test_total", path='a"b\\c\nd')
+        self.assertIn('test_total{path="a\\"b\\\\c\\nd"} 1', self.lines())
+
+    def test_gauges_are_read_on_render(self):
+        from . import metrics
+        level = {"value": 1}
+
+        def broken():
+            raise RuntimeError("pool gone")
+
+        with mock.patch.object(metrics, "_collectors", [lambda: [("test_level", {"kind": "a"}, level["value"])], broken]), \
+                self.assertLogs("app.metrics", "ERROR"):
+            self.assertEqual(self.lines(), ["# TYPE test_level gauge", 'test_level{kind="a"} 1'])
+            level["value"] = 2
+            self.assertIn('test_level{kind="a"} 2', self.lines())
+
+    def test_endpoint_serves_the_text_format(self):
+        from . import metrics
+        metrics.inc("test_total")
+        response = self.client.get("/metrics")
+        self.assertEqual(response["Content-Type"], "text/plain; version=0.0.4; charset=utf-8")
+        self.assertTrue(response.content.decode().endswith("\n"))
+        self.assertIn("test_total 1", response.content.decode().splitlines())
+
+
+class JobClaimTests(TestCase):
+    def create_job(self, **fields):
+        from .models import PipelineJob
+        return PipelineJob.objects.create(video_url="https://youtu.be/dQw4w9WgXcQ", video_id="dQw4w9WgXcQ", **fields)
+
+    def test_live_job_of_another_process_is_not_taken(self):
+        from django.utils import timezone
+        from . import jobs
+        job = self.create_job(status="running", owner="other:1:abc", heartbeat_at=timezone.now())
+        self.assertFalse(jobs.claim(job.id))
+
+    def test_stale_job_is_claimed_once(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import jobs
+        stale = timezone.now() - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT + 1)
+        job = self.create_job(status="running", owner="other:1:abc", heartbeat_at=stale)
+        self.assertTrue(jobs.claim(job.id))
+        job.refresh_from_db()
+        self.assertEqual(job.owner, jobs.owner())
+
+    def test_finished_job_is_not_claimed(self):
+        from . import jobs
+        job = self.create_job(status="succeeded")
+        self.assertFalse(jobs.claim(job.id))
+
+
+class ObservedEvent(threading.Event):
+    """Event that records when someone starts waiting on it."""
+
+    def __init__(self):
+        super().__init__()
+        self.waiting = threading.Event()
+
+    def wait(self, timeout=None):
+        self.waiting.set()
+        return super().wait(timeout)
+
+
+def observed_flights():
+    """Patches single_flight so every flight's ``done`` event is an ObservedEvent."""
+    from . import single_flight
+
+    class ObservedFlight(single_flight._Flight):
+        def __init__(self):
+            super().__init__()
+            self.done = ObservedEvent()
+
+    return mock.patch.object(single_flight, "_Flight", ObservedFlight)
+
+
+def wait_for_flight(test, key):
+    """Returns the in-process flight for ``key`` once its leader has started."""
+    from . import single_flight
+    deadline = time.monotonic() + 5
+    while key not in single_flight._flights:
+        test.assertLess(time.monotonic(), deadline, "Leader never started")
+        time.sleep(0.01)
+    return single_flight._flights[key]
+
+
+class SingleFlightTests(TransactionTestCase):
+    KEY = "transcript:dQw4w9WgXcQ"
+
+    def setUp(self):
+        for patch in (observed_flights(), self.settings(SINGLE_FLIGHT_POLL_INTERVAL=0.05)):
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        self.release = threading.Event()
+        self.addCleanup(self.release.set)
+        self.calls = []
+
+    def work(self, result=None, error=None):
+        def fn():
+            self.calls.append(threading.get_ident())
+            self.release.wait(10)
+            if error:
+                raise error
+            return result
+        return fn
+
+    def call(self, fn, **options):
+        """Calls ``single_flight.run`` on a new thread; the outcome lands in the returned list."""
+        from django.db import connection
+        from . import single_flight
+        outcome = []
+
+        def target():
+            try:
+                outcome.append(single_flight.run("transcript", "dQw4w9WgXcQ", fn, **options))
+            except Exception as e:
+                outcome.append(e)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        self.addCleanup(thread.join, 10)
+        return thread, outcome
+
+    def leader_flight(self):
+        return wait_for_flight(self, self.KEY)
+
+    def test_concurrent_callers_share_one_run(self):
+        leader, leader_outcome = self.call(self.work(result="transcript"))
+        flight = self.leader_flight()
+        follower, follower_outcome = self.call(self.work(result="second run"))
+        self.assertTrue(flight.done.waiting.wait(5))
+        self.release.set()
+        leader.join(10)
+        follower.join(10)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(leader_outcome, ["transcript"])
+        self.assertEqual(follower_outcome, ["transcript"])
+
+    def test_followers_get_the_leaders_exception(self):
+        error = RuntimeError("Whisper failed")
+        leader, leader_outcome = self.call(self.work(error=error))
+        flight = self.leader_flight()
+        follower, follower_outcome = self.call(self.work(result="second run"))
+        self.assertTrue(flight.done.waiting.wait(5))
+        self.release.set()
+        leader.join(10)
+        follower.join(10)
+        self.assertEqual(len(self.calls), 1)
+        self.assertEqual(leader_outcome, [error])
+        self.assertEqual(follower_outcome, [error])
+
+    def test_follower_times_out(self):
+        from . import single_flight
+        self.call(self.work(result="transcript"))
+        self.leader_flight()
+        with self.assertRaises(single_flight.SingleFlightTimeout):
+            single_flight.run("transcript", "dQw4w9WgXcQ", self.work(result="second run"), timeout=0.1)
+        self.release.set()
+        self.assertEqual(len(self.calls), 1)
+
+    def test_lease_of_another_owner_blocks_until_it_expires(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import single_flight
+        from .models import SingleFlightLease
+        SingleFlightLease.objects.create(key=self.KEY, owner="other:1:abc", expires_at=timezone.now() + timedelta(seconds=1))
+        with self.assertRaises(single_flight.SingleFlightTimeout):
+            with single_flight.lease(self.KEY, timeout=0.2):
+                pass
+        started = time.monotonic()
+        with single_flight.lease(self.KEY, timeout=5):
+            self.assertGreater(time.monotonic() - started, 0.5)
+            self.assertNotEqual(SingleFlightLease.objects.get(key=self.KEY).owner, "other:1:abc")
+        self.assertFalse(SingleFlightLease.objects.filter(key=self.KEY).exists())
+
+
+class JobApiTests(TransactionTestCase):
+    """Runs jobs end to end through the API with every pipeline stage stubbed."""
+
+    VIDEO_URL = "https://youtu.be/dQw4w9WgXcQ"
+    CONTENT = {"title": "T", "description": "D", "keywords": ["k"], "tags": ["t"]}
+
+    def setUp(self):
+        from concurrent.futures import ThreadPoolExecutor
+        from django.core.cache import caches
+        from . import jobs, views
+        from .result_cache import result_cache
+        from .segments import SegmentedTranscript
+        transcript = SegmentedTranscript.from_segments([{"text": "Hello there.", "start": 0.0, "end": 1.5}])
+        # A pool of the test's own: the process-wide one starts a heartbeat that outlives the test
+        self.executor = ThreadPoolExecutor(max_workers=1)
+        self.addCleanup(self.executor.shutdown, wait=True)
+        patches = (
+            self.settings(TRANSCRIPT_ROUTING=False, SUMMARIZER_OVERLAP=False, ADMISSION_CONTROL=False, RESULT_CACHE_ALIAS="default"),
+            mock.patch.object(jobs, "get_executor", return_value=self.executor),
+            mock.patch.object(views, "fetch_segments_with_source", return_value=(transcript, "manual_captions")),
+            mock.patch.object(views, "summarize_text", return_value="Summary."),
+            mock.patch.object(views, "generate_optimized_content", return_value=self.CONTENT),
+        )
+        for patch in patches:
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        self.fetch = views.fetch_segments_with_source
+        self.addCleanup(caches["default"].clear)
+        self.addCleanup(result_cache.invalidate, "dQw4w9WgXcQ")
+
+    def wait_for(self, status_url):
+        deadline = time.monotonic() + 10
+        while True:
+            payload = self.client.get(status_url).json()
+            if payload["status"] in ("succeeded", "failed"):
+                return payload
+            self.assertLess(time.monotonic(), deadline, f"Job still {payload['status']}")
+            time.sleep(0.05)
+
+    def test_submitted_job_runs_to_completion(self):
+        response = self.client.post("/api/generate-video/", json.dumps({"url": self.VIDEO_URL}), content_type="application/json")
+        self.assertEqual(response.status_code, 202)
+        payload = self.wait_for(response.json()["status_url"])
+        self.assertEqual(payload["status"], "succeeded")
+        self.assertEqual(payload["summary"], "Summary.")
+        self.assertEqual(payload["optimized_content"], self.CONTENT)
+        self.assertEqual({stage["status"] for stage in payload["progress"].values()}, {"succeeded"})
+
+    def test_status_poll_is_read_only(self):
+        from . import jobs
+        from .models import PipelineJob
+        job = PipelineJob.objects.create(video_url=self.VIDEO_URL, video_id="dQw4w9WgXcQ")
+        with mock.patch.object(jobs, "claim") as claim:
+            self.assertEqual(self.client.get(f"/api/jobs/{job.id}/").json()["status"], "queued")
+        jobs.get_executor.assert_not_called()
+        claim.assert_not_called()
+        self.assertEqual(self.client.get("/api/jobs/00000000-0000-0000-0000-000000000000/").status_code, 404)
+
+    def test_job_of_a_dead_owner_is_resumed(self):
+        from datetime import timedelta
+        from django.utils import timezone
+        from . import jobs
+        from .models import PipelineJob
+        stale = timezone.now() - timedelta(seconds=settings.JOB_HEARTBEAT_TIMEOUT + 1)
+        job = PipelineJob.objects.create(
+            video_url=self.VIDEO_URL, video_id="dQw4w9WgXcQ", status=PipelineJob.RUNNING, stage="summary",
+            owner="other:1:abc", heartbeat_at=stale, result={"transcript": "Hello there."},
+            progress={"transcript": {"status": PipelineJob.SUCCEEDED}},
+        )
+        jobs.resume_pending_jobs(self.executor)
+        payload = self.wait_for(f"/api/jobs/{job.id}/")
+        self.assertEqual(payload["status"], "succeeded")
+        self.assertEqual(payload["optimized_content"], self.CONTENT)
+        self.fetch.assert_not_called()  # The finished stage isn't run again
+        job.refresh_from_db()
+        self.assertEqual(job.owner, jobs.owner())
+
+
+class JobDowngradeTests(TransactionTestCase):
+    VIDEO_ID = "dQw4w9WgXcQ"
+
+    def setUp(self):
+        from django.core.cache import caches
+        from . import routing, views
+        from .result_cache import result_cache
+        from .segments import SegmentedTranscript
+        self.gate = threading.Event()
+        self.addCleanup(self.gate.set)
+        transcript = SegmentedTranscript.from_segments([{"text": "Hello there.", "start": 0.0, "end": 1.5}])
+
+        def get_transcript(video_id, video_url, on_text=None, job_id=None):
+            self.gate.wait(10)
+            return transcript, "whisper", True  # Downgraded to a smaller Whisper model
+
+        patches = (
+            self.settings(TRANSCRIPT_ROUTING=True, SUMMARIZER_OVERLAP=False, ADMISSION_CONTROL=False, RESULT_CACHE_ALIAS="default"),
+            observed_flights(),
+            mock.patch.object(routing, "get_transcript", side_effect=get_transcript),
+            mock.patch.object(views, "summarize_text", return_value="Summary."),
+            mock.patch.object(views, "generate_optimized_content", return_value={"title": "T"}),
+        )
+        for patch in patches:
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        self.addCleanup(caches["default"].clear)
+        self.addCleanup(result_cache.invalidate, self.VIDEO_ID)
+        self.get_transcript = routing.get_transcript
+
+    def create_job(self):
+        from django.utils import timezone
+        from . import jobs
+        from .models import PipelineJob
+        return PipelineJob.objects.create(video_url="https://youtu.be/dQw4w9WgXcQ", video_id=self.VIDEO_ID,
+                                          owner=jobs.owner(), heartbeat_at=timezone.now())
+
+    def run_in_thread(self, job):
+        from django.db import connection
+        from . import jobs
+
+        def target():
+            try:
+                jobs.run_job(job.id)
+            finally:
+                connection.close()
+
+        thread = threading.Thread(target=target)
+        thread.start()
+        self.addCleanup(thread.join, 10)
+        return thread
+
+    def test_job_sharing_a_downgraded_transcript_caches_nothing(self):
+        from . import jobs
+        from .models import PipelineJob
+        from .result_cache import result_cache
+        leader_job, follower_job = self.create_job(), self.create_job()
+        leader = self.run_in_thread(leader_job)
+        flight = wait_for_flight(self, f"transcript:{self.VIDEO_ID}")
+        follower = self.run_in_thread(follower_job)
+        self.assertTrue(flight.done.waiting.wait(5))
+        self.gate.set()
+        leader.join(10)
+        follower.join(10)
+
+        self.assertEqual(self.get_transcript.call_count, 1)
+        for job in (leader_job, follower_job):
+            job.refresh_from_db()
+            self.assertEqual(job.status, PipelineJob.SUCCEEDED)
+            self.assertTrue(all(job.progress[stage].get("downgraded") for stage in jobs.STAGES))
+        for stage in jobs.STAGES:
+            self.assertIsNone(result_cache.get(stage, self.VIDEO_ID))
+
+
+class AdmissionTests(TestCase):
+    STREAM_URL = "/api/stream-video/?url=https://youtu.be/dQw4w9WgXcQ"
+
+    def setUp(self):
+        patch = self.settings(ADMISSION_CONTROL=True, ADMISSION_MAX_HEAVY=1, ADMISSION_QUEUE_LIMIT=0,
+                              ADMISSION_RETRY_AFTER=7, ADMISSION_IP_QUOTAS={}, ADMISSION_USER_QUOTAS={})
+        patch.__enter__()
+        self.addCleanup(patch.__exit__, None, None, None)
+
+    def test_rejects_when_capacity_is_exhausted(self):
+        from . import admission
+        self.assertTrue(admission._gates[admission.HEAVY].try_acquire())
+        self.addCleanup(admission.release, admission.HEAVY)
+        response = self.client.get("/api/stream-video/")
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response["Retry-After"], "7")
+
+    def test_quota_is_per_user(self):
+        from django.contrib.auth.models import User
+        from django.test import Client
+        user = Client()
+        user.force_login(User.objects.create_user("quota"))
+        with self.settings(ADMISSION_USER_QUOTAS={"heavy": 1}, ADMISSION_IP_QUOTAS={"heavy": 5}):
+            self.assertEqual(user.get("/api/stream-video/").status_code, 400)  # Admitted, then rejected for the missing URL
+            response = user.get("/api/stream-video/")
+            self.assertEqual(self.client.get("/api/stream-video/").status_code, 400)  # Anonymous clients have their own quota
+        self.assertEqual(response.status_code, 429)
+        self.assertTrue(1 <= int(response["Retry-After"]) <= 60)
+
+    async def test_streaming_response_holds_its_slot_until_the_stream_ends(self):
+        from . import admission, streaming
+        gate = admission._gates[admission.HEAVY]
+        in_flight = []
+
+        async def pipeline_events(video_url, video_id):
+            in_flight.append(gate.in_flight)
+            yield streaming.format_event("done", {})
+
+        with mock.patch.object(streaming, "pipeline_events", pipeline_events):
+            response = await self.async_client.get(self.STREAM_URL)
+            self.assertEqual(gate.in_flight, 1)
+            self.assertEqual((await self.async_client.get(self.STREAM_URL)).status_code, 429)
+            body = [chunk async for chunk in response.streaming_content]
+        self.assertEqual(in_flight, [1])
+        self.assertEqual(body, [b"event: done\ndata: {}\n\n"])
+        self.assertEqual(gate.in_flight, 0)
+
+
+class ResultCacheTests(SimpleTestCase):
+    VIDEO_ID = "dQw4w9WgXcQ"
+
+    def setUp(self):
+        from django.core.cache import caches
+        from .result_cache import ResultCache
+        patch = self.settings(RESULT_CACHE_ALIAS="default", RESULT_CACHE_TTL=0, TRANSCRIPT_ROUTING=False)
+        patch.__enter__()
+        self.addCleanup(patch.__exit__, None, None, None)
+        self.addCleanup(caches["default"].clear)
+        self.cache = ResultCache()
+
+    def test_local_entries_expire(self):
+        from .result_cache import LRUCache, _MISSING
+        local = LRUCache(2, ttl=0.05)
+        local.set("a", 1)
+        self.assertEqual(local.get("a"), 1)
+        time.sleep(0.1)
+        self.assertIs(local.get("a"), _MISSING)
+        self.assertEqual(len(local), 0)
+
+    def test_local_cache_drops_least_recently_used(self):
+        from .result_cache import LRUCache, _MISSING
+        local = LRUCache(2, ttl=0)
+        local.set("a", 1)
+        local.set("b", 2)
+        local.get("a")
+        local.set("c", 3)
+        self.assertIs(local.get("b"), _MISSING)
+        self.assertEqual((local.get("a"), local.get("c"), len(local)), (1, 3, 2))
+
+    def test_stages_are_cached_separately(self):
+        self.cache.set("transcript", self.VIDEO_ID, "Hello there.")
+        self.assertEqual(self.cache.get("transcript", self.VIDEO_ID), "Hello there.")
+        self.assertIsNone(self.cache.get("summary", self.VIDEO_ID))
+        self.assertIsNone(self.cache.get("transcript", "jNQXAC9IVRw"))
+
+    def test_version_change_invalidates_the_stage_and_those_after_it(self):
+        for stage in ("transcript", "summary", "optimized_content"):
+            self.cache.set(stage, self.VIDEO_ID, stage)
+        with self.settings(SUMMARIZER_MODEL="sshleifer/distilbart-cnn-12-6"):
+            self.assertEqual(self.cache.get("transcript", self.VIDEO_ID), "transcript")
+            self.assertIsNone(self.cache.get("summary", self.VIDEO_ID))
+            self.assertIsNone(self.cache.get("optimized_content", self.VIDEO_ID))
+        self.assertEqual(self.cache.get("summary", self.VIDEO_ID), "summary")
+
+    def test_invalidate_drops_every_stage(self):
+        from .result_cache import ResultCache
+        self.cache.set("transcript", self.VIDEO_ID, "Hello there.")
+        self.cache.invalidate(self.VIDEO_ID)
+        self.assertIsNone(self.cache.get("transcript", self.VIDEO_ID))
+        self.assertIsNone(ResultCache().get("transcript", self.VIDEO_ID))
+
+    def test_counts_hits_and_misses(self):
+        from .result_cache import ResultCache
+        self.assertIsNone(self.cache.get("summary", self.VIDEO_ID))
+        self.cache.set("summary", self.VIDEO_ID, "Summary.")
+        self.assertEqual(self.cache.get("summary", self.VIDEO_ID), "Summary.")
+        other_process = ResultCache()
+        self.assertEqual(other_process.get("summary", self.VIDEO_ID), "Summary.")
+        self.assertEqual(self.cache.stats(), {"local_entries": 1, "counters": {"summary.misses": 1, "summary.local_hits": 1}})
+        self.assertEqual(other_process.stats()["counters"], {"summary.persistent_hits": 1})
+
+    def test_get_or_compute_leaves_out_what_keep_rejects(self):
+        compute = mock.Mock(return_value="Summary.")
+        self.assertEqual(self.cache.get_or_compute("summary", self.VIDEO_ID, compute, keep=lambda value: False), "Summary.")
+        self.assertEqual(self.cache.get_or_compute("summary", self.VIDEO_ID, compute), "Summary.")
+        self.assertEqual(self.cache.get_or_compute("summary", self.VIDEO_ID, compute), "Summary.")
+        self.assertEqual(compute.call_count, 2)
+
+
+class TranscriptRoutingTests(TestCase):
+    def test_downgraded_whisper_transcript_is_not_served_from_store(self):
+        from . import transcript_store
+        segments = [{"text": "Hello there.", "start": 0.0, "end": 1.5}]
+        with self.settings(ROUTING_WHISPER_MODELS=["tiny", "base", "large"], ROUTING_MIN_WHISPER_MODEL="base"):
+            transcript_store.save("dQw4w9WgXcQ", segments, "whisper", "en", "tiny")
+            self.assertIsNone(transcript_store.get("dQw4w9WgXcQ"))
+            transcript_store.save("dQw4w9WgXcQ", segments, "whisper", "en", "base")
+            self.assertEqual(transcript_store.get("dQw4w9WgXcQ").model, "base")
+
+
+class RoutingPolicyTests(TestCase):
+    CAPTIONS = object()  # Stands in for a caption track; the policy only checks that there is one
+
+    def setUp(self):
+        overrides = self.settings(
+            ROUTING_WHISPER_MODELS=["tiny", "base", "small", "large"], ROUTING_MIN_WHISPER_MODEL="base",
+            ROUTING_MIN_WHISPER_MODEL_NON_ENGLISH="small", ROUTING_AUTO_CAPTIONS_MIN_SECONDS=900,
+            ROUTING_LATENCY_BUDGET=900, JOB_WORKERS=2, WHISPER_REALTIME_FACTORS={"tiny": 0.05, "base": 0.1, "small": 0.3, "large": 1.0},
+        )
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def choose(self, duration, manual=None, auto=None, language="en", **options):
+        from . import routing
+        return routing.choose(routing.VideoFacts(duration, manual, auto, language), **options)
+
+    def test_manual_captions_win(self):
+        route = self.choose(60, manual=self.CAPTIONS, auto=self.CAPTIONS)
+        self.assertEqual((route.path, route.reason), ("manual_captions", "manual_captions"))
+
+    def test_auto_captions_are_trusted_for_long_videos_only(self):
+        self.assertEqual(self.choose(1200, auto=self.CAPTIONS).reason, "long_video")
+        self.assertEqual(self.choose(600, auto=self.CAPTIONS)[:3], ("whisper", "base", "within_budget"))
+
+    def test_quality_floor_depends_on_language(self):
+        self.assertEqual(self.choose(600).model, "base")
+        self.assertEqual(self.choose(600, language="de").model, "small")
+        self.assertEqual(self.choose(None, language="de")[:3], ("whisper", "small", "unknown_duration"))
+
+    def test_over_budget_prefers_auto_captions_then_smaller_model(self):
+        from . import routing
+        self.assertEqual(self.choose(600, auto=self.CAPTIONS, budget=40)[:3], ("auto_captions", "", "over_budget"))
+        route = self.choose(600, budget=40)
+        self.assertEqual(route[:3], ("whisper", "tiny", "downgraded"))
+        self.assertTrue(routing.below_floor(route.model, "en"))
+        self.assertEqual(self.choose(600, budget=1)[:3], ("whisper", "tiny", "over_budget"))
+
+    def test_queue_depth_stretches_the_estimate(self):
+        self.assertEqual(self.choose(600, budget=100).model, "base")
+        route = self.choose(600, depth=2, budget=100)
+        self.assertEqual((route.model, route.reason, route.estimated_seconds), ("tiny", "downgraded", 60))
+
+    def test_store_errors_fall_back_to_routing(self):
+        from django.db import DatabaseError
+        from . import routing, transcript_store
+        facts = routing.VideoFacts(60, self.CAPTIONS, None, "en")
+        with self.settings(TRANSCRIPT_STORE=True), \
+                mock.patch.object(transcript_store, "load_with_source", side_effect=DatabaseError("database is locked")), \
+                mock.patch.object(routing, "gather_facts", return_value=facts), \
+                mock.patch.object(routing, "run_route", return_value="Hello there.") as run_route:
+            self.assertEqual(routing.get_transcript("dQw4w9WgXcQ", "https://youtu.be/dQw4w9WgXcQ"),
+                             ("Hello there.", "manual_captions", False))
+        self.assertEqual(run_route.call_args.args[3].path, "manual_captions")
+
+
+class TranscriptSearchTests(TestCase):
+    def test_search_rejects_non_positive_limit(self):
+        for limit in ("-1", "0"):
+            response = self.client.get("/api/transcripts/search/", {"q": "hello", "limit": limit})
+            self.assertEqual(response.status_code, 400)
+
+
+def echo_inference(registry, request):
+    """Inference server handler for the tests: loads no model, returns the inputs after an optional delay."""
+    if request.get("exit"):
+        os._exit(1)
+    time.sleep(request.get("sleep", 0))
+    return request["inputs"]
+
+
+class InferenceServerTests(SimpleTestCase):
+    def setUp(self):
+        from . import inference_workers
+        self.workers = inference_workers
+        directory = tempfile.mkdtemp()
+        self.path = os.path.join(directory, "inference.sock")
+        overrides = self.settings(INFERENCE_SERVER_SOCKET=self.path, INFERENCE_REQUEST_TIMEOUT=30)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+        self.server = inference_workers.InferenceServer(
+            self.path, whisper_workers=0, summarizer_workers=1, threads=1, handler=echo_inference,
+        )
+        threading.Thread(target=self.server.serve_forever, daemon=True).start()
+        self.addCleanup(self.server.stop)
+        self.addCleanup(inference_workers._drop_connection)
+        deadline = time.monotonic() + 10
+        while not os.path.exists(self.path):
+            self.assertLess(time.monotonic(), deadline, "Inference server didn't start")
+            time.sleep(0.05)
+
+    def summarize(self, inputs, **options):
+        return self.workers.call({"op": "summarize", "inputs": inputs, **options})
+
+    def test_round_trip(self):
+        self.assertEqual(self.summarize(["first", "second"]), ["first", "second"])
+
+    def test_crashed_worker_fails_its_request_and_is_replaced(self):
+        with self.assertRaisesRegex(self.workers.InferenceError, "exited"):
+            self.summarize([], exit=True)
+        self.assertEqual(self.summarize(["again"]), ["again"])
+        self.assertEqual(self.workers.server_stats()["restarts"], 1)
+
+    def test_client_gives_up_after_timeout(self):
+        with self.settings(INFERENCE_REQUEST_TIMEOUT=0.5):
+            with self.assertRaisesRegex(self.workers.InferenceError, "No reply to summarize within 0.5s"):
+                self.summarize([], sleep=2)
+        self.assertEqual(self.summarize(["later"]), ["later"])
+
+    def test_abandoned_request_is_dropped_from_the_backlog(self):
+        with self.settings(INFERENCE_REQUEST_TIMEOUT=0.3):
+            with self.assertRaises(self.workers.InferenceError):
+                self.summarize([], sleep=2)  # Keeps the only worker busy
+            with self.assertRaises(self.workers.InferenceError):
+                self.summarize([], exit=True)  # Queued behind it; would crash the worker if it ever ran
+        deadline = time.monotonic() + 5
+        while self.server.stats()["queued"][self.workers.SUMMARIZER]:
+            self.assertLess(time.monotonic(), deadline, "Abandoned request still queued")
+            time.sleep(0.05)
+        self.assertEqual(self.summarize(["later"]), ["later"])
+        self.assertEqual(self.server.stats()["restarts"], 0)
+
+    def test_kind_without_workers_is_rejected(self):
+        with self.assertRaisesRegex(self.workers.InferenceError, "No whisper workers"):
+            self.workers.call({"op": "transcribe", "size": "tiny", "backend": "torch", "options": {}, "path": "audio.wav"})
+
+
+class WordTokenizer:
+    """Counts words as tokens, enough for the chunking code to run without a model."""
+
+    model_max_length = 1024
+
+    def encode(self, text, add_special_tokens=True):
+        return text.split()
+
+    def decode(self, ids):
+        return " ".join(ids)
+
+    def num_special_tokens_to_add(self):
+        return 0
+
+
+class FakeSummarizer:
+    """Stands in for the BART pipeline: a chunk's summary is its first three words.
+
+    With ``gate``, each call waits for it first; ``error`` is then raised instead of summarizing.
+    """
+
+    def __init__(self, gate=None, error=None):
+        self.tokenizer = WordTokenizer()
+        self.batches = []
+        self.called = threading.Event()
+        self.gate = gate
+        self.error = error
+
+    def __call__(self, inputs, **options):
+        self.batches.append(list(inputs))
+        self.called.set()
+        if self.gate:
+            self.gate.wait(10)
+        if self.error:
+            raise self.error
+        return [{"summary_text": " ".join(text.split()[:3])} for text in inputs]
+
+
+class SummarizationTests(SimpleTestCase):
+    def setUp(self):
+        overrides = self.settings(SUMMARIZER_MAX_INPUT_TOKENS=8, SUMMARIZER_BATCH_SIZE=2, SUMMARIZER_REDUCE_TOKENS=2048)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def test_budget_leaves_room_for_special_tokens(self):
+        from . import summarization
+        tokenizer = WordTokenizer()
+        tokenizer.num_special_tokens_to_add = lambda: 2
+        self.assertEqual(summarization.max_input_tokens(tokenizer), 6)
+        tokenizer.model_max_length = 4
+        self.assertEqual(summarization.max_input_tokens(tokenizer), 2)
+
+    def test_chunks_pack_whole_sentences(self):
+        from . import summarization
+        chunks = summarization.chunk_text("One two three. Four five. Six seven eight nine.", WordTokenizer(), 5)
+        self.assertEqual(chunks, ["One two three. Four five.", "Six seven eight nine."])
+
+    def test_long_sentences_are_split_on_token_boundaries(self):
+        from . import summarization
+        chunks = summarization.chunk_text("Hi. one two three four five six seven", WordTokenizer(), 3)
+        self.assertEqual(chunks, ["Hi.", "one two three", "four five six", "seven"])
+
+    def test_chunks_are_summarized_in_batches(self):
+        from . import summarization
+        summarizer = FakeSummarizer()
+        chunks = [f"Chunk {n} of five words." for n in range(5)]
+        self.assertEqual(summarization.summarize_chunks(chunks, summarizer), [f"Chunk {n} of" for n in range(5)])
+        self.assertEqual([len(batch) for batch in summarizer.batches], [2, 2, 1])
+
+    def test_long_summaries_are_summarized_again(self):
+        from . import summarization
+        summarizer, chunk_summaries = FakeSummarizer(), []
+        text = "One two three four. Five six seven eight. Nine ten eleven twelve. Thirteen fourteen fifteen."
+        with self.settings(SUMMARIZER_REDUCE_TOKENS=4):
+            summary = summarization.summarize(text, summarizer, on_chunk=lambda *args: chunk_summaries.append(args))
+        self.assertEqual(summary, "One two three")
+        self.assertEqual(summarizer.batches, [
+            ["One two three four. Five six seven eight.", "Nine ten eleven twelve. Thirteen fourteen fifteen."],
+            ["One two three Nine ten eleven"],
+        ])
+        self.assertEqual(chunk_summaries, [(0, 2, "One two three"), (1, 2, "Nine ten eleven")])
+
+    def test_transcripts_share_batches(self):
+        from . import summarization
+        summarizer = FakeSummarizer()
+        summaries = summarization.summarize_many(["One two three four.", "Five six seven eight."], summarizer)
+        self.assertEqual(summaries, ["One two three", "Five six seven"])
+        self.assertEqual(summarizer.batches, [["One two three four.", "Five six seven eight."]])
+
+
+class BackgroundSummaryTests(SimpleTestCase):
+    SENTENCES = ["One two three four.", "Five six seven eight.", "Nine ten eleven twelve.", "Thirteen fourteen fifteen."]
+
+    def setUp(self):
+        overrides = self.settings(SUMMARIZER_MAX_INPUT_TOKENS=8, SUMMARIZER_OVERLAP_QUEUE=1)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def feed_in_thread(self, background, pieces):
+        feeder = threading.Thread(target=lambda: [background.feed(piece) for piece in pieces])
+        feeder.start()
+        self.addCleanup(feeder.join, 10)
+        return feeder
+
+    def block_feed(self, summarizer):
+        """Starts a summary whose model call hangs, and feeds it until ``feed`` blocks."""
+        from . import summarization
+        background = summarization.BackgroundSummary(summarizer)
+        feeder = self.feed_in_thread(background, self.SENTENCES * 5)
+        self.assertTrue(summarizer.called.wait(5))
+        deadline = time.monotonic() + 5
+        while not background.pieces.full():
+            self.assertLess(time.monotonic(), deadline, "feed() never blocked")
+            time.sleep(0.01)
+        self.assertTrue(feeder.is_alive())
+        return background, feeder
+
+    def test_overlapped_summary_matches_summary_of_whole_text(self):
+        from . import summarization
+        background = summarization.BackgroundSummary(FakeSummarizer())
+        for sentence in self.SENTENCES:
+            background.feed(sentence)
+        expected = summarization.summarize(" ".join(self.SENTENCES), FakeSummarizer())
+        self.assertEqual(background.finish(), expected)
+
+    def test_cancel_releases_a_blocked_feed(self):
+        from . import summarization
+        gate = threading.Event()
+        background, feeder = self.block_feed(FakeSummarizer(gate))
+        canceller = threading.Thread(target=background.cancel)
+        canceller.start()
+        gate.set()
+        canceller.join(5)
+        feeder.join(5)
+        self.assertFalse(feeder.is_alive())
+        background.future.result(timeout=5)
+        self.assertIsInstance(background.error, summarization.SummaryCancelled)
+
+    def test_model_error_releases_a_blocked_feed(self):
+        gate = threading.Event()
+        background, feeder = self.block_feed(FakeSummarizer(gate, RuntimeError("out of memory")))
+        gate.set()
+        feeder.join(5)
+        self.assertFalse(feeder.is_alive())
+        with self.assertRaisesRegex(RuntimeError, "out of memory"):
+            background.finish()
+
+
+class ParallelTranscriptionTests(SimpleTestCase):
+    def test_stitch_removes_overlap_spanning_several_segments(self):
+        from .transcription import stitch
+        first = {"text": "One two three four five.", "language": "en",
+                 "segments": [{"start": 0.0, "end": 5.0, "text": " One two three four five."}]}
+        second = {"text": "four, five six seven.", "language": "en",
+                  "segments": [{"start": 0.0, "end": 0.5, "text": " four,"}, {"start": 0.5, "end": 1.0, "text": " five six"},
+                               {"start": 1.0, "end": 2.0, "text": " seven."}]}
+        result = stitch([(0.0, False, first), (4.0, True, second)])
+        self.assertEqual(result["text"], "One two three four five. six seven.")
+        self.assertEqual([(s["id"], s["start"], s["text"]) for s in result["segments"]],
+                         [(0, 0.0, " One two three four five."), (1, 4.5, " six"), (2, 5.0, " seven.")])
+        self.assertEqual(result["language"], "en")
+
+    def test_stitch_keeps_segments_that_were_not_overlapped(self):
+        from .transcription import stitch
+        chunk = {"text": "Hello there.", "segments": [{"start": 0.0, "end": 1.0, "text": " Hello there."}]}
+        result = stitch([(0.0, False, chunk), (30.0, False, chunk)])
+        self.assertEqual(result["text"], "Hello there. Hello there.")
+        self.assertEqual([s["start"] for s in result["segments"]], [0.0, 30.0])
+
+    def test_ctranslate2_worker_runs_without_torch(self):
+        from . import inference, transcription
+        self.addCleanup(setattr, transcription, "_worker_model", None)
+        with mock.patch.dict(sys.modules, torch=None), mock.patch.object(inference, "load_whisper") as load_whisper:
+            transcription._init_worker("base", 2, "ctranslate2", "int8")
+        load_whisper.assert_called_once_with("base", "ctranslate2", "int8", 2)
+
+
+class SegmentedTranscriptTests(SimpleTestCase):
+    SEGMENTS = [
+        {"text": " Hello there.", "start": 0.0, "end": 1.5},
+        {"text": "  ", "start": 1.5, "end": 2.0},
+        {"text": "General Kenobi!", "start": 2.0, "end": 3.25},
+        {"text": "You are a bold one.", "start": 3.5, "end": 5.0},
+    ]
+
+    def transcript(self):
+        from .segments import SegmentedTranscript
+        return SegmentedTranscript.from_segments(self.SEGMENTS)
+
+    def test_blank_segments_are_dropped_and_text_joined_once(self):
+        transcript = self.transcript()
+        self.assertEqual(len(transcript), 3)
+        self.assertEqual(transcript.text, "Hello there. General Kenobi! You are a bold one.")
+        self.assertEqual(transcript[1].as_dict(), {"text": "General Kenobi!", "start": 2.0, "duration": 1.25})
+
+    def test_slices_share_the_buffers(self):
+        transcript = self.transcript()
+        tail = transcript[1:]
+        self.assertIs(tail._text, transcript._text)
+        self.assertIs(tail._starts.obj, transcript._starts.obj)
+        self.assertEqual(tail.text, "General Kenobi! You are a bold one.")
+        self.assertEqual(transcript.between(1.0, 3.0).text, "General Kenobi!")
+
+    def test_bytes_round_trip(self):
+        import pickle
+        from .segments import SegmentedTranscript
+        transcript = self.transcript()
+        data = transcript[1:].to_bytes()
+        restored = SegmentedTranscript.from_bytes(data)
+        self.assertEqual(restored.as_dicts(), transcript[1:].as_dicts())
+        if sys.byteorder == "little":
+            self.assertIs(restored._starts.obj, data)
+        self.assertEqual(pickle.loads(pickle.dumps(transcript)).as_dicts(), transcript.as_dicts())
+
+    def test_chunks_follow_segment_boundaries(self):
+        from . import summarization
+        chunks = summarization.chunk_segments(self.transcript(), WordTokenizer(), 4)
+        self.assertEqual(chunks, ["Hello there. General Kenobi!", "You are a bold", "one."])
+
+
+@skipUnless(mock_aws, "moto is not installed")
+class StreamUploadTests(SimpleTestCase):
+    """Streams a stand-in download into a moto S3 bucket."""
+
+    BUCKET = "test-videos"
+    PART_SIZE = 5 * 1024 * 1024  # S3's minimum for every part but the last
+    DATA = bytes(range(256)) * (11 * 1024 * 4)  # 11 MB: two full parts and a short one
+    WRITE_DATA = "import sys; sys.stdout.buffer.write(bytes(range(256)) * (11 * 1024 * 4))"
+
+    def setUp(self):
+        import boto3
+        from . import clients
+        aws = mock_aws()
+        aws.start()
+        self.addCleanup(aws.stop)
+        self.s3 = boto3.client("s3", region_name="us-east-1", aws_access_key_id="testing", aws_secret_access_key="testing")
+        self.s3.create_bucket(Bucket=self.BUCKET)
+        override = clients.override("s3", self.s3)
+        override.__enter__()
+        self.addCleanup(override.__exit__, None, None, None)
+        overrides = self.settings(AWS_STORAGE_BUCKET_NAME=self.BUCKET, S3_MULTIPART_PART_SIZE=self.PART_SIZE, S3_PART_RETRIES=0)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def upload(self, script):
+        from . import s3_transfer
+        with mock.patch.object(s3_transfer, "_download_command", return_value=[sys.executable, "-c", script]):
+            return s3_transfer.stream_upload("https://youtu.be/dQw4w9WgXcQ", "video.mp4")
+
+    def stored(self):
+        return self.s3.get_object(Bucket=self.BUCKET, Key="video.mp4")["Body"].read()
+
+    def pending_uploads(self):
+        return self.s3.list_multipart_uploads(Bucket=self.BUCKET).get("Uploads", [])
+
+    def test_streams_download_as_multipart_upload(self):
+        self.assertEqual(self.upload(self.WRITE_DATA), len(self.DATA))
+        self.assertEqual(self.stored(), self.DATA)
+        self.assertEqual(self.pending_uploads(), [])
+
+    def test_resume_skips_parts_with_matching_md5(self):
+        upload_id = self.s3.create_multipart_upload(Bucket=self.BUCKET, Key="video.mp4")["UploadId"]
+        self.s3.upload_part(Bucket=self.BUCKET, Key="video.mp4", UploadId=upload_id, PartNumber=1, Body=self.DATA[:self.PART_SIZE])
+        with mock.patch.object(self.s3, "upload_part", wraps=self.s3.upload_part) as upload_part:
+            self.upload(self.WRITE_DATA)
+        self.assertEqual(sorted(call.kwargs["PartNumber"] for call in upload_part.call_args_list), [2, 3])
+        self.assertEqual(self.stored(), self.DATA)
+
+    def test_failed_download_aborts_the_upload(self):
+        from . import s3_transfer
+        with self.assertRaises(s3_transfer.StreamUploadError):
+            self.upload("import sys; sys.stdout.buffer.write(b'x' * 1024); sys.exit(1)")
+        self.assertEqual(self.pending_uploads(), [])
+
+    def test_verbose_download_does_not_stall(self):
+        # More stderr than a pipe buffer holds, written before any video data
+        script = "import sys; sys.stderr.write('warning\\n' * 20000); sys.stderr.flush(); " + self.WRITE_DATA
+        self.assertEqual(self.upload(script), len(self.DATA))
+
+    def test_failed_download_reports_its_error(self):
+        from . import s3_transfer
+        with self.assertRaisesMessage(s3_transfer.StreamUploadError, "yt-dlp failed: Video unavailable"):
+            self.upload("import sys; sys.stdout.buffer.write(b'x' * 1024); sys.stderr.write('Video unavailable'); sys.exit(1)")
+
+    def test_part_failure_stops_the_download_and_keeps_the_upload(self):
+        from botocore.exceptions import ClientError
+        error = ClientError({"Error": {"Code": "InternalError", "Message": "Part rejected"}}, "UploadPart")
+        endless = "import sys\nwhile True: sys.stdout.buffer.write(bytes(65536))"
+        with mock.patch.object(self.s3, "upload_part", side_effect=error):
+            with self.assertRaises(ClientError):
+                self.upload(endless)
+        self.assertEqual(len(self.pending_uploads()), 1)
+
+
+class MediaCacheTests(SimpleTestCase):
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        overrides = self.settings(MEDIA_CACHE=True, MEDIA_CACHE_DIR=self.directory, MEDIA_CACHE_MAX_BYTES=1 << 20)
+        overrides.enable()
+        self.addCleanup(overrides.disable)
+
+    def store(self, video_id, fmt, data=b"media"):
+        from . import media_cache
+        with media_cache.writing(video_id, fmt) as path:
+            with open(path, "wb") as f:
+                f.write(data)
+        return os.path.join(self.directory, f"{video_id}.{fmt}")
+
+    def download(self, script):
+        return subprocess.Popen([sys.executable, "-c", script], stdout=subprocess.PIPE)
+
+    def test_audio_lookup_falls_back_to_cached_video(self):
+        from . import media_cache
+        path = self.store("abc", media_cache.VIDEO)
+        self.assertEqual(media_cache.lookup("abc", media_cache.AUDIO), path)
+        self.assertIsNone(media_cache.lookup("xyz", media_cache.AUDIO))
+        self.store("audio-only", media_cache.AUDIO)
+        self.assertIsNone(media_cache.lookup("audio-only", media_cache.VIDEO))
+
+    def test_failed_write_publishes_nothing(self):
+        from . import media_cache
+        with self.assertRaises(RuntimeError):
+            with media_cache.writing("abc", media_cache.AUDIO) as path:
+                with open(path, "wb") as f:
+                    f.write(b"partial")
+                raise RuntimeError("download failed")
+        self.assertEqual(os.listdir(self.directory), [])
+
+    def test_evicts_least_recently_used_entries(self):
+        from . import media_cache
+        paths = [self.store(video_id, media_cache.AUDIO, b"x" * 100) for video_id in ("old", "mid", "new")]
+        for age, path in zip((300, 200, 100), paths):
+            os.utime(path, (time.time() - age, time.time() - age))
+        media_cache.lookup("old", media_cache.AUDIO)  # A hit makes it the most recent
+        self.assertEqual(media_cache.evict(200), 200)
+        self.assertEqual(sorted(os.listdir(self.directory)), ["new.audio", "old.audio"])
+
+    def test_tee_copies_download_to_sink_and_cache(self):
+        from .audio_stream import _tee
+        download = self.download("import sys; sys.stdout.buffer.write(b'audio' * 100000)")
+        cache_path, sink_path = os.path.join(self.directory, "cache"), os.path.join(self.directory, "sink")
+        failure = []
+        _tee(download, open(sink_path, "wb"), cache_path, failure)
+        self.assertEqual(download.wait(), 0)
+        self.assertEqual(failure, [])
+        for path in (cache_path, sink_path):
+            with open(path, "rb") as f:
+                self.assertEqual(f.read(), b"audio" * 100000)
+
+    def test_tee_stops_download_when_decoder_exits(self):
+        from .audio_stream import _tee
+        download = self.download("import sys\nwhile True: sys.stdout.buffer.write(bytes(65536))")
+        read_end, write_end = os.pipe()
+        os.close(read_end)  # ffmpeg already gone
+        cache_path = os.path.join(self.directory, "cache")
+        failure = []
+        _tee(download, os.fdopen(write_end, "wb", buffering=0), cache_path, failure)
+        self.assertNotEqual(download.wait(timeout=10), 0)
+        self.assertEqual(failure, [])
+        self.assertFalse(os.path.exists(cache_path))
+
+    def test_tee_reports_cache_write_failure(self):
+        from .audio_stream import _tee
+        download = self.download("import sys\nwhile True: sys.stdout.buffer.write(bytes(65536))")
+        failure = []
+        _tee(download, open(os.devnull, "wb"), os.path.join(self.directory, "missing", "cache"), failure)
+        self.assertNotEqual(download.wait(timeout=10), 0)
+        self.assertIsInstance(failure[0], OSError)
+
+
+class FakeYouTube:
+    """Answers ``videos().list()`` from ``titles`` and replies 304 when If-None-Match carries the list's ETag.
+
+    ``playlistItems().list()`` pages through ``playlists`` two videos at a time.
+    """
+
+    def __init__(self, titles, etag="list-v1", playlists=None):
+        self.titles = titles
+        self.etag = etag
+        self.playlists = playlists or {}
+        self.requests = []
+        self.playlist_pages = []
+
+    def videos(self):
+        return self
+
+    def playlistItems(self):
+        return FakePlaylistItems(self)
+
+    def list(self, part, id):
+        return FakeYouTubeRequest(self, id.split(","))
+
+
+class FakeYouTubeRequest:
+    def __init__(self, api, video_ids):
+        self.api = api
+        self.video_ids = video_ids
+        self.headers = {}
+
+    def execute(self):
+        import httplib2
+        from googleapiclient.errors import HttpError
+        self.api.requests.append((self.video_ids, dict(self.headers)))
+        if self.headers.get("If-None-Match") == self.api.etag:
+            raise HttpError(httplib2.Response({"status": 304}), b"")
+        items = [
+            {"id": video_id, "etag": f"{video_id}-{self.api.etag}", "snippet": {"title": self.api.titles[video_id]},
+             "contentDetails": {"duration": "PT1M30S"}}
+            for video_id in self.video_ids if video_id in self.api.titles
+        ]
+        return {"etag": self.api.etag, "items": items}
+
+
+class FakePlaylistItems:
+    PAGE = 2
+
+    def __init__(self, api):
+        self.api = api
+
+    def list(self, part, playlistId, maxResults, pageToken=None):
+        start = int(pageToken or 0)
+        self.api.playlist_pages.append((playlistId, start))
+        video_ids = self.api.playlists[playlistId]
+        page = {"items": [{"contentDetails": {"videoId": video_id}} for video_id in video_ids[start:start + self.PAGE]]}
+        if start + self.PAGE < len(video_ids):
+            page["nextPageToken"] = str(start + self.PAGE)
+        return mock.Mock(execute=mock.Mock(return_value=page))
+
+
+class VideoMetadataTests(SimpleTestCase):
+    def setUp(self):
+        from django.core.cache import caches
+        from . import clients, video_metadata
+        self.youtube = FakeYouTube({"abc": "First", "def": "Second"})
+        for patch in (self.settings(RESULT_CACHE_ALIAS="default"), mock.patch.object(video_metadata, "_local", None),
+                      clients.override("youtube", self.youtube)):
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        self.addCleanup(caches["default"].clear)
+
+    def test_fresh_entries_cost_no_api_calls(self):
+        from . import video_metadata
+        videos = video_metadata.get_many(["abc", "missing"])
+        self.assertEqual(list(videos), ["abc"])
+        self.assertEqual(videos["abc"]["duration_seconds"], 90)
+        self.assertEqual(video_metadata.get_many(["abc", "missing"]), videos)
+        self.assertEqual(len(self.youtube.requests), 1)
+
+    def test_ids_are_fetched_a_page_at_a_time(self):
+        from . import video_metadata
+        video_metadata.get_many([f"id{n}" for n in range(video_metadata.PAGE_SIZE * 2 + 5)])
+        self.assertEqual([len(video_ids) for video_ids, _ in self.youtube.requests], [video_metadata.PAGE_SIZE] * 2 + [5])
+
+    def test_stale_entries_are_revalidated_with_the_list_etag(self):
+        from . import video_metadata
+        first = video_metadata.get_many(["abc", "def"])
+        with self.settings(METADATA_CACHE_TTL=0):
+            self.assertEqual(video_metadata.get_many(["abc", "def"]), first)  # 304 Not Modified
+            self.youtube.titles["abc"], self.youtube.etag = "Renamed", "list-v2"
+            self.assertEqual(video_metadata.get_many(["abc", "def"])["abc"]["title"], "Renamed")
+        self.assertEqual([headers.get("If-None-Match") for _, headers in self.youtube.requests], [None, "list-v1", "list-v1"])
+
+
+class BatchTests(SimpleTestCase):
+    TITLES = {"dQw4w9WgXcQ": "First", "jNQXAC9IVRw": "Second", "9bZkp7q19f0": "Third"}
+    CONTENT = {"title": "T", "description": "D", "keywords": ["k"], "tags": ["t"]}
+
+    def setUp(self):
+        from django.core.cache import caches
+        from . import clients, summarization, video_metadata, views
+        from .result_cache import result_cache
+        self.youtube = FakeYouTube(self.TITLES, playlists={"PL1": ["jNQXAC9IVRw", "9bZkp7q19f0", "kJQP7kiw5Fk"]})
+        patches = (
+            self.settings(RESULT_CACHE_ALIAS="default", ADMISSION_CONTROL=False, BATCH_SUMMARY_GROUP=2),
+            mock.patch.object(video_metadata, "_local", None),
+            clients.override("youtube", self.youtube),
+            mock.patch.object(summarization, "summarize_many", side_effect=lambda texts: [f"Summary of {text}" for text in texts]),
+            mock.patch.object(views, "generate_optimized_content", return_value=self.CONTENT),
+        )
+        for patch in patches:
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        self.addCleanup(caches["default"].clear)
+        for video_id in self.TITLES:
+            self.addCleanup(result_cache.invalidate, video_id)
+            result_cache.set("transcript", video_id, f"{video_id} transcript.")
+
+    async def post(self, **data):
+        response = await self.async_client.post("/api/generate-videos/", json.dumps(data), content_type="application/json")
+        if response.status_code != 200:
+            return response.status_code, response.json()
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        return response.status_code, [json.loads(line) async for line in response.streaming_content]
+
+    async def test_streams_one_line_per_video(self):
+        status, lines = await self.post(urls=["https://youtu.be/dQw4w9WgXcQ", "https://www.youtube.com/watch?v=dQw4w9WgXcQ"],
+                                        playlist_url="https://www.youtube.com/playlist?list=PL1")
+        self.assertEqual(status, 200)
+        self.assertEqual(lines[0], {"event": "accepted", "video_ids": ["dQw4w9WgXcQ", "jNQXAC9IVRw", "9bZkp7q19f0", "kJQP7kiw5Fk"]})
+        results = {line["video_id"]: line for line in lines[1:]}
+        self.assertEqual(len(lines), 5)
+        self.assertEqual(results["kJQP7kiw5Fk"], {"video_id": "kJQP7kiw5Fk", "error": "Video not found"})
+        self.assertEqual(results["jNQXAC9IVRw"]["title"], "Second")
+        self.assertEqual(results["jNQXAC9IVRw"]["summary"], "Summary of jNQXAC9IVRw transcript.")
+        self.assertEqual(results["9bZkp7q19f0"]["optimized_content"], self.CONTENT)
+        self.assertEqual(self.youtube.playlist_pages, [("PL1", 0), ("PL1", 2)])
+
+    async def test_playlist_expansion_stops_at_the_batch_limit(self):
+        with self.settings(BATCH_MAX_VIDEOS=2):
+            status, lines = await self.post(playlist_url="https://www.youtube.com/playlist?list=PL1")
+        self.assertEqual(lines[0]["video_ids"], ["jNQXAC9IVRw", "9bZkp7q19f0"])
+        self.assertEqual(len(lines), 3)
+        self.assertEqual(self.youtube.playlist_pages, [("PL1", 0)])
+
+    async def test_rejects_bad_input(self):
+        self.assertEqual(await self.post(), (400, {"error": "No URLs provided"}))
+        self.assertEqual(await self.post(urls=["https://example.com/video"]), (400, {"error": "Invalid YouTube URL: https://example.com/video"}))
+        self.assertEqual(await self.post(playlist_url="https://example.com/list"), (400, {"error": "Invalid playlist or channel URL"}))
+
+
+class StreamingTests(SimpleTestCase):
+    VIDEO_ID = "dQw4w9WgXcQ"
+    VIDEO_URL = "https://youtu.be/dQw4w9WgXcQ"
+    CONTENT = {"title": "T", "description": "D", "keywords": ["k"], "tags": ["t"]}
+
+    def setUp(self):
+        from django.core.cache import caches
+        from . import clients, video_metadata
+        from .result_cache import result_cache
+        for patch in (self.settings(RESULT_CACHE_ALIAS="default"), mock.patch.object(video_metadata, "_local", None),
+                      clients.override("youtube", FakeYouTube({self.VIDEO_ID: "Video"}))):
+            patch.__enter__()
+            self.addCleanup(patch.__exit__, None, None, None)
+        self.addCleanup(caches["default"].clear)
+        self.addCleanup(result_cache.invalidate, self.VIDEO_ID)
+        result_cache.set("transcript", self.VIDEO_ID, "Hello there. General Kenobi!")
+        result_cache.set("optimized_content", self.VIDEO_ID, self.CONTENT)
+
+    def events(self):
+        import asyncio
+        from .streaming import pipeline_events
+
+        async def collect():
+            return [message async for message in pipeline_events(self.VIDEO_URL, self.VIDEO_ID)]
+
+        events = []
+        for message in asyncio.run(collect()):
+            event, data = message.rstrip("\n").split("\n")
+            events.append((event.removeprefix("event: "), json.loads(data.removeprefix("data: "))))
+        return events
+
+    def test_formats_server_sent_events(self):
+        from .streaming import format_event
+        self.assertEqual(format_event("summary", {"summary": "Hi"}), 'event: summary\ndata: {"summary": "Hi"}\n\n')
+
+    def test_streams_cached_results(self):
+        from .result_cache import result_cache
+        result_cache.set("summary", self.VIDEO_ID, "Summary.")
+        events = self.events()
+        self.assertEqual([event for event, _ in events], ["metadata", "transcript_source", "summary", "optimized_content", "done"])
+        self.assertEqual(events[0][1]["title"], "Video")
+        self.assertEqual(events[1][1], {"source": "cache"})
+        self.assertEqual(events[3][1], self.CONTENT)
+
+    def test_streams_chunk_summaries_before_the_summary(self):
+        from . import summarization
+        from .result_cache import result_cache
+
+        def summarize(transcript, on_chunk=None):
+            on_chunk(1, 2, "Hello there.")
+            on_chunk(2, 2, "General Kenobi!")
+            return "Greetings."
+
+        with mock.patch.object(summarization, "summarize", side_effect=summarize):
+            events = self.events()
+        self.assertEqual([event for event, _ in events][2:5], ["chunk_summary", "chunk_summary", "summary"])
+        self.assertEqual(events[3][1], {"index": 2, "total": 2, "summary": "General Kenobi!"})
+        self.assertEqual(result_cache.get("summary", self.VIDEO_ID), "Greetings.")
+
+    def test_summarizer_failure_ends_the_stream_with_an_error(self):
+        from . import summarization
+        with mock.patch.object(summarization, "summarize", side_effect=RuntimeError("out of memory")):
+            events = self.events()
+        self.assertEqual(events[-1], ("error", {"error": "Error summarizing transcript."}))
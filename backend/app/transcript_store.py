@@ -0,0 +1,128 @@
+import logging
+from django.db import connection, transaction
+from .models import Transcript, TranscriptSegment
+from .segments import SegmentedTranscript
+
+logger = logging.getLogger(__name__)
+
+# When a video has several stored transcripts, the first source in this list wins
+SOURCE_PREFERENCE = [Transcript.MANUAL_CAPTIONS, Transcript.AUTO_CAPTIONS, Transcript.WHISPER]
+
+
+def save(video_id, segments, source, language="", model=""):
+    """Stores (or replaces) a video's transcript for one source.
+
+    ``segments`` is a ``SegmentedTranscript``, or caption entries (``text``,
+    ``start``, ``duration``) or Whisper segments (``text``, ``start``, ``end``).
+    """
+    if not isinstance(segments, SegmentedTranscript):
+        segments = SegmentedTranscript.from_segments(segments)
+
+    with transaction.atomic():
+        transcript, _ = Transcript.objects.update_or_create(
+            video_id=video_id, source=source, model=model or "",
+            defaults={"language": language or "", "text": segments.text},
+        )
+        transcript.segments.all().delete()
+        TranscriptSegment.objects.bulk_create([
+            TranscriptSegment(transcript=transcript, index=index, start=segment.start, duration=segment.duration, text=segment.text)
+            for index, segment in enumerate(segments)
+        ])
+    return transcript
+
+
+def get(video_id):
+    """Returns the preferred stored transcript for a video, or None.
+
+    Whisper transcripts from a model below the routing quality floor (made
+    when routing downgraded for latency) stay searchable but aren't returned,
+    so the next request routes the video again instead of reusing them.
+    """
+    from .routing import below_floor
+    transcripts = [
+        transcript for transcript in Transcript.objects.filter(video_id=video_id).order_by("-updated_at")
+        if not (transcript.source == Transcript.WHISPER and below_floor(transcript.model, transcript.language))
+    ]
+    if not transcripts:
+        return None
+    return min(transcripts, key=lambda transcript: SOURCE_PREFERENCE.index(transcript.source))
+
+
+def segments(video_id):
+    """Returns the preferred transcript's segments as dicts, in order."""
+    transcript = get(video_id)
+    if transcript is None:
+        return []
+    return list(transcript.segments.values("index", "start", "duration", "text"))
+
+
+def load(video_id):
+    """Returns the preferred transcript as a ``SegmentedTranscript``, or None."""
+    return load_with_source(video_id)[0]
+
+
+def load_with_source(video_id):
+    """Returns ``(SegmentedTranscript, source)`` for the preferred transcript, or ``(None, None)``."""
+    transcript = get(video_id)
+    if transcript is None:
+        return None, None
+    rows = transcript.segments.order_by("index").values("start", "duration", "text")
+    return SegmentedTranscript.from_segments(rows), transcript.source
+
+
+def delete(video_id):
+    Transcript.objects.filter(video_id=video_id).delete()
+
+
+def _fts_query(query):
+    # Quote every term so user input can't use (or break on) FTS5 query syntax
+    terms = ['"' + term.replace('"', '""') + '"' for term in query.split()]
+    return " ".join(terms)
+
+
+def search(query, limit=20, video_id=None):
+    """Full-text search over stored transcript segments, best matches first.
+
+    Returns dicts with ``video_id``, ``source``, ``start``, ``duration`` and a
+    ``snippet`` with the matched terms in [brackets].
+    """
+    if not query.strip() or limit < 1:
+        return []
+    if connection.vendor != "sqlite":
+        return _search_like(query, limit, video_id)
+
+    sql = (
+        "SELECT t.video_id, t.source, s.start, s.duration, "
+        "snippet(app_transcriptsegment_fts, 0, '[', ']', '...', 16) "
+        "FROM app_transcriptsegment_fts f "
+        "JOIN app_transcriptsegment s ON s.id = f.rowid "
+        "JOIN app_transcript t ON t.id = s.transcript_id "
+        "WHERE app_transcriptsegment_fts MATCH %s"
+    )
+    params = [_fts_query(query)]
+    if video_id:
+        sql += " AND t.video_id = %s"
+        params.append(video_id)
+    sql += " ORDER BY rank LIMIT %s"
+    params.append(limit)
+
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        rows = cursor.fetchall()
+    return [
+        {"video_id": row[0], "source": row[1], "start": row[2], "duration": row[3], "snippet": row[4]}
+        for row in rows
+    ]
+
+
+def _search_like(query, limit, video_id):
+    segments = TranscriptSegment.objects.select_related("transcript")
+    for term in query.split():
+        segments = segments.filter(text__icontains=term)
+    if video_id:
+        segments = segments.filter(transcript__video_id=video_id)
+    return [
+        {"video_id": segment.transcript.video_id, "source": segment.transcript.source,
+         "start": segment.start, "duration": segment.duration, "snippet": segment.text}
+        for segment in segments[:limit]
+    ]
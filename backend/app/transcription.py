@@ -0,0 +1,240 @@
+import threading
+import logging
+import multiprocessing
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from django.conf import settings
+from .model_registry import registry
+from . import audio_stream
+from . import concurrency
+from .audio_stream import SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+FRAME_SECONDS = 0.03  # VAD frame length
+OVERLAP_SECONDS = 1.0  # Audio repeated across a cut when no silence is found
+DEDUPE_MAX_WORDS = 20  # Longest repeated word run removed at an overlap
+
+
+def transcribe_video(video_url, size=None, video_id=None, on_text=None):
+    """Transcribes a video's audio with Whisper, in parallel when WHISPER_PARALLEL is on.
+
+    Returns the ``model.transcribe`` result shape: ``text``, ``segments`` and ``language``.
+    ``video_id`` keys the media cache; it is worked out from the URL if not given.
+    ``on_text`` receives the transcript a segment at a time, in order, while the rest is still running.
+    """
+    if video_id is None:
+        from . import views
+        video_id = views.extract_video_id(video_url)
+    if settings.WHISPER_PARALLEL:
+        windows = audio_stream.audio_windows(video_url, video_id, settings.WHISPER_SEGMENT_SECONDS)
+        return transcribe_parallel(windows, size or settings.WHISPER_MODEL_SIZE, on_text=on_text)
+    with registry.use("whisper", size) as model:
+        return audio_stream.transcribe_stream(video_url, model, video_id=video_id, on_text=on_text)
+
+
+def transcribe_file(path, size=None):
+    """Same as ``transcribe_video`` for a local audio file (used by the benchmarks)."""
+    if settings.WHISPER_PARALLEL:
+        windows = audio_stream.file_audio_windows(path, settings.WHISPER_SEGMENT_SECONDS)
+        return transcribe_parallel(windows, size or settings.WHISPER_MODEL_SIZE)
+    with registry.use("whisper", size) as model:
+        return audio_stream.transcribe_windows(audio_stream.file_audio_windows(path), model)
+
+
+# Silence detection
+def _frame_rms(audio):
+    import numpy as np
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    frames = len(audio) // frame
+    if not frames:
+        return np.zeros(0, dtype=np.float32)
+    return np.sqrt(np.mean(audio[:frames * frame].reshape(frames, frame) ** 2, axis=1))
+
+
+def find_silence(audio, search_seconds, threshold):
+    """Returns the sample index of the quietest frame in the last ``search_seconds``, or None if none is silent."""
+    search = min(len(audio), int(search_seconds * SAMPLE_RATE))
+    start = len(audio) - search
+    rms = _frame_rms(audio[start:])
+    if not len(rms):
+        return None
+    quietest = int(rms.argmin())
+    if rms[quietest] > threshold:
+        return None
+    frame = int(FRAME_SECONDS * SAMPLE_RATE)
+    return start + quietest * frame + frame // 2
+
+
+def split_on_silence(windows, search_seconds=None, threshold=None):
+    """Re-cuts a stream of audio windows so segment boundaries fall on silence.
+
+    Yields ``(offset_seconds, audio)`` pairs. When a window has no silence near
+    its end, it is cut hard and the next segment starts ``OVERLAP_SECONDS``
+    earlier; the duplicated words are removed again when stitching.
+    """
+    import numpy as np
+    search_seconds = search_seconds or settings.WHISPER_VAD_SEARCH_SECONDS
+    threshold = threshold if threshold is not None else settings.WHISPER_VAD_THRESHOLD
+    overlap = int(OVERLAP_SECONDS * SAMPLE_RATE)
+
+    carry = np.zeros(0, dtype=np.float32)
+    carry_is_overlap = False
+    offset = 0
+    for window in windows:
+        buffer = np.concatenate([carry, window])
+        cut = find_silence(buffer, search_seconds, threshold)
+        if cut:
+            yield offset / SAMPLE_RATE, buffer[:cut]
+            carry, carry_is_overlap = buffer[cut:], False
+            offset += cut
+        else:
+            yield offset / SAMPLE_RATE, buffer
+            carry, carry_is_overlap = buffer[-overlap:], True
+            offset += len(buffer) - len(carry)
+    if len(carry) and not carry_is_overlap:
+        yield offset / SAMPLE_RATE, carry
+
+
+# Worker processes
+_worker_model = None
+
+
+def _init_worker(size, threads, backend, compute_type):
+    global _worker_model
+    from .inference import load_whisper
+    if backend != "ctranslate2":
+        # CTranslate2 takes its thread count from load_whisper and runs without torch installed
+        import torch
+        torch.set_num_threads(threads)
+    _worker_model = load_whisper(size, backend, compute_type, threads)
+
+
+def _transcribe_segment(audio, language):
+    result = _worker_model.transcribe(audio, language=language, fp16=False)
+    return {"text": result["text"], "segments": result.get("segments", []), "language": result.get("language")}
+
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(size):
+    """Returns the process pool for a Whisper size; workers keep their model loaded between calls."""
+    backend = settings.WHISPER_BACKEND
+    with _pools_lock:
+        if (size, backend) not in _pools:
+            _pools[size, backend] = ProcessPoolExecutor(
+                max_workers=settings.WHISPER_PARALLEL_WORKERS,
+                mp_context=multiprocessing.get_context("spawn"),
+                initializer=_init_worker,
+                initargs=(size, settings.WHISPER_THREADS_PER_WORKER, backend, settings.WHISPER_CT2_COMPUTE_TYPE),
+            )
+        return _pools[size, backend]
+
+
+def _submitter(size, language):
+    """Returns ``(submit, workers)``: how segments are sent for transcription and how many run at once.
+
+    With INFERENCE_SERVER_SOCKET set, segments go to the host's inference
+    server, whose Whisper workers already have the model loaded, instead of a
+    process pool private to this Django process.
+    """
+    if settings.INFERENCE_SERVER_SOCKET:
+        model = registry.whisper(size)
+        executor = concurrency.get_executor("inference_server")
+        return (lambda audio: executor.submit(model.transcribe, audio, language=language, fp16=False)), settings.INFERENCE_WHISPER_WORKERS
+    pool = get_pool(size)
+    return (lambda audio: pool.submit(_transcribe_segment, audio, language)), settings.WHISPER_PARALLEL_WORKERS
+
+
+def _words(text):
+    return text.split()
+
+
+def _dedupe_overlap(previous_text, text):
+    """Drops the longest run of words at the start of ``text`` that repeats the end of ``previous_text``."""
+    previous, current = _words(previous_text), _words(text)
+    for length in range(min(DEDUPE_MAX_WORDS, len(previous), len(current)), 0, -1):
+        if [w.lower().strip(".,!?") for w in previous[-length:]] == [w.lower().strip(".,!?") for w in current[:length]]:
+            return " ".join(current[length:])
+    return text
+
+
+def _drop_words(segments, count):
+    """Removes the first ``count`` words from a run of segments, dropping the segments left empty."""
+    kept = []
+    for segment in segments:
+        words = _words(segment["text"])
+        if count >= len(words):
+            count -= len(words)
+            continue
+        if count:
+            segment = dict(segment, text=" " + " ".join(words[count:]))
+            count = 0
+        kept.append(segment)
+    return kept
+
+
+def stitch(results):
+    """Merges per-segment results in order, shifting timestamps and removing overlap duplicates.
+
+    ``results`` is a sequence of ``(offset_seconds, overlapped, result)``.
+    """
+    texts, segments = [], []
+    language = None
+    for offset, overlapped, result in results:
+        language = language or result.get("language")
+        text = result["text"].strip()
+        chunk_segments = result.get("segments", [])
+        if overlapped and texts:
+            deduped = _dedupe_overlap(texts[-1], text)
+            if deduped != text:
+                # The repeated words may span several segments
+                chunk_segments = _drop_words(chunk_segments, len(_words(text)) - len(_words(deduped)))
+            text = deduped
+        for segment in chunk_segments:
+            segments.append(dict(segment, id=len(segments), start=segment["start"] + offset, end=segment["end"] + offset))
+        if text:
+            texts.append(text)
+    return {"text": " ".join(texts), "segments": segments, "language": language}
+
+
+def transcribe_parallel(windows, size, language=None, on_text=None):
+    """Transcribes silence-aligned segments across worker processes and stitches them in order.
+
+    At most two segments per worker are in flight, so memory stays bounded
+    no matter how long the audio is. ``on_text`` gets each segment's text,
+    with overlap duplicates removed, as soon as the segments before it are done.
+    """
+    submit, workers = _submitter(size, language)
+    max_in_flight = workers * 2
+    pending = deque()
+    results = []
+    previous_end = 0.0
+    previous_text = ""
+
+    def collect_oldest():
+        nonlocal previous_text
+        offset, overlapped, future = pending.popleft()
+        result = future.result()
+        results.append((offset, overlapped, result))
+        if on_text:
+            text = result["text"].strip()
+            if overlapped and previous_text:
+                text = _dedupe_overlap(previous_text, text)
+            if text:
+                on_text(text)
+                previous_text = text
+
+    for offset, audio in split_on_silence(windows):
+        overlapped = offset < previous_end - 1e-6
+        previous_end = offset + len(audio) / SAMPLE_RATE
+        pending.append((offset, overlapped, submit(audio)))
+        if len(pending) >= max_in_flight:
+            collect_oldest()
+    while pending:
+        collect_oldest()
+
+    logger.debug(f"Transcribed {len(results)} segments with {workers} workers")
+    return stitch(results)
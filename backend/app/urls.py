@@ -1,8 +1,18 @@
+from django.conf import settings
 from django.urls import path
 from . import views  # Assuming your views are in the same app
 
 urlpatterns = [
     path('fetch-video/', views.fetch_video_data, name='fetch_video'),  # Changed dash to underscore for consistency
+    path('fetch-videos/', views.fetch_videos_data, name='fetch_videos'),
     path('download-video/', views.download_video, name='download_video'),  # Changed dash to underscore for consistency
     path('generate-video/', views.optimize_video_content, name='generate_video'),  # Changed dash to underscore for consistency
+    path('generate-videos/', views.optimize_video_batch, name='generate_videos'),
+    path('stream-video/', views.stream_video_content, name='stream_video'),
+    path('jobs/<uuid:job_id>/', views.job_status, name='job_status'),
+    path('transcripts/search/', views.search_transcripts, name='search_transcripts'),
 ]
+
+# Lightweight metadata workers only serve the endpoints that need no ML models
+if settings.WORKER_ROLE == "metadata":
+    urlpatterns = [pattern for pattern in urlpatterns if pattern.name in ("fetch_video", "fetch_videos", "job_status", "search_transcripts")]
@@ -1,10 +1,8 @@
-import os
-import yt_dlp
-import whisper
 from urllib.parse import urlparse, parse_qs
-from transformers import pipeline
 from youtube_transcript_api import YouTubeTranscriptApi
 import openai
+from . import summarization
+from . import transcription
 
 
 def extract_video_id(video_url):
@@ -25,26 +23,13 @@ def fetch_transcript(video_url, video_id, youtube_api_key):
         return " ".join([seg["text"] for seg in transcript])
     except Exception:
         # Fallback to Whisper transcription
-        with tempfile.TemporaryDirectory() as temp_dir:
-            audio_file = os.path.join(temp_dir, "audio.mp3")
-
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': audio_file,
-                'quiet': True,
-            }
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
-
-            model = whisper.load_model("base")
-            result = model.transcribe(audio_file)
-            return result["text"]
+        result = transcription.transcribe_video(video_url, "base")
+        return result["text"]
 
 
 def summarize_text_huggingface(text):
     """Summarize text using Hugging Face."""
-    summarizer = pipeline("summarization", model="facebook/bart-large-cnn")
-    return summarizer(text, max_length=100, min_length=50, do_sample=False)[0]["summary_text"]
+    return summarization.summarize(text)
 
 
 def generate_optimized_content(openai_api_key, summary):
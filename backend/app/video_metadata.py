@@ -0,0 +1,150 @@
+import re
+import time
+import hashlib
+import logging
+from django.conf import settings
+from django.core.cache import caches
+from .result_cache import LRUCache
+from . import clients
+from . import metrics
+
+logger = logging.getLogger(__name__)
+
+PAGE_SIZE = 50  # Most ids / results the YouTube Data API accepts or returns per call
+PARTS = "snippet,contentDetails"  # Same quota cost as snippet alone, and carries the duration
+
+_local = None
+
+
+def parse_duration(iso_duration):
+    """Converts an ISO 8601 duration such as ``PT1H2M3S`` to seconds."""
+    match = re.match(r"P(?:(\d+)D)?T?(?:(\d+)H)?(?:(\d+)M)?(?:(\d+)S)?", iso_duration or "")
+    if not match:
+        return None
+    days, hours, minutes, seconds = (int(group) if group else 0 for group in match.groups())
+    return days * 86400 + hours * 3600 + minutes * 60 + seconds
+
+
+def _local_cache():
+    global _local
+    if _local is None:
+        # Freshness is decided per entry below, so the LRU itself never expires anything
+        _local = LRUCache(settings.METADATA_CACHE_LOCAL_ENTRIES, 0)
+    return _local
+
+
+def _key(video_id):
+    return f"video-metadata:{video_id}"
+
+
+def _list_key(video_ids):
+    return "video-metadata:list:" + hashlib.sha1(",".join(sorted(video_ids)).encode()).hexdigest()
+
+
+def _cached(video_id):
+    entry = _local_cache().get(_key(video_id))
+    if isinstance(entry, dict) and _is_fresh(entry):
+        return entry
+    # Another worker may have refreshed it since
+    shared = caches[settings.RESULT_CACHE_ALIAS].get(_key(video_id))
+    if shared is not None and (not isinstance(entry, dict) or shared["fetched_at"] > entry["fetched_at"]):
+        _local_cache().set(_key(video_id), shared)
+        return shared
+    return entry if isinstance(entry, dict) else None
+
+
+def _store(video_id, entry):
+    _local_cache().set(_key(video_id), entry)
+    caches[settings.RESULT_CACHE_ALIAS].set(_key(video_id), entry, timeout=settings.METADATA_CACHE_MAX_AGE or None)
+
+
+def _is_fresh(entry):
+    ttl = settings.METADATA_CACHE_TTL if entry["metadata"] else settings.METADATA_MISSING_TTL
+    return time.time() - entry["fetched_at"] < ttl
+
+
+def _parse(item):
+    snippet = item["snippet"]
+    thumbnails = snippet.get("thumbnails", {})
+    thumbnail = thumbnails.get("high") or thumbnails.get("default") or {}
+    return {
+        "title": snippet["title"],
+        "thumbnail": thumbnail.get("url"),
+        "channel_title": snippet.get("channelTitle"),
+        "published_at": snippet.get("publishedAt"),
+        "duration_seconds": parse_duration(item.get("contentDetails", {}).get("duration")),
+    }
+
+
+def _fetch(video_ids, previous, api_key=None):
+    """Fetches up to PAGE_SIZE videos in one call, revalidating with the list's ETag when every id was cached before."""
+    from googleapiclient.errors import HttpError
+
+    cache = caches[settings.RESULT_CACHE_ALIAS]
+    list_key = _list_key(video_ids)
+    request = clients.youtube(api_key).videos().list(part=PARTS, id=",".join(video_ids))
+    etag = cache.get(list_key) if all(video_id in previous for video_id in video_ids) else None
+    if etag:
+        request.headers["If-None-Match"] = etag
+
+    now = time.time()
+    try:
+        with metrics.timed("youtube_videos_list"):
+            response = request.execute()
+    except HttpError as e:
+        if etag and e.resp.status == 304:
+            metrics.inc("video_metadata_requests_total", len(video_ids), outcome="revalidated")
+            entries = {video_id: dict(previous[video_id], fetched_at=now) for video_id in video_ids}
+            for video_id, entry in entries.items():
+                _store(video_id, entry)
+            return entries
+        raise
+
+    metrics.inc("video_metadata_requests_total", len(video_ids), outcome="miss")
+    entries = {video_id: {"metadata": None, "etag": None, "fetched_at": now} for video_id in video_ids}
+    for item in response.get("items", []):
+        entries[item["id"]] = {"metadata": _parse(item), "etag": item.get("etag"), "fetched_at": now}
+    for video_id, entry in entries.items():
+        _store(video_id, entry)
+    if response.get("etag"):
+        cache.set(list_key, response["etag"], timeout=settings.METADATA_CACHE_MAX_AGE or None)
+    return entries
+
+
+def get_entries(video_ids, api_key=None):
+    """Returns ``{video_id: entry}`` with ``metadata`` (None for videos that don't exist) and ``etag``.
+
+    Fresh cached entries cost no API quota. The rest are fetched (or
+    revalidated) ``PAGE_SIZE`` ids per ``videos.list`` call.
+    """
+    video_ids = list(dict.fromkeys(video_ids))
+    entries, previous, stale = {}, {}, []
+    for video_id in video_ids:
+        entry = _cached(video_id)
+        if entry and _is_fresh(entry):
+            entries[video_id] = entry
+            continue
+        if entry:
+            previous[video_id] = entry
+        stale.append(video_id)
+    if entries:
+        metrics.inc("video_metadata_requests_total", len(entries), outcome="hit")
+
+    for start in range(0, len(stale), PAGE_SIZE):
+        entries.update(_fetch(stale[start:start + PAGE_SIZE], previous, api_key))
+    return entries
+
+
+def get_many(video_ids, api_key=None):
+    """Returns ``{video_id: metadata}`` for the videos that exist."""
+    return {video_id: entry["metadata"] for video_id, entry in get_entries(video_ids, api_key).items() if entry["metadata"]}
+
+
+def get(video_id, api_key=None):
+    """Returns one video's metadata, or None if it doesn't exist."""
+    return get_many([video_id], api_key).get(video_id)
+
+
+def invalidate(video_id):
+    _local_cache().delete(_key(video_id))
+    caches[settings.RESULT_CACHE_ALIAS].delete(_key(video_id))
@@ -1,20 +1,34 @@
 import os
-from django.http import JsonResponse
-from googleapiclient.discovery import build
+from django.http import HttpResponse, HttpResponseNotModified, JsonResponse, StreamingHttpResponse
+from django.utils.http import parse_etags, quote_etag
 from googleapiclient.errors import HttpError
 from urllib.parse import urlparse, parse_qs
-import boto3
-import yt_dlp
 import logging
 from django.conf import settings
+from asgiref.sync import sync_to_async
 from django.views.decorators.csrf import csrf_exempt
 import json
+import hashlib
 import tempfile
-import whisper
-from transformers import pipeline
 from youtube_transcript_api import YouTubeTranscriptApi
-import torch
-import openai
+from .model_registry import registry
+from . import summarization
+from . import transcription
+from . import streaming
+from .models import PipelineJob
+from . import jobs
+from . import concurrency
+from . import clients
+from . import s3_transfer
+from . import single_flight
+from . import batch
+from . import metrics
+from . import transcript_store
+from . import llm
+from . import media_cache
+from . import admission
+from .segments import SegmentedTranscript
+from . import video_metadata
 
 logger = logging.getLogger(__name__)
 
@@ -27,8 +41,6 @@ if not YOUTUBE_API_KEY:
 if not OPENAI_API_KEY:
     raise ValueError("OpenAI API Key not set. Please configure it in environment variables.")
 
-openai.api_key = OPENAI_API_KEY
-
 # Extract Video ID from URL
 def extract_video_id(video_url):
     try:
@@ -44,8 +56,12 @@ def extract_video_id(video_url):
         return None
 
 # Fetch Video Metadata
+def get_video_metadata(video_id):
+    """Returns the title, thumbnail and duration of a video, or None if it doesn't exist."""
+    return video_metadata.get(video_id, YOUTUBE_API_KEY)
+
 @csrf_exempt
-def fetch_video_data(request):
+async def fetch_video_data(request):
     if request.method != "GET":
         return JsonResponse({"error": "Invalid request method."}, status=405)
 
@@ -58,17 +74,11 @@ def fetch_video_data(request):
         return JsonResponse({"error": "Invalid YouTube URL"}, status=400)
 
     try:
-        youtube = build("youtube", "v3", developerKey=YOUTUBE_API_KEY)
-        response = youtube.videos().list(part="snippet", id=video_id).execute()
-
-        if "items" not in response or not response["items"]:
+        video_data = await concurrency.run_in("youtube_api", get_video_metadata, video_id)
+        if not video_data:
             return JsonResponse({"error": "Video not found"}, status=404)
 
-        video_data = response["items"][0]["snippet"]
-        return JsonResponse({
-            "title": video_data["title"],
-            "thumbnail": video_data["thumbnails"]["high"]["url"],
-        })
+        return JsonResponse(video_data)
 
     except HttpError as e:
         logger.error(f"Error fetching video metadata: {e}")
@@ -77,9 +87,118 @@ def fetch_video_data(request):
         logger.error(f"An unexpected error occurred: {e}")
         return JsonResponse({"error": f"An unexpected error occurred: {e}"}, status=500)
 
+# API Endpoint for Metadata of Many Videos
+MAX_METADATA_IDS = video_metadata.PAGE_SIZE
+
+async def fetch_videos_data(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method."}, status=405)
+
+    video_ids = [video_id for video_id in request.GET.get("ids", "").split(",") if video_id]
+    for video_url in request.GET.getlist("url"):
+        video_id = extract_video_id(video_url)
+        if not video_id:
+            return JsonResponse({"error": f"Invalid YouTube URL: {video_url}"}, status=400)
+        video_ids.append(video_id)
+    video_ids = list(dict.fromkeys(video_ids))
+    if not video_ids:
+        return JsonResponse({"error": "No video ids provided"}, status=400)
+    if len(video_ids) > MAX_METADATA_IDS:
+        return JsonResponse({"error": f"At most {MAX_METADATA_IDS} videos per request"}, status=400)
+
+    try:
+        entries = await concurrency.run_in("youtube_api", video_metadata.get_entries, video_ids, YOUTUBE_API_KEY)
+    except HttpError as e:
+        logger.error(f"Error fetching video metadata: {e}")
+        return JsonResponse({"error": f"Error fetching video metadata: {e}"}, status=500)
+
+    # The response changes only when one of the videos' own ETags does
+    etag = quote_etag(hashlib.sha1(
+        "|".join(f"{video_id}:{entries[video_id]['etag']}" for video_id in video_ids).encode()
+    ).hexdigest())
+    if etag in parse_etags(request.headers.get("If-None-Match", "")):
+        response = HttpResponseNotModified()
+    else:
+        response = JsonResponse({
+            "videos": {video_id: entries[video_id]["metadata"] for video_id in video_ids if entries[video_id]["metadata"]},
+            "missing": [video_id for video_id in video_ids if not entries[video_id]["metadata"]],
+        })
+    response["ETag"] = etag
+    return response
+
 # Download Video and Upload to S3
+# yt_dlp and boto3 are imported on first download; their errors are re-raised as these
+class DownloadError(Exception):
+    pass
+
+class UploadError(Exception):
+    pass
+
+def download_to_file(video_url, downloaded_file):
+    import yt_dlp
+    ydl_opts = {
+        'format': 'best',
+        'outtmpl': downloaded_file,
+        'quiet': False,
+        'logger': logger,
+    }
+
+    try:
+        with metrics.timed("yt_dlp", format="video"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+            logger.debug(f"Downloading video: {video_url}")
+            ydl.download([video_url])
+    except yt_dlp.utils.DownloadError as e:
+        raise DownloadError(str(e)) from e
+    if os.path.exists(downloaded_file):
+        metrics.inc("bytes_downloaded_total", os.path.getsize(downloaded_file), source="yt_dlp")
+
+def upload_to_s3(downloaded_file, s3_key):
+    from boto3.exceptions import S3UploadFailedError
+    s3_client = clients.s3()
+    logger.debug(f"Uploading to S3 bucket: {settings.AWS_STORAGE_BUCKET_NAME}, key: {s3_key}")
+    try:
+        with metrics.timed("s3_upload"):
+            s3_client.upload_file(downloaded_file, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+    except S3UploadFailedError as e:
+        raise UploadError(str(e)) from e
+    metrics.inc("bytes_uploaded_total", os.path.getsize(downloaded_file), destination="s3")
+
+def download_and_upload(video_url, s3_key, video_id=None):
+    """Puts the video in S3 unless it's already there. Returns a status message.
+
+    A copy is kept in the media cache, and a cached copy is uploaded without
+    downloading again.
+    """
+    if s3_transfer.object_exists(s3_key):
+        return "Video already uploaded."
+
+    video_id = video_id or extract_video_id(video_url)
+    cached = media_cache.lookup(video_id, media_cache.VIDEO)
+    if cached:
+        upload_to_s3(cached, s3_key)
+        return "Video uploaded successfully."
+
+    with media_cache.writing(video_id, media_cache.VIDEO) as cache_path:
+        if settings.S3_STREAMING_UPLOAD:
+            if cache_path is None:
+                s3_transfer.stream_upload(video_url, s3_key)
+            else:
+                with open(cache_path, "wb") as cache_file:
+                    s3_transfer.stream_upload(video_url, s3_key, tee=cache_file)
+            return "Video uploaded successfully."
+
+        # Without the cache, a private directory per download so concurrent requests never share a file
+        with tempfile.TemporaryDirectory() as temp_dir:
+            downloaded_file = cache_path or os.path.join(temp_dir, os.path.basename(s3_key))
+            download_to_file(video_url, downloaded_file)
+            if not os.path.exists(downloaded_file):
+                raise FileNotFoundError(downloaded_file)
+            upload_to_s3(downloaded_file, s3_key)
+    return "Video uploaded successfully."
+
 @csrf_exempt
-def download_video(request):
+@admission.admit(admission.MEDIUM)
+async def download_video(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request method."}, status=405)
 
@@ -93,121 +212,162 @@ def download_video(request):
     if not video_id:
         return JsonResponse({"error": "Invalid YouTube URL"}, status=400)
 
-    downloaded_file = f"/tmp/{video_id}.mp4"
+    s3_key = f"videos/{video_id}.mp4"
+    video_url_s3 = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
     try:
-        ydl_opts = {
-            'format': 'best',
-            'outtmpl': downloaded_file,
-            'quiet': False,
-            'logger': logger,
-        }
-
-        with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-            logger.debug(f"Downloading video: {video_url}")
-            ydl.download([video_url])
-
-        if not os.path.exists(downloaded_file):
-            return JsonResponse({"error": "Downloaded file not found."}, status=500)
-
-        s3_client = boto3.client(
-            's3',
-            aws_access_key_id=settings.AWS_ACCESS_KEY_ID,
-            aws_secret_access_key=settings.AWS_SECRET_ACCESS_KEY
+        # Concurrent requests for the same video share one download instead of racing each other
+        message = await concurrency.run_in(
+            "yt_dlp", single_flight.run, "download", video_id,
+            lambda: download_and_upload(video_url, s3_key, video_id),
         )
-        s3_key = f"videos/{video_id}.mp4"
-        logger.debug(f"Uploading to S3 bucket: {settings.AWS_STORAGE_BUCKET_NAME}, key: {s3_key}")
-        s3_client.upload_file(downloaded_file, settings.AWS_STORAGE_BUCKET_NAME, s3_key)
+        return JsonResponse({"message": message, "url": video_url_s3})
 
-        os.remove(downloaded_file)
-
-        video_url_s3 = f"https://{settings.AWS_STORAGE_BUCKET_NAME}.s3.amazonaws.com/{s3_key}"
-        return JsonResponse({"message": "Video uploaded successfully.", "url": video_url_s3})
-
-    except yt_dlp.utils.DownloadError as e:
+    except DownloadError as e:
         logger.error(f"Download failed: {str(e)}")
         return JsonResponse({"error": f"Download error: {str(e)}"}, status=500)
-    except boto3.exceptions.S3UploadFailedError as e:
+    except s3_transfer.StreamUploadError as e:
+        logger.error(f"Streaming upload failed: {str(e)}")
+        return JsonResponse({"error": f"Download error: {str(e)}"}, status=500)
+    except FileNotFoundError as e:
+        logger.error(f"Download failed: {str(e)}")
+        return JsonResponse({"error": "Downloaded file not found."}, status=500)
+    except UploadError as e:
         logger.error(f"S3 upload failed: {str(e)}")
         return JsonResponse({"error": f"S3 upload failed: {str(e)}"}, status=500)
     except Exception as e:
         logger.exception("Unexpected error occurred")
         return JsonResponse({"error": f"Unexpected error: {str(e)}"}, status=500)
-    finally:
-        if os.path.exists(downloaded_file):
-            try:
-                os.remove(downloaded_file)
-            except Exception as e:
-                logger.error(f"Failed to clean up file: {downloaded_file}, Error: {str(e)}")
 
 # Fetch Video Transcript
-def fetch_transcript(video_id):
-    """Fetches the transcript using YouTubeTranscriptApi if available."""
+def fetch_segments_with_source(video_id):
+    """Fetches the transcript as a ``SegmentedTranscript`` and where it came from
+    ("manual_captions", "auto_captions" or "whisper").
+
+    Transcripts already in the transcript store are served from there
+    without calling YouTube.
+    """
+    if settings.TRANSCRIPT_STORE:
+        try:
+            stored, source = transcript_store.load_with_source(video_id)
+        except Exception as e:
+            logger.error(f"Error reading transcript store: {e}")
+            stored = None
+        metrics.inc("transcript_store_requests_total", outcome="hit" if stored else "miss")
+        if stored:
+            return stored, source
+
+    with metrics.timed("fetch_transcript"):
+        segments, source, language = _fetch_captions(video_id)
+    metrics.inc("transcript_source_total", source=source or "unavailable")
+    if not segments:
+        return None, None
+    store_transcript(video_id, segments, source, language)
+    return segments, source
+
+def fetch_transcript_with_source(video_id):
+    """Same as ``fetch_segments_with_source`` with the transcript as plain text."""
+    segments, source = fetch_segments_with_source(video_id)
+    return (segments.text, source) if segments else (None, None)
+
+def _fetch_captions(video_id):
+    """Returns ``(SegmentedTranscript, source, language)`` from YouTube captions, or Nones."""
     try:
         transcript_list = YouTubeTranscriptApi.list_transcripts(video_id)
         for transcript in transcript_list:
             if not transcript.is_generated:
-                segments = transcript.fetch()
-                return " ".join(segment['text'] for segment in segments)
+                return SegmentedTranscript.from_segments(transcript.fetch()), "manual_captions", transcript.language_code
         
         auto_transcript = transcript_list.find_generated_transcript(['en'])
         if auto_transcript:
-            segments = auto_transcript.fetch()
-            return " ".join(segment['text'] for segment in segments)
+            return SegmentedTranscript.from_segments(auto_transcript.fetch()), "auto_captions", auto_transcript.language_code
 
     except Exception as e:
         logger.error(f"Error fetching transcript: {e}")
-    return None
+    return None, None, None
 
-# Whisper Transcription Fallback
-def transcribe_with_whisper(video_url):
+def store_transcript(video_id, segments, source, language="", model=""):
+    """Keeps a fetched or transcribed transcript for reuse and search; failures are only logged."""
+    if not settings.TRANSCRIPT_STORE or not video_id:
+        return
     try:
-        with tempfile.TemporaryDirectory() as temp_dir:
-            temp_audio_file = os.path.join(temp_dir, "audio.mp3")
+        transcript_store.save(video_id, segments, source, language, model)
+    except Exception as e:
+        logger.error(f"Error saving transcript for {video_id}: {e}")
 
-            ydl_opts = {
-                'format': 'bestaudio/best',
-                'outtmpl': temp_audio_file,
-                'extractaudio': True,
-                'audioquality': 1,
-            }
+def fetch_transcript(video_id):
+    """Fetches the transcript using YouTubeTranscriptApi if available."""
+    return fetch_transcript_with_source(video_id)[0]
 
-            # Download audio using yt-dlp
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                ydl.download([video_url])
+# Whisper Transcription Fallback
+def transcribe_with_whisper(video_url, size=None, on_text=None):
+    """Same as ``transcribe_segments`` with the transcript as plain text."""
+    segments = transcribe_segments(video_url, size, on_text)
+    return segments.text if segments else None
+
+def transcribe_segments(video_url, size=None, on_text=None):
+    """Transcribes with Whisper into a ``SegmentedTranscript``; ``on_text`` is fed the transcript
+    piece by piece where the mode allows it."""
+    size = size or settings.WHISPER_MODEL_SIZE
+    metrics.inc("transcript_source_total", source="whisper")
+    try:
+        if settings.WHISPER_STREAMING:
+            with metrics.timed("whisper", mode="parallel" if settings.WHISPER_PARALLEL else "stream"):
+                result = transcription.transcribe_video(video_url, size, extract_video_id(video_url), on_text)
+            return _store_whisper_result(video_url, result, size)
+
+        import whisper
+        import yt_dlp
+        video_id = extract_video_id(video_url)
+        cached = media_cache.lookup(video_id, media_cache.AUDIO)
+        with media_cache.writing(video_id, media_cache.AUDIO) as cache_path, tempfile.TemporaryDirectory() as temp_dir:
+            audio_file = cached
+            if not audio_file:
+                audio_file = cache_path or os.path.join(temp_dir, "audio.mp3")
+                ydl_opts = {
+                    'format': 'bestaudio/best',
+                    'outtmpl': audio_file,
+                    'extractaudio': True,
+                    'audioquality': 1,
+                }
+
+                # Download audio using yt-dlp
+                with metrics.timed("yt_dlp", format="audio"), yt_dlp.YoutubeDL(ydl_opts) as ydl:
+                    ydl.download([video_url])
+                metrics.inc("bytes_downloaded_total", os.path.getsize(audio_file), source="yt_dlp")
 
             # Convert to wav for Whisper
-            audio = whisper.audio.load_audio(temp_audio_file)
-            model = whisper.load_model("large")
-            result = model.transcribe(audio)
-            return result['text']
+            audio = whisper.audio.load_audio(audio_file)
+            with registry.use("whisper", size) as model, metrics.timed("whisper_transcribe"):
+                result = model.transcribe(audio)
+            if on_text:
+                on_text(result['text'])
+            return _store_whisper_result(video_url, result, size)
 
     except Exception as e:
         logger.error(f"Error during Whisper transcription: {e}")
     return None
 
+def _store_whisper_result(video_url, result, size):
+    segments = SegmentedTranscript.from_whisper(result)
+    store_transcript(extract_video_id(video_url), segments, "whisper", result.get('language') or "", size)
+    return segments
+
 # Hugging Face Summarization
+# Bump when the chunking or generation parameters change to invalidate cached summaries
+SUMMARY_VERSION = "tokens-batched-v1"
+
 def summarize_text(text):
     try:
-        summarizer = pipeline("summarization", model="facebook/bart-large-cnn", device=0 if torch.cuda.is_available() else -1)
-        max_input_length = 1024
-        chunk_overlap = 100
-        text_chunks = [
-            text[i:i + max_input_length]
-            for i in range(0, len(text), max_input_length - chunk_overlap)
-        ]
-        summaries = [
-            summarizer(chunk, max_length=100, min_length=50, do_sample=False)[0]['summary_text']
-            for chunk in text_chunks
-        ]
-        return " ".join(summaries)
+        with metrics.timed("summarize"):
+            return summarization.summarize(text)
     except Exception as e:
         logger.error(f"Error summarizing text: {e}")
         return None
 
 # Generate Optimized Content with OpenAI
-def generate_optimized_content(summarized_transcript):
-    try:
-        prompt = f"""
+OPENAI_MODEL = settings.OPENAI_MODEL
+SYSTEM_PROMPT = "You are an SEO expert."
+OPTIMIZATION_PROMPT = """
         Analyze the following summarized YouTube video transcript and:
         1. Extract the top 10 keywords.
         2. Generate an optimized title (less than 65 characters).
@@ -225,23 +385,30 @@ def generate_optimized_content(summarized_transcript):
             "tags": ["tag1", "tag2", ..., "tag10"]
         }}
         """
-        response = openai.ChatCompletion.create(
-            model="gpt-4o",
-            messages=[
-                {"role": "system", "content": "You are an SEO expert."},
-                {"role": "user", "content": prompt}
-            ]
-        )
-        response_content = response['choices'][0]['message']['content']
-        return json.loads(response_content)
+# Changes whenever the prompt text changes, so cached OpenAI output is not reused for a new prompt
+PROMPT_VERSION = hashlib.sha1(OPTIMIZATION_PROMPT.encode()).hexdigest()[:8]
+
+def optimization_messages(summarized_transcript):
+    """Builds the chat messages, trimming the summary so the prompt fits LLM_MAX_PROMPT_TOKENS."""
+    budget = settings.LLM_MAX_PROMPT_TOKENS - llm.count_tokens(SYSTEM_PROMPT + OPTIMIZATION_PROMPT)
+    summary = llm.trim_to_budget(summarized_transcript, budget)
+    return [
+        {"role": "system", "content": SYSTEM_PROMPT},
+        {"role": "user", "content": OPTIMIZATION_PROMPT.format(summarized_transcript=summary)}
+    ]
 
+def generate_optimized_content(summarized_transcript):
+    try:
+        with metrics.timed("openai"):
+            return llm.chat_json(optimization_messages(summarized_transcript))
     except Exception as e:
         logger.error(f"Error generating optimized content: {e}")
         return None
 
 # API Endpoint for Content Optimization
 @csrf_exempt
-def optimize_video_content(request):
+@admission.admit(admission.HEAVY, concurrency=False)
+async def optimize_video_content(request):
     if request.method != "POST":
         return JsonResponse({"error": "Invalid request method."}, status=405)
 
@@ -255,22 +422,107 @@ def optimize_video_content(request):
     if not video_id:
         return JsonResponse({"error": "Invalid YouTube URL"}, status=400)
 
-    # Fetch transcript
-    transcript = fetch_transcript(video_id)
-    if not transcript:
-        transcript = transcribe_with_whisper(video_url)
+    try:
+        job = await sync_to_async(jobs.submit_job)(video_url, video_id)
+    except jobs.JobQueueFull as e:
+        logger.error(f"Rejecting job for {video_id}: {e}")
+        return admission.too_many_requests("Too many pending jobs. Please try again later.", settings.ADMISSION_RETRY_AFTER)
+
+    return JsonResponse({
+        "job_id": str(job.id),
+        "status": job.status,
+        "status_url": request.build_absolute_uri(f"/api/jobs/{job.id}/"),
+    }, status=202)
+
+# API Endpoint for Job Status
+async def job_status(request, job_id):
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method."}, status=405)
 
-    if not transcript:
-        return JsonResponse({"error": "Could not fetch or transcribe the video."}, status=500)
+    try:
+        job = await PipelineJob.objects.aget(id=job_id)
+    except PipelineJob.DoesNotExist:
+        return JsonResponse({"error": "Job not found"}, status=404)
 
-    # Summarize transcript
-    summary = summarize_text(transcript)
-    if not summary:
-        return JsonResponse({"error": "Error summarizing transcript."}, status=500)
+    return JsonResponse(jobs.job_payload(job))
 
-    # Generate optimized content
-    optimized_content = generate_optimized_content(summary)
-    if not optimized_content:
-        return JsonResponse({"error": "Error generating optimized content."}, status=500)
+# API Endpoint for Streaming Pipeline Progress (Server-Sent Events)
+@admission.admit(admission.HEAVY)
+async def stream_video_content(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method."}, status=405)
 
-    return JsonResponse({"summary": summary, "optimized_content": optimized_content})
+    video_url = request.GET.get("url")
+    if not video_url:
+        return JsonResponse({"error": "No URL provided"}, status=400)
+
+    video_id = extract_video_id(video_url)
+    if not video_id:
+        return JsonResponse({"error": "Invalid YouTube URL"}, status=400)
+
+    response = StreamingHttpResponse(streaming.pipeline_events(video_url, video_id), content_type="text/event-stream")
+    response["Cache-Control"] = "no-cache"
+    response["X-Accel-Buffering"] = "no"  # Stop nginx from buffering the stream
+    return response
+
+# API Endpoint for Batch Optimization (list of URLs, playlist or channel)
+@csrf_exempt
+@admission.admit(admission.HEAVY)
+async def optimize_video_batch(request):
+    if request.method != "POST":
+        return JsonResponse({"error": "Invalid request method."}, status=405)
+
+    data = json.loads(request.body)
+    video_urls = data.get("urls") or []
+    playlist_url = data.get("playlist_url")
+
+    if not video_urls and not playlist_url:
+        return JsonResponse({"error": "No URLs provided"}, status=400)
+
+    video_ids = []
+    for video_url in video_urls:
+        video_id = extract_video_id(video_url)
+        if not video_id:
+            return JsonResponse({"error": f"Invalid YouTube URL: {video_url}"}, status=400)
+        video_ids.append(video_id)
+
+    if playlist_url:
+        try:
+            playlist_id = await concurrency.run_in("youtube_api", batch.playlist_id_from_url, playlist_url)
+            if not playlist_id:
+                return JsonResponse({"error": "Invalid playlist or channel URL"}, status=400)
+            video_ids += await concurrency.run_in("youtube_api", batch.expand_playlist, playlist_id, settings.BATCH_MAX_VIDEOS)
+        except HttpError as e:
+            logger.error(f"Error expanding playlist: {e}")
+            return JsonResponse({"error": f"Error expanding playlist: {e}"}, status=500)
+
+    video_ids = list(dict.fromkeys(video_ids))[:settings.BATCH_MAX_VIDEOS]
+    if not video_ids:
+        return JsonResponse({"error": "No videos found"}, status=404)
+
+    # One JSON object per line, written as each video finishes
+    response = StreamingHttpResponse(batch.batch_lines(video_ids), content_type="application/x-ndjson")
+    response["X-Accel-Buffering"] = "no"
+    return response
+
+# API Endpoint for Searching Stored Transcripts
+async def search_transcripts(request):
+    if request.method != "GET":
+        return JsonResponse({"error": "Invalid request method."}, status=405)
+
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return JsonResponse({"error": "No query provided"}, status=400)
+    try:
+        limit = min(int(request.GET.get("limit", 20)), settings.TRANSCRIPT_SEARCH_MAX_RESULTS)
+    except ValueError:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+    if limit < 1:
+        return JsonResponse({"error": "Invalid limit"}, status=400)
+
+    results = await sync_to_async(transcript_store.search)(query, limit, request.GET.get("video_id"))
+    return JsonResponse({"query": query, "results": results})
+
+# Prometheus Metrics Endpoint
+def metrics_view(request):
+    return HttpResponse(metrics.render(), content_type="text/plain; version=0.0.4; charset=utf-8")
@@ -14,3 +14,8 @@ from django.core.asgi import get_asgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_asgi_application()
+
+# Resume jobs left behind by a crashed or restarted process without waiting for a new submission
+from app import jobs
+
+jobs.start()
@@ -177,3 +177,180 @@ AWS_S3_FILE_OVERWRITE = False
 AWS_DEFAULT_ACL = None  # Ensure no default ACL is set
 AWS_S3_VERIFY = True
 DEFAULT_FILE_STORAGE = 'storages.backends.s3boto3.S3Boto3Storage'
+
+# ML model registry
+WHISPER_MODEL_SIZE = os.getenv('WHISPER_MODEL_SIZE', 'large')
+SUMMARIZER_MODEL = os.getenv('SUMMARIZER_MODEL', 'facebook/bart-large-cnn')
+MODEL_MAX_LOADED = int(os.getenv('MODEL_MAX_LOADED', '2'))  # Models kept loaded per worker process
+MODEL_IDLE_TIMEOUT = int(os.getenv('MODEL_IDLE_TIMEOUT', '0'))  # Seconds before an unused model is evicted, 0 = never
+MODEL_MIN_FREE_MB = int(os.getenv('MODEL_MIN_FREE_MB', '0'))  # Evict models before loading when free RAM is below this
+MODEL_WARM_ON_STARTUP = os.getenv('MODEL_WARM_ON_STARTUP', 'False') == 'True'
+
+# Background jobs for /api/generate-video/
+JOB_WORKERS = int(os.getenv('JOB_WORKERS', '2'))  # Pipeline runs in parallel per web process
+JOB_QUEUE_LIMIT = int(os.getenv('JOB_QUEUE_LIMIT', '50'))  # Queued + running jobs before new ones are rejected
+JOB_HEARTBEAT_SECONDS = int(os.getenv('JOB_HEARTBEAT_SECONDS', '15'))  # How often a process marks its jobs alive
+JOB_HEARTBEAT_TIMEOUT = int(os.getenv('JOB_HEARTBEAT_TIMEOUT', '120'))  # Jobs not marked alive for this long are taken over by another process
+
+# Cache for per-stage pipeline results (transcript, summary, optimized content)
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    'results': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': os.getenv('RESULT_CACHE_DIR', str(BASE_DIR / 'cache' / 'results')),
+        'TIMEOUT': None,
+        'OPTIONS': {
+            'MAX_ENTRIES': int(os.getenv('RESULT_CACHE_MAX_ENTRIES', '5000')),
+        },
+    },
+}
+RESULT_CACHE_ALIAS = 'results'
+RESULT_CACHE_TTL = int(os.getenv('RESULT_CACHE_TTL', str(7 * 24 * 3600)))  # Seconds, 0 = no expiry
+RESULT_CACHE_LOCAL_ENTRIES = int(os.getenv('RESULT_CACHE_LOCAL_ENTRIES', '256'))  # In-process LRU size
+
+# Transcript summarization
+SUMMARIZER_BATCH_SIZE = int(os.getenv('SUMMARIZER_BATCH_SIZE', '4'))  # Chunks per forward pass
+SUMMARIZER_MAX_INPUT_TOKENS = int(os.getenv('SUMMARIZER_MAX_INPUT_TOKENS', '1024'))
+SUMMARIZER_REDUCE_TOKENS = int(os.getenv('SUMMARIZER_REDUCE_TOKENS', '2048'))  # Re-summarize joined summaries above this
+SUMMARIZER_MAX_REDUCE_LEVELS = int(os.getenv('SUMMARIZER_MAX_REDUCE_LEVELS', '2'))
+SUMMARIZER_OVERLAP = os.getenv('SUMMARIZER_OVERLAP', 'True') == 'True'  # Summarize Whisper output while transcription is still running
+SUMMARIZER_OVERLAP_QUEUE = int(os.getenv('SUMMARIZER_OVERLAP_QUEUE', '32'))  # Transcript pieces allowed to wait for the summarizer
+
+# Whisper audio ingest
+WHISPER_STREAMING = os.getenv('WHISPER_STREAMING', 'True') == 'True'  # Pipe yt-dlp through ffmpeg instead of temp files
+WHISPER_WINDOW_SECONDS = int(os.getenv('WHISPER_WINDOW_SECONDS', '300'))  # Audio held in memory per Whisper call
+
+# Parallel Whisper transcription (CPU-only hosts)
+WHISPER_PARALLEL = os.getenv('WHISPER_PARALLEL', 'False') == 'True'
+WHISPER_PARALLEL_WORKERS = int(os.getenv('WHISPER_PARALLEL_WORKERS', str(max(1, (os.cpu_count() or 2) // 2))))
+WHISPER_THREADS_PER_WORKER = int(os.getenv('WHISPER_THREADS_PER_WORKER', '2'))  # torch threads in each worker process
+WHISPER_SEGMENT_SECONDS = int(os.getenv('WHISPER_SEGMENT_SECONDS', '60'))  # Target segment length before silence alignment
+WHISPER_VAD_SEARCH_SECONDS = float(os.getenv('WHISPER_VAD_SEARCH_SECONDS', '5'))  # Look for silence this far back from a cut
+WHISPER_VAD_THRESHOLD = float(os.getenv('WHISPER_VAD_THRESHOLD', '0.01'))  # RMS level treated as silence
+
+# ASGI application; the /api/* views are async and run under backend/asgi.py
+ASGI_APPLICATION = 'backend.asgi.application'
+
+# Threads per external dependency (see app/concurrency.py)
+DEPENDENCY_CONCURRENCY = {
+    'youtube_api': int(os.getenv('YOUTUBE_API_CONCURRENCY', '8')),
+    'transcript_api': int(os.getenv('TRANSCRIPT_API_CONCURRENCY', '8')),
+    'yt_dlp': int(os.getenv('YT_DLP_CONCURRENCY', '4')),
+    's3': int(os.getenv('S3_CONCURRENCY', '4')),
+    'openai': int(os.getenv('OPENAI_CONCURRENCY', '4')),
+    'models': int(os.getenv('MODEL_CONCURRENCY', '1')),  # CPU-bound Whisper/BART work
+    # Summaries built while Whisper is still running. Not 'models': the transcription feeding one holds a 'models' thread
+    'summarizer_overlap': int(os.getenv('SUMMARIZER_OVERLAP_CONCURRENCY', '1')),
+    'inference_server': int(os.getenv('INFERENCE_CLIENT_CONCURRENCY', '8')),  # Threads waiting on the inference server
+}
+
+# Shared API clients (see app/clients.py)
+CLIENT_TIMEOUT = int(os.getenv('CLIENT_TIMEOUT', '30'))  # Seconds
+CLIENT_KEEPALIVE = os.getenv('CLIENT_KEEPALIVE', 'True') == 'True'
+S3_MAX_POOL_CONNECTIONS = int(os.getenv('S3_MAX_POOL_CONNECTIONS', '20'))
+OPENAI_MAX_POOL_CONNECTIONS = int(os.getenv('OPENAI_MAX_POOL_CONNECTIONS', '10'))
+AWS_S3_ENDPOINT_URL = os.getenv('AWS_S3_ENDPOINT_URL')  # Point at MinIO or a moto server for local testing
+OPENAI_API_BASE = os.getenv('OPENAI_API_BASE')  # Point at a local fake OpenAI server for testing
+
+# Pipelined yt-dlp -> S3 multipart upload in /api/download-video/
+S3_STREAMING_UPLOAD = os.getenv('S3_STREAMING_UPLOAD', 'True') == 'True'
+S3_MULTIPART_PART_SIZE = int(os.getenv('S3_MULTIPART_PART_SIZE', str(16 * 1024 * 1024)))  # Bytes, S3 minimum is 5 MB
+S3_MAX_INFLIGHT_PARTS = int(os.getenv('S3_MAX_INFLIGHT_PARTS', '4'))  # Bounds memory to part size x this
+S3_UPLOAD_CONCURRENCY = int(os.getenv('S3_UPLOAD_CONCURRENCY', '4'))
+S3_PART_RETRIES = int(os.getenv('S3_PART_RETRIES', '3'))
+
+# Single-flight deduplication of work on the same video (see app/single_flight.py)
+SINGLE_FLIGHT_LEASE_SECONDS = int(os.getenv('SINGLE_FLIGHT_LEASE_SECONDS', '120'))  # Expiry of a crashed holder's lease
+SINGLE_FLIGHT_WAIT_TIMEOUT = int(os.getenv('SINGLE_FLIGHT_WAIT_TIMEOUT', '3600'))  # Longest wait for another process
+SINGLE_FLIGHT_POLL_INTERVAL = float(os.getenv('SINGLE_FLIGHT_POLL_INTERVAL', '1'))
+
+# Batch optimization endpoint
+BATCH_MAX_VIDEOS = int(os.getenv('BATCH_MAX_VIDEOS', '500'))  # Videos per /api/generate-videos/ call
+BATCH_SUMMARY_GROUP = int(os.getenv('BATCH_SUMMARY_GROUP', '8'))  # Transcripts summarized together in shared batches
+
+# Metrics and tracing (see app/metrics.py, scraped at /metrics)
+METRICS_TRACE_SPANS = os.getenv('METRICS_TRACE_SPANS', 'False') == 'True'  # Log one line per pipeline stage
+
+# Worker role: "metadata" workers serve only /api/fetch-video/, /api/jobs/, /api/transcripts/search/ and /metrics and never load ML models
+WORKER_ROLE = os.getenv('WORKER_ROLE', 'full')
+IMPORT_TIME_BUDGET = float(os.getenv('IMPORT_TIME_BUDGET', '3'))  # Seconds; enforced by app/tests.py
+
+# Transcript store and full-text search (see app/transcript_store.py)
+TRANSCRIPT_STORE = os.getenv('TRANSCRIPT_STORE', 'True') == 'True'  # Serve stored transcripts instead of refetching
+TRANSCRIPT_SEARCH_MAX_RESULTS = int(os.getenv('TRANSCRIPT_SEARCH_MAX_RESULTS', '100'))
+
+# Adaptive transcript routing for /api/generate-video/ (see app/routing.py)
+TRANSCRIPT_ROUTING = os.getenv('TRANSCRIPT_ROUTING', 'True') == 'True'
+ROUTING_LATENCY_BUDGET = int(os.getenv('ROUTING_LATENCY_BUDGET', '900'))  # Seconds a transcript may take, queueing included
+ROUTING_AUTO_CAPTIONS_MIN_SECONDS = int(os.getenv('ROUTING_AUTO_CAPTIONS_MIN_SECONDS', '900'))  # Trust auto captions from this length
+ROUTING_WHISPER_MODELS = os.getenv('ROUTING_WHISPER_MODELS', 'tiny,base,small,large').split(',')  # Cheapest first
+ROUTING_MIN_WHISPER_MODEL = os.getenv('ROUTING_MIN_WHISPER_MODEL', 'base')  # Lowest quality accepted within budget
+ROUTING_MIN_WHISPER_MODEL_NON_ENGLISH = os.getenv('ROUTING_MIN_WHISPER_MODEL_NON_ENGLISH', 'small')
+# Whisper compute seconds per second of audio, used until enough routing decisions are recorded
+WHISPER_REALTIME_FACTORS = {'tiny': 0.05, 'base': 0.1, 'small': 0.3, 'medium': 0.6, 'large': 1.0}
+ROUTING_MIN_SAMPLES = int(os.getenv('ROUTING_MIN_SAMPLES', '5'))  # Recorded runs needed before measured speeds replace the defaults
+
+# OpenAI client: budgets, retries, rate limits and response cache (see app/llm.py)
+OPENAI_MODEL = os.getenv('OPENAI_MODEL', 'gpt-4o')
+LLM_REQUEST_TIMEOUT = int(os.getenv('LLM_REQUEST_TIMEOUT', '60'))  # Seconds per request
+LLM_MAX_RETRIES = int(os.getenv('LLM_MAX_RETRIES', '5'))  # On 429, 5xx, timeouts and connection errors
+LLM_BACKOFF_BASE = float(os.getenv('LLM_BACKOFF_BASE', '1'))  # Seconds, doubled on every retry
+LLM_BACKOFF_MAX = float(os.getenv('LLM_BACKOFF_MAX', '60'))
+LLM_PARSE_RETRIES = int(os.getenv('LLM_PARSE_RETRIES', '2'))  # New completions requested when a reply isn't valid JSON
+LLM_JSON_MODE = os.getenv('LLM_JSON_MODE', 'True') == 'True'  # Ask the API for a JSON object reply
+LLM_MAX_PROMPT_TOKENS = int(os.getenv('LLM_MAX_PROMPT_TOKENS', '6000'))  # Longer inputs are trimmed to fit
+LLM_MAX_COMPLETION_TOKENS = int(os.getenv('LLM_MAX_COMPLETION_TOKENS', '1000'))
+LLM_REQUESTS_PER_MINUTE = int(os.getenv('LLM_REQUESTS_PER_MINUTE', '500'))  # Shared by all workers, 0 = unlimited
+LLM_TOKENS_PER_MINUTE = int(os.getenv('LLM_TOKENS_PER_MINUTE', '30000'))  # Shared by all workers, 0 = unlimited
+LLM_RESPONSE_CACHE = os.getenv('LLM_RESPONSE_CACHE', 'True') == 'True'
+LLM_CACHE_TTL = int(os.getenv('LLM_CACHE_TTL', str(7 * 24 * 3600)))  # Replies cached by prompt hash in RESULT_CACHE_ALIAS
+
+# Inference backends for CPU nodes (see app/inference.py and `manage.py compare_backends`)
+WHISPER_BACKEND = os.getenv('WHISPER_BACKEND', 'torch')  # torch, torch-int8 or ctranslate2 (needs faster-whisper)
+SUMMARIZER_BACKEND = os.getenv('SUMMARIZER_BACKEND', 'torch')  # torch, torch-int8 or onnx (needs optimum[onnxruntime])
+WHISPER_CT2_COMPUTE_TYPE = os.getenv('WHISPER_CT2_COMPUTE_TYPE', 'int8')  # CTranslate2 weights: int8, int8_float32, float32
+ONNX_MODEL_DIR = os.getenv('ONNX_MODEL_DIR', str(BASE_DIR / 'models' / 'onnx'))  # Exported summarizers are kept here
+
+# Local media cache for yt-dlp downloads, shared by every worker on the host (see app/media_cache.py)
+MEDIA_CACHE = os.getenv('MEDIA_CACHE', 'True') == 'True'
+MEDIA_CACHE_DIR = os.getenv('MEDIA_CACHE_DIR', str(BASE_DIR / 'cache' / 'media'))
+MEDIA_CACHE_MAX_BYTES = int(os.getenv('MEDIA_CACHE_MAX_BYTES', str(20 * 1024 ** 3)))  # Least recently used files are evicted past this
+
+# Admission control for the expensive endpoints (see app/admission.py)
+ADMISSION_CONTROL = os.getenv('ADMISSION_CONTROL', 'True') == 'True'
+ADMISSION_MAX_HEAVY = int(os.getenv('ADMISSION_MAX_HEAVY', '0'))  # Concurrent heavy requests and jobs per process, 0 = one per ADMISSION_CPUS_PER_HEAVY CPUs
+ADMISSION_CPUS_PER_HEAVY = int(os.getenv('ADMISSION_CPUS_PER_HEAVY', '2'))
+ADMISSION_HEAVY_MEMORY_BYTES = int(os.getenv('ADMISSION_HEAVY_MEMORY_BYTES', str(4 * 1024 ** 3)))  # Free RAM needed to start another heavy request
+ADMISSION_MAX_MEDIUM = int(os.getenv('ADMISSION_MAX_MEDIUM', '8'))  # Concurrent downloads per process
+ADMISSION_QUEUE_TIMEOUT = float(os.getenv('ADMISSION_QUEUE_TIMEOUT', '10'))  # Seconds a request waits for a slot before a 429
+ADMISSION_QUEUE_LIMIT = int(os.getenv('ADMISSION_QUEUE_LIMIT', '20'))  # Waiting requests per cost class; more are rejected at once
+ADMISSION_RETRY_AFTER = int(os.getenv('ADMISSION_RETRY_AFTER', '30'))  # Seconds sent in Retry-After when at capacity
+# Requests per minute per signed-in user or per client IP, 0 = unlimited
+ADMISSION_USER_QUOTAS = {
+    'heavy': int(os.getenv('ADMISSION_USER_HEAVY_PER_MINUTE', '30')),
+    'medium': int(os.getenv('ADMISSION_USER_MEDIUM_PER_MINUTE', '60')),
+}
+ADMISSION_IP_QUOTAS = {
+    'heavy': int(os.getenv('ADMISSION_IP_HEAVY_PER_MINUTE', '10')),
+    'medium': int(os.getenv('ADMISSION_IP_MEDIUM_PER_MINUTE', '30')),
+}
+
+# YouTube video metadata cache (see app/video_metadata.py and /api/fetch-videos/)
+METADATA_CACHE_TTL = int(os.getenv('METADATA_CACHE_TTL', '3600'))  # Seconds an entry is served without asking YouTube
+METADATA_MISSING_TTL = int(os.getenv('METADATA_MISSING_TTL', '300'))  # Same for ids YouTube didn't return
+METADATA_CACHE_MAX_AGE = int(os.getenv('METADATA_CACHE_MAX_AGE', str(7 * 24 * 3600)))  # Stale entries kept this long for ETag revalidation
+METADATA_CACHE_LOCAL_ENTRIES = int(os.getenv('METADATA_CACHE_LOCAL_ENTRIES', '4096'))  # In-process LRU size
+
+# Host-wide inference workers (see app/inference_workers.py and `manage.py inference_server`).
+# When INFERENCE_SERVER_SOCKET is set, Whisper and the summarizer run in the server's
+# warm worker processes and Django processes load no model weights of their own.
+INFERENCE_SERVER_SOCKET = os.getenv('INFERENCE_SERVER_SOCKET', '')  # e.g. /run/app/inference.sock, empty = run models in-process
+INFERENCE_WHISPER_WORKERS = int(os.getenv('INFERENCE_WHISPER_WORKERS', '2'))
+INFERENCE_SUMMARIZER_WORKERS = int(os.getenv('INFERENCE_SUMMARIZER_WORKERS', '1'))
+INFERENCE_WORKER_THREADS = int(os.getenv('INFERENCE_WORKER_THREADS', str(max(1, (os.cpu_count() or 2) // 3))))  # Torch threads per worker
+INFERENCE_PRELOAD_WHISPER = [size for size in os.getenv('INFERENCE_PRELOAD_WHISPER', WHISPER_MODEL_SIZE).split(',') if size]  # Sizes loaded at worker start
+INFERENCE_PRELOAD_SUMMARIZER = os.getenv('INFERENCE_PRELOAD_SUMMARIZER', 'True') == 'True'
+INFERENCE_MAX_MODELS_PER_WORKER = int(os.getenv('INFERENCE_MAX_MODELS_PER_WORKER', '2'))
+INFERENCE_REQUEST_TIMEOUT = float(os.getenv('INFERENCE_REQUEST_TIMEOUT', '1800'))  # Seconds a client waits for one reply
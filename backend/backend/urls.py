@@ -2,6 +2,7 @@
 from django.contrib import admin
 from django.urls import path, include
 from django.http import HttpResponse
+from app.views import metrics_view
 
 # A simple view for the root URL
 def index(request):
@@ -11,6 +12,7 @@ urlpatterns = [
     path('', index, name='home'),  # This serves the homepage (root)
     path('admin/', admin.site.urls),  # Admin URL
     path('api/', include('app.urls')),  # Include app URLs under /api
+    path('metrics', metrics_view, name='metrics'),  # Prometheus scrape endpoint
 ]
 
 # Serve media files during development
@@ -14,3 +14,8 @@ from django.core.wsgi import get_wsgi_application
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'backend.settings')
 
 application = get_wsgi_application()
+
+# Resume jobs left behind by a crashed or restarted process without waiting for a new submission
+from app import jobs
+
+jobs.start()
@@ -34,6 +34,24 @@ export const fetchVideoMetadata = async (url) => {
     }
 };
 
+// Fetch metadata for up to 50 videos in one request
+export const fetchVideosMetadata = async (urls) => {
+    const invalidUrl = urls.find((url) => !isValidYouTubeUrl(url));
+    if (invalidUrl) {
+        throw new Error(`Invalid YouTube URL provided: ${invalidUrl}`);
+    }
+
+    try {
+        const response = await apiClient.get('/fetch-videos/', {
+            params: { url: urls },
+            paramsSerializer: { indexes: null }, // url=...&url=... rather than url[]=...
+        });
+        return response.data;
+    } catch (error) {
+        handleApiError(error, 'fetching video metadata');
+    }
+};
+
 // Download and upload video to S3
 export const downloadAndUploadVideo = async (url) => {
     if (!isValidYouTubeUrl(url)) {